@@ -0,0 +1,154 @@
+"""
+Capture Archive
+
+Content-addressed store for captures. A grabbed frame is hashed (raw pixels plus
+the encoding options) before it is encoded, so a repeat capture of an unchanged
+screen is recognised without being encoded or written again. Every capture, new or
+not, gets a row in a SQLite index keyed by patient, section and time, so "the
+latest capture of section Y for patient X" is one indexed lookup.
+
+    <root>/blobs/ab/abcdef....png6.png   encoded frames, named by content
+    <root>/index.sqlite3                 (patient, section, taken) -> blob
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from capture import DEFAULT_OPTIONS, CaptureOptions, encode
+from metrics import METRICS
+from paths import write_atomic
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY,
+    taken REAL NOT NULL,
+    patient TEXT NOT NULL DEFAULT '',
+    section TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    path TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    new INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS captures_latest ON captures (patient, section, taken DESC);
+"""
+
+class ArchiveEntry(NamedTuple):
+    id: int
+    taken: float
+    patient: Optional[str]
+    section: str
+    hash: str
+    path: Path
+    size: int
+    new: bool  # False when an identical frame was already stored
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id, "taken": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.taken)),
+            "patient": self.patient, "section": self.section, "hash": self.hash,
+            "path": str(self.path), "bytes": self.size, "new": self.new,
+        }
+
+def frame_hash(frame) -> str:
+    """Hash of a frame's pixels, size and mode"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{frame.mode}:{frame.width}x{frame.height}:".encode())
+    digest.update(frame.tobytes())
+    return digest.hexdigest()
+
+def options_tag(options: CaptureOptions) -> str:
+    """Short tag of the options that change the encoded bytes, e.g. png6, jpeg85-g-d1024, png6-c16"""
+    tag = options.format + (str(options.compress_level) if options.format == "png" else str(options.quality))
+    if options.format == "webp":
+        tag += f"m{min(options.compress_level, 6)}"
+    if options.grayscale:
+        tag += "-g"
+    if options.max_dim:
+        tag += f"-d{options.max_dim}"
+    if options.colors:
+        tag += f"-c{options.colors}"
+    return tag
+
+class CaptureArchive:
+    """Blob store plus index; safe to use from several threads"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.blobs = self.root / "blobs"
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writing: Dict[Path, threading.Event] = {}  # Blobs being encoded right now
+        self._db = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def blob_path(self, hash: str, options: CaptureOptions) -> Path:
+        return self.blobs / hash[:2] / f"{hash}.{options_tag(options)}.{options.format}"
+
+    def store(self, frame, section: str, patient: Optional[str] = None,
+              options: CaptureOptions = DEFAULT_OPTIONS) -> ArchiveEntry:
+        """Record a capture, encoding and writing it only if this exact frame isn't stored yet"""
+        with METRICS.timed("archive.hash"):
+            hash = frame_hash(frame)
+        path = self.blob_path(hash, options)
+
+        # The same frame arriving twice at once is encoded once; the second store waits for it,
+        # then looks again in case that write failed
+        while True:
+            with self._lock:
+                writing = self._writing.get(path)
+                new = writing is None and not path.exists()
+                if new:
+                    self._writing[path] = threading.Event()
+            if writing is None:
+                break
+            writing.wait()
+        if new:
+            try:
+                write_atomic(path, encode(frame, options))
+            finally:
+                with self._lock:
+                    self._writing.pop(path).set()
+        size = path.stat().st_size
+        METRICS.count("archive.new" if new else "archive.duplicates")
+
+        taken = time.time()
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO captures (taken, patient, section, hash, path, bytes, new) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (taken, patient or "", section, hash, str(path.relative_to(self.root)), size, int(new)),
+            )
+        return ArchiveEntry(cursor.lastrowid, taken, patient, section, hash, path, size, new)
+
+    def _entry(self, row) -> ArchiveEntry:
+        id, taken, patient, section, hash, path, size, new = row
+        return ArchiveEntry(id, taken, patient or None, section, hash, self.root / path, size, bool(new))
+
+    def latest(self, section: str, patient: Optional[str] = None) -> Optional[ArchiveEntry]:
+        """The most recent capture of `section` for `patient` (None: captures made without a patient)"""
+        return next(iter(self.history(section, patient, limit=1)), None)
+
+    def history(self, section: str, patient: Optional[str] = None, limit: int = 20) -> List[ArchiveEntry]:
+        """Captures of `section` for `patient`, newest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, taken, patient, section, hash, path, bytes, new FROM captures "
+                "WHERE patient = ? AND section = ? ORDER BY taken DESC LIMIT ?",
+                (patient or "", section, limit),
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            captures, new, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(new), 0), COALESCE(SUM(CASE WHEN new THEN bytes ELSE 0 END), 0) FROM captures"
+            ).fetchone()
+        return {"captures": captures, "unique_frames": new, "duplicates": captures - new, "stored_bytes": stored}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
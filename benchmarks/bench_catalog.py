@@ -0,0 +1,108 @@
+"""
+Benchmark: compiled coordinate catalog vs. the original linear scan
+
+Builds a synthetic 10k-entry coordinates layout (list sections plus dict sections
+with subsections, like section_headers) and times exact, prefix and fuzzy lookups.
+
+Usage:
+    python benchmarks/bench_catalog.py [--entries 10000] [--lookups 20000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from catalog import CoordinateCatalog
+
+WORDS = ["Patient", "Note", "Scroll", "Lab", "Vitals", "Media", "Order", "History", "Review", "Summary", "Report", "Plan"]
+
+def synthetic_layout(entries: int, sections: int = 50, seed: int = 0):
+    """A coordinates.json-shaped dict with roughly `entries` points"""
+    rng = random.Random(seed)
+    per_section = max(entries // sections, 1)
+    data = {}
+    for s in range(sections):
+        def points(count, tag):
+            return [
+                {
+                    "x": rng.randrange(0, 3024),
+                    "y": rng.randrange(0, 1964),
+                    "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {tag}{i}",
+                    "description": "synthetic entry",
+                }
+                for i in range(count)
+            ]
+        if s % 5 == 0:
+            half = per_section // 2
+            data[f"section_{s}"] = {"default": points(half, "d"), "scrolled": points(per_section - half, "s")}
+        else:
+            data[f"section_{s}"] = points(per_section, "")
+    return data
+
+def linear_find(coordinates, section, name, subsection=None):
+    """The lookup find_location_by_name used before the catalog"""
+    if section in coordinates:
+        section_coords = coordinates[section]
+        if isinstance(section_coords, list):
+            for loc in section_coords:
+                if loc.name.lower() == name.lower():
+                    return loc
+        elif isinstance(section_coords, dict):
+            if subsection and subsection in section_coords:
+                for loc in section_coords[subsection]:
+                    if loc.name.lower() == name.lower():
+                        return loc
+            else:
+                for subsection_items in section_coords.values():
+                    for loc in subsection_items:
+                        if loc.name.lower() == name.lower():
+                            return loc
+    return None
+
+def timed(label, fn, count):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:10.2f} ms total  {elapsed / count * 1e6:10.2f} us/op")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    data = synthetic_layout(args.entries)
+    start = time.perf_counter()
+    catalog = CoordinateCatalog.from_dict(data)
+    print(f"Compiled {len(catalog)} entries in {(time.perf_counter() - start) * 1000:.2f} ms\n")
+
+    rng = random.Random(1)
+    queries = []
+    for _ in range(args.lookups):
+        section = rng.choice(list(data))
+        items = data[section]
+        if isinstance(items, dict):
+            subsection = rng.choice(list(items))
+            name = rng.choice(items[subsection])["name"]
+        else:
+            subsection = None
+            name = rng.choice(items)["name"]
+        queries.append((section, name.upper() if rng.random() < 0.5 else name, subsection))
+
+    for section, name, subsection in queries[:200]:
+        assert catalog.find(section, name, subsection) == linear_find(catalog.coordinates, section, name, subsection)
+
+    linear = timed("linear scan (exact)", lambda: [linear_find(catalog.coordinates, *q) for q in queries], len(queries))
+    indexed = timed("catalog.find (exact)", lambda: [catalog.find(*q) for q in queries], len(queries))
+    timed("catalog.find_prefix", lambda: [catalog.find_prefix(s, n[:6], sub) for s, n, sub in queries], len(queries))
+    near_misses = [(s, n[:-1] + "x", sub) for s, n, sub in queries[:500]]
+    timed("catalog.suggest (fuzzy)", lambda: [catalog.suggest(*q) for q in near_misses], len(near_misses))
+    print(f"\nExact lookup speedup: {linear / indexed:.1f}x")
+
+if __name__ == "__main__":
+    main()
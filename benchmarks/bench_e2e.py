@@ -0,0 +1,132 @@
+"""
+Benchmark: end-to-end tool latency against the simulated screen
+
+Runs the MCP tools headless against simulator.SimulatedScreen, with the simulator
+input backend and grabber installed, and reports:
+
+- per-tool latency (median and p95 over --runs calls)
+- clicks, screen grabs, sleep time and active time for each workflow
+
+"Sleep" is time spent in time.sleep: fixed delays, settle polling intervals and
+waits between clicks. "Active" is the rest of the wall time. Run it once per wait
+mode to compare them.
+
+Usage:
+    python benchmarks/bench_e2e.py [--runs 5] [--wait-mode settle,fixed] [--render-delay 0.1]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+os.chdir(REPO)
+
+# Never touch the real screen, data directory or the data file watcher
+os.environ.setdefault("POWERCHART_INPUT_BACKEND", "recording")
+os.environ.setdefault("POWERCHART_HOT_RELOAD", "0")
+os.environ.setdefault("POWERCHART_TRACES", "0")
+
+# Archive, macros, OCR cache and traces go to a scratch directory, never the real data directory
+SCRATCH = tempfile.mkdtemp(prefix="powerchart-bench-")
+os.environ["POWERCHART_DATA_DIR"] = SCRATCH
+os.environ["POWERCHART_CACHE_DIR"] = os.path.join(SCRATCH, "cache")
+os.environ["POWERCHART_TRACE_DIR"] = os.path.join(SCRATCH, "traces")
+
+class SleepMeter:
+    """Wraps time.sleep to total the time every thread spends sleeping"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        self._sleep = time.sleep
+
+    def __call__(self, seconds: float):
+        start = time.perf_counter()
+        self._sleep(seconds)
+        with self._lock:
+            self.seconds += time.perf_counter() - start
+
+    def install(self):
+        time.sleep = self
+
+SLEEP = SleepMeter()
+
+# (label, tool name, kwargs) - tools that move the simulated screen
+TOOL_CALLS = [
+    ("navigate_to", "navigate_to", {"section": "home", "element": "Patient List"}),
+    ("double_click_element", "double_click_element", {"section": "specific_patient_list", "element": "Patient 1"}),
+    ("scroll_section x9", "scroll_section", {"section": "patient_timeline_medications", "direction": "down", "clicks": 9}),
+    ("capture png", "capture_screen_section", {"section": "inpatient_manage"}),
+    ("capture png level 1", "capture_screen_section", {"section": "inpatient_manage", "compress_level": 1}),
+    ("capture jpeg", "capture_screen_section", {"section": "inpatient_manage", "format": "jpeg"}),
+    ("capture_sections x2", "capture_sections", {"sections": ["inpatient_manage", "warning_sign"]}),
+    ("has_section_changed", "has_section_changed", {"section": "inpatient_manage"}),
+    ("probe_pixels", "probe_pixels", {}),
+    ("capture_scrolling_section", "capture_scrolling_section", {"section": "patient_timeline_medications"}),
+]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def bench_tools(server, runs: int):
+    print(f"{'tool':<28} {'median ms':>10} {'p95 ms':>10}")
+    for label, name, kwargs in TOOL_CALLS:
+        tool = getattr(server, name)
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = asyncio.run(tool(**kwargs))
+            times.append(time.perf_counter() - start)
+            if isinstance(result, str) and result.startswith("Error"):
+                print(f"{label:<28} {result}")
+                break
+        else:
+            print(f"{label:<28} {statistics.median(times) * 1000:>10.1f} {percentile(times, 0.95) * 1000:>10.1f}")
+
+def bench_workflows(server, screen, runs: int):
+    print(f"\n{'workflow':<24} {'median s':>9} {'clicks':>7} {'misses':>7} {'grabs':>6} {'sleep s':>8} {'active s':>9}")
+    for name in server.CONFIG.workflows:
+        walls = []
+        for _ in range(runs):
+            clicks, misses, grabs, slept = screen.clicks, screen.misses, screen.grabs, SLEEP.seconds
+            start = time.perf_counter()
+            asyncio.run(server.perform_workflow(name))
+            walls.append(time.perf_counter() - start)
+        wall = walls[-1]
+        sleep = SLEEP.seconds - slept
+        print(f"{name:<24} {statistics.median(walls):>9.3f} {screen.clicks - clicks:>7} {screen.misses - misses:>7} "
+              f"{screen.grabs - grabs:>6} {sleep:>8.3f} {wall - sleep:>9.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--wait-mode", default="settle,fixed", help="Comma-separated wait modes to run")
+    parser.add_argument("--render-delay", type=float, default=0.1, help="Simulated seconds before a click repaints")
+    parser.add_argument("--render-time", type=float, default=0.15, help="Simulated seconds a repaint takes")
+    args = parser.parse_args()
+
+    import powerchart_mcp as server
+    from simulator import SimulatedScreen, install
+
+    SLEEP.install()
+    for mode in args.wait_mode.split(","):
+        screen = SimulatedScreen(server.CONFIG.catalog, render_delay=args.render_delay, render_time=args.render_time)
+        install(screen)
+        server.WAIT.mode = mode.strip()
+        server.CHANGES.reset()
+
+        print(f"\n=== wait mode: {server.WAIT.mode} (render delay {args.render_delay:g} s + {args.render_time:g} s) ===\n")
+        bench_tools(server, args.runs)
+        bench_workflows(server, screen, max(1, args.runs // 2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark: per-op latency of the input backends
+
+Sends the same click workload to each backend twice: once as one batch per click
+(the old one-subprocess-per-click pattern) and once as a single batch. Only the
+recording backend is safe to run unattended; real backends move the mouse, so
+point --x/--y at an empty part of the screen.
+
+Usage:
+    python benchmarks/bench_input.py [--backends recording,cliclick,pyautogui] [--clicks 20]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from input_backends import click, create_backend
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="recording")
+    parser.add_argument("--clicks", type=int, default=20)
+    parser.add_argument("--x", type=int, default=10)
+    parser.add_argument("--y", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'backend':<12} {'mode':<10} {'batches':>8} {'ops':>6} {'mean op ms':>11} {'mean batch ms':>14}")
+    for name in args.backends.split(","):
+        try:
+            backend = create_backend(name.strip())
+            for mode in ("per-click", "batched"):
+                backend.stats.reset()
+                if mode == "per-click":
+                    for _ in range(args.clicks):
+                        backend.run([click(args.x, args.y)])
+                else:
+                    backend.run([click(args.x, args.y)] * args.clicks)
+                stats = backend.stats.summary()
+                print(f"{backend.name:<12} {mode:<10} {stats['batches']:>8} {stats['ops']:>6} "
+                      f"{stats['mean_op_ms']:>11.3f} {stats['mean_batch_ms']:>14.3f}")
+            backend.close()
+        except Exception as e:
+            print(f"{name:<12} unavailable: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: capture payload size per screen section
+
+For every screen section in coordinates.json, encodes one frame two ways and
+reports bytes, encode time and an estimate of the image tokens the client pays:
+
+- default: full-resolution PNG, what capture_screen_section used to return
+- shaped: the section's "capture" settings (max_dim, grayscale, colors, format)
+
+Frames come from the simulated screen, whose synthetic text compresses unlike
+the real UI. For real numbers, pass a full-screen screenshot of PowerChart taken
+at the display's native resolution (Retina screenshots are scaled down by the
+ratio of the image width to --screen-width).
+
+Usage:
+    python benchmarks/bench_payload.py [--image screenshot.png] [--screen-width 1920] [--runs 3]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+os.chdir(REPO)
+
+os.environ.setdefault("POWERCHART_INPUT_BACKEND", "recording")
+os.environ.setdefault("POWERCHART_HOT_RELOAD", "0")
+os.environ.setdefault("POWERCHART_TRACES", "0")
+
+# Archive, macros, OCR cache and traces go to a scratch directory, never the real data directory
+SCRATCH = tempfile.mkdtemp(prefix="powerchart-bench-")
+os.environ["POWERCHART_DATA_DIR"] = SCRATCH
+os.environ["POWERCHART_CACHE_DIR"] = os.path.join(SCRATCH, "cache")
+os.environ["POWERCHART_TRACE_DIR"] = os.path.join(SCRATCH, "traces")
+
+def image_tokens(width: int, height: int, max_edge: int = 1568) -> int:
+    """Common estimate for vision models: images are fitted to max_edge, then ~750 pixels per token"""
+    scale = min(1.0, max_edge / max(width, height))
+    return round(width * scale * height * scale / 750)
+
+def screenshot_grabber(path: str, screen_width: int):
+    """Grab regions by cropping a saved full-screen screenshot"""
+    from PIL import Image
+
+    screen = Image.open(path).convert("RGB")
+    scale = screen.width / screen_width
+
+    def grab(region):
+        box = tuple(round(v * scale) for v in (region.left_x, region.upper_y, region.right_x, region.lower_y))
+        return screen.crop(box)
+    return grab
+
+def encode_timed(frame, options, runs: int):
+    from capture import encode
+
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        data = encode(frame, options)
+        times.append(time.perf_counter() - start)
+    return data, statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", help="Full-screen screenshot to crop sections from (default: the simulated screen)")
+    parser.add_argument("--screen-width", type=int, default=1920, help="Logical screen width the screenshot covers")
+    parser.add_argument("--runs", type=int, default=3, help="Encodes per measurement (median is reported)")
+    args = parser.parse_args()
+
+    import powerchart_mcp as server
+    from capture import DEFAULT_OPTIONS, shaped_size
+
+    if args.image:
+        grab = screenshot_grabber(args.image, args.screen_width)
+    else:
+        from simulator import SimulatedScreen
+
+        grab = SimulatedScreen(server.CONFIG.catalog).grab
+
+    print(f"{'section':<36} {'default B':>11} {'ms':>7} {'tokens':>7}   {'shaped B':>10} {'ms':>7} {'tokens':>7} {'ratio':>7}")
+    totals = [0, 0]
+    for name, region in server.CONFIG.catalog.screen_sections.items():
+        frame = grab(region)
+        options = server.section_options(name)
+        default, default_s = encode_timed(frame, DEFAULT_OPTIONS, args.runs)
+        shaped, shaped_s = encode_timed(frame, options, args.runs)
+        totals[0] += len(default)
+        totals[1] += len(shaped)
+        print(f"{name:<36} {len(default):>11,} {default_s * 1000:>7.1f} {image_tokens(*frame.size):>7,}   "
+              f"{len(shaped):>10,} {shaped_s * 1000:>7.1f} {image_tokens(*shaped_size(frame.size, options)):>7,} "
+              f"{len(shaped) / len(default):>7.1%}")
+    print(f"{'total':<36} {totals[0]:>11,} {'':>7} {'':>7}   {totals[1]:>10,} {'':>7} {'':>7} {totals[1] / totals[0]:>7.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: cold vs. warm ICA download against the StoreFront stand-in
+
+Runs download.download_powerchart_ica three times against storefront_standin.py
+and reports wall time and how many logins and downloads the site saw:
+
+- cold: no saved state, logs in
+- warm: saved login state, goes straight to the app list
+- ica reuse: the ICA file from the warm run is still fresh, so no browser at all
+
+The ICA file is not opened (Citrix is never launched). Needs Playwright and its
+Chromium (`playwright install chromium`).
+
+Usage:
+    python benchmarks/bench_session.py [--login-delay 2] [--apps-delay 1]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--login-delay", type=float, default=2.0, help="Seconds the stand-in takes to log in")
+    parser.add_argument("--apps-delay", type=float, default=1.0, help="Seconds the stand-in takes to list apps")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_session_"))
+    os.environ["POWERCHART_DATA_DIR"] = str(workdir / "data")
+    os.environ.setdefault("CERNER_USERNAME", "standin")
+    os.environ.setdefault("CERNER_PASSWORD", "standin")
+
+    import download
+    from storefront_standin import StorefrontStandin
+
+    standin = StorefrontStandin(login_delay=args.login_delay, apps_delay=args.apps_delay).start()
+    os.environ["CERNER_BASE_URL"] = standin.url
+    download.open_ica_file = lambda path: False  # Never launch Citrix from a benchmark
+
+    print(f"{'run':<12} {'seconds':>8} {'logins':>7} {'downloads':>10}")
+    try:
+        for label in ("cold", "warm", "ica reuse"):
+            logins, downloads = standin.logins, standin.downloads
+            start = time.perf_counter()
+            download.download_powerchart_ica(download_path=str(workdir))
+            seconds = time.perf_counter() - start
+            print(f"{label:<12} {seconds:>8.2f} {standin.logins - logins:>7} {standin.downloads - downloads:>10}")
+    finally:
+        standin.stop()
+
+if __name__ == "__main__":
+    main()
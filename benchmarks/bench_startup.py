@@ -0,0 +1,83 @@
+"""
+Benchmark: server import/startup time
+
+Imports powerchart_mcp in fresh interpreters under `-X importtime` and reports
+wall time, the time spent in powerchart_mcp itself and the slowest imports. With
+--entries, a synthetic coordinates.json of that size is used to show what
+compiling a large catalog adds.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--entries 10000] [--top 10]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def run_once(cwd: str, env: dict):
+    """Import the server once; returns (wall seconds, {module: cumulative us}, stderr)"""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {str(REPO)!r}); import powerchart_mcp"],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+    return wall, cumulative, proc.stderr
+
+def report(label: str, runs):
+    walls = [wall for wall, _, _ in runs]
+    own = [cumulative.get("powerchart_mcp", 0) / 1e6 for _, cumulative, _ in runs]
+    loaded = [line for line in runs[-1][2].splitlines() if line.startswith("Loaded coordinates")]
+    print(f"{label:<12} wall median {statistics.median(walls) * 1000:8.1f} ms   "
+          f"import powerchart_mcp median {statistics.median(own) * 1000:8.1f} ms   {loaded[0] if loaded else ''}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--entries", type=int, default=0, help="Use a synthetic coordinates.json with this many entries")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = str(REPO)
+        if args.entries:
+            from bench_catalog import synthetic_layout
+
+            cwd = tmp
+            data = synthetic_layout(args.entries)
+            with open(os.path.join(REPO, "coordinates.json")) as f:
+                data["screen_sections"] = json.load(f)["screen_sections"]
+            with open(os.path.join(tmp, "coordinates.json"), "w") as f:
+                json.dump(data, f)
+
+        runs = [run_once(cwd, dict(os.environ)) for _ in range(args.runs)]
+
+    report("startup", runs)
+
+    print(f"\nSlowest imports (cumulative, last run):")
+    cumulative = runs[-1][1]
+    for module, us in sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {module}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Screen Capture
+
+Grabbing and encoding of screen regions. Several regions are grabbed as one
+screenshot of their bounding box and cropped apart, so a multi-section capture
+costs one grab (one `screencapture` process with pyautogui). Encoding is configurable per call
+(format, compression, quality, downscaling, grayscale, palette). Internal consumers
+such as diffing and stitching take the grabbed PIL image from grab_region directly,
+skipping both the encode and the byte copy.
+"""
+
+import io
+import os
+import platform
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from catalog import Region
+from metrics import METRICS
+
+FORMATS = ("png", "jpeg", "webp")
+
+class CaptureOptions(NamedTuple):
+    """How a captured frame is encoded"""
+    format: str = "png"
+    compress_level: int = 6  # PNG zlib level 0-9 (1 is fastest); WebP method 0-6
+    quality: int = 85  # JPEG/WebP quality 1-100
+    max_dim: Optional[int] = None  # Downscale so the longest edge is at most this many pixels
+    grayscale: bool = False
+    colors: Optional[int] = None  # PNG only: quantize to a palette of this many colors (2-256)
+
+    def validate(self) -> Optional[str]:
+        """Error message for invalid options, or None"""
+        if self.format not in FORMATS:
+            return f"Unknown capture format '{self.format}'. Available: {', '.join(FORMATS)}"
+        if not 0 <= self.compress_level <= 9:
+            return "compress_level must be between 0 and 9"
+        if not 1 <= self.quality <= 100:
+            return "quality must be between 1 and 100"
+        if self.max_dim is not None and self.max_dim < 1:
+            return "max_dim must be a positive number of pixels"
+        if self.colors is not None:
+            if not 2 <= self.colors <= 256:
+                return "colors must be between 2 and 256"
+            if self.format != "png":
+                return "colors (palette quantization) only applies to png"
+        return None
+
+DEFAULT_OPTIONS = CaptureOptions()
+
+def options_from_dict(settings: dict, base: CaptureOptions = DEFAULT_OPTIONS) -> CaptureOptions:
+    """`base` with the fields named in `settings` (e.g. a screen section's "capture" block) replaced"""
+    unknown = set(settings) - set(CaptureOptions._fields)
+    if unknown:
+        raise ValueError(f"unknown capture option(s): {', '.join(sorted(unknown))}")
+    return base._replace(**settings)
+
+# ===================================
+# Grabbing
+# ===================================
+
+def _pyautogui_grab(region: Optional[Region] = None):
+    import pyautogui
+
+    if region is not None:
+        return pyautogui.screenshot(region=region.box)
+    return pyautogui.screenshot()
+
+def _quartz_grab(region: Optional[Region] = None):
+    """
+    In-process grab through Core Graphics. pyautogui shells out to `screencapture`
+    and round-trips through a temp file, which is far too slow for polling.
+    """
+    import Quartz
+    from PIL import Image
+
+    rect = Quartz.CGRectInfinite if region is None else Quartz.CGRectMake(*region.box)
+    cg_image = Quartz.CGWindowListCreateImage(
+        rect, Quartz.kCGWindowListOptionOnScreenOnly, Quartz.kCGNullWindowID, Quartz.kCGWindowImageDefault
+    )
+    width = Quartz.CGImageGetWidth(cg_image)
+    height = Quartz.CGImageGetHeight(cg_image)
+    stride = Quartz.CGImageGetBytesPerRow(cg_image)
+    data = Quartz.CGDataProviderCopyData(Quartz.CGImageGetDataProvider(cg_image))
+    return Image.frombuffer("RGB", (width, height), bytes(data), "raw", "BGRX", stride, 1)
+
+def default_grabber() -> Callable[[Optional[Region]], object]:
+    """POWERCHART_GRABBER if set, else Quartz on macOS when pyobjc is installed, else pyautogui"""
+    name = os.environ.get("POWERCHART_GRABBER")
+    if name is None and platform.system() == "Darwin":
+        try:
+            import Quartz  # noqa: F401
+            name = "quartz"
+        except ImportError:
+            name = "pyautogui"
+    return _quartz_grab if name == "quartz" else _pyautogui_grab
+
+_grabber: Optional[Callable[[Optional[Region]], object]] = None
+
+def set_grabber(grabber: Optional[Callable[[Optional[Region]], object]]):
+    """Route all screen grabs through `grabber` (None restores the default)"""
+    global _grabber
+    _grabber = grabber
+
+def grab_region(region: Optional[Region] = None):
+    """Grab a screen region (or the full screen) as a PIL image"""
+    global _grabber
+    if _grabber is None:
+        _grabber = default_grabber()
+    with METRICS.timed("capture.grab", region=region.name if region is not None else "screen"):
+        return _grabber(region)
+
+def union_region(regions: Sequence[Region], name: str = "union") -> Region:
+    """The bounding box of `regions`"""
+    return Region(min(r.left_x for r in regions), min(r.upper_y for r in regions),
+                  max(r.right_x for r in regions), max(r.lower_y for r in regions), name)
+
+def grab_regions(regions: Sequence[Region]) -> List[object]:
+    """Grab several regions from one screenshot of their bounding box; one PIL image per region, in order"""
+    if len(regions) == 1:
+        return [grab_region(regions[0])]
+    box = union_region(regions)
+    frame = grab_region(box)
+    scale = frame.width / box.width  # 2 on Retina displays
+    with METRICS.timed("capture.slice", regions=len(regions)):
+        return [
+            frame.crop((round((r.left_x - box.left_x) * scale), round((r.upper_y - box.upper_y) * scale),
+                        round((r.right_x - box.left_x) * scale), round((r.lower_y - box.upper_y) * scale)))
+            for r in regions
+        ]
+
+# ===================================
+# Encoding
+# ===================================
+
+def shaped_size(size: Tuple[int, int], options: CaptureOptions) -> Tuple[int, int]:
+    """(width, height) of a frame of `size` after downscaling to `options.max_dim`"""
+    if not options.max_dim or max(size) <= options.max_dim:
+        return size
+    scale = options.max_dim / max(size)
+    return (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+
+def shape(image, options: CaptureOptions):
+    """Apply grayscale and downscaling without encoding (palette quantization happens in `encode`)"""
+    if options.grayscale and image.mode != "L":
+        image = image.convert("L")
+    size = shaped_size(image.size, options)
+    if size != image.size:
+        from PIL import Image
+
+        image = image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+    return image
+
+def encode(image, options: CaptureOptions = DEFAULT_OPTIONS) -> bytes:
+    """Encode a grabbed image"""
+    image = shape(image, options)
+    buf = io.BytesIO()
+    with METRICS.timed(f"capture.encode.{options.format}", width=image.width, height=image.height):
+        if options.format == "png":
+            if options.colors:
+                from PIL import Image
+
+                # Fast octree needs RGB; grayscale frames take the default median cut
+                method = Image.Quantize.FASTOCTREE if image.mode == "RGB" else None
+                image = image.quantize(options.colors, method=method)
+            image.save(buf, format="PNG", compress_level=options.compress_level)
+        elif options.format == "jpeg":
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            image.save(buf, format="JPEG", quality=options.quality)
+        elif options.format == "webp":
+            image.save(buf, format="WEBP", quality=options.quality, method=min(options.compress_level, 6))
+    METRICS.count("capture.encoded_bytes", buf.tell())
+    return buf.getvalue()
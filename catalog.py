@@ -0,0 +1,250 @@
+"""
+Compiled coordinate catalog
+
+Turns the raw coordinates.json layout into an indexed, read-only catalog so that
+element lookups are a single hash probe instead of a scan over every section.
+"""
+
+import difflib
+import hashlib
+import json
+from bisect import bisect_left
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+# ===================================
+# Compact Records
+# ===================================
+
+class Point(NamedTuple):
+    """A clickable location in the PowerChart UI"""
+    x: int
+    y: int
+    name: str
+    description: Optional[str] = None
+    section: Optional[str] = None
+    subsection: Optional[str] = None
+
+class Region(NamedTuple):
+    """Screen section with capture coordinates"""
+    left_x: int
+    upper_y: int
+    right_x: int
+    lower_y: int
+    name: str
+
+    @property
+    def width(self) -> int:
+        return self.right_x - self.left_x
+
+    @property
+    def height(self) -> int:
+        return self.lower_y - self.upper_y
+
+    @property
+    def box(self) -> Tuple[int, int, int, int]:
+        """(left, top, width, height) as expected by screenshot APIs"""
+        return (self.left_x, self.upper_y, self.width, self.height)
+
+SectionCoords = Union[List[Point], Dict[str, List[Point]]]
+
+# ===================================
+# Catalog
+# ===================================
+
+class SectionIndex:
+    """Compiled lookups for one coordinates.json section"""
+
+    __slots__ = ("points", "exact", "sorted", "subsections", "digest")
+
+    def __init__(self, points: SectionCoords, digest: Optional[str] = None):
+        self.points = points
+        self.digest = digest
+        # (subsection or None, folded name) -> Point
+        self.exact: Dict[Tuple[Optional[str], str], Point] = {}
+        # subsection or None -> sorted [(folded name, Point)] for prefix search
+        self.sorted: Dict[Optional[str], List[Tuple[str, Point]]] = {}
+        self.subsections = set()
+
+        if isinstance(points, dict):
+            for subsection, items in points.items():
+                self.subsections.add(subsection)
+                self._add(subsection, items)
+                self._add(None, items)
+        else:
+            self._add(None, points)
+
+        for entries in self.sorted.values():
+            entries.sort(key=lambda entry: entry[0])
+
+    def _add(self, subsection: Optional[str], points: List[Point]):
+        entries = self.sorted.setdefault(subsection, [])
+        for point in points:
+            folded = point.name.casefold()
+            # First definition wins, matching the original scan order
+            self.exact.setdefault((subsection, folded), point)
+            entries.append((folded, point))
+
+    def scope(self, subsection: Optional[str]) -> Optional[str]:
+        """Subsection to search in; unknown subsections fall back to the whole section"""
+        return subsection if subsection in self.subsections else None
+
+class CoordinateCatalog:
+    """
+    Read-only view over coordinates.json, compiled once at load time.
+
+    Lookups are case-insensitive and keyed by (section, subsection, name). Dict
+    sections (e.g. section_headers) are also indexed under subsection None so a
+    lookup without a subsection resolves to the first match in file order, the
+    same result the old linear scan produced. Each section is compiled
+    separately, so a reload only recompiles the sections that changed.
+    """
+
+    __slots__ = ("coordinates", "screen_sections", "capture_settings", "source", "digest", "_sections")
+
+    def __init__(self, coordinates: Dict[str, SectionCoords], screen_sections: Dict[str, Region],
+                 source: Optional[str] = None, sections: Optional[Dict[str, SectionIndex]] = None,
+                 capture_settings: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.coordinates = coordinates
+        self.screen_sections = screen_sections
+        # Screen section -> its "capture" block (encoding defaults for captures returned to the client)
+        self.capture_settings = capture_settings or {}
+        self.source = source
+        self.digest: Optional[str] = None  # SHA-256 of the source file, set by load_catalog
+        if sections is None:
+            sections = {section: SectionIndex(points) for section, points in coordinates.items()}
+        self._sections = sections
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], source: Optional[str] = None,
+                  previous: Optional["CoordinateCatalog"] = None) -> "CoordinateCatalog":
+        """
+        Build a catalog from the parsed contents of coordinates.json. Sections whose
+        JSON is unchanged from `previous` reuse its compiled index.
+        """
+        coordinates: Dict[str, SectionCoords] = {}
+        screen_sections: Dict[str, Region] = {}
+        capture_settings: Dict[str, Dict[str, Any]] = {}
+        sections: Dict[str, SectionIndex] = {}
+
+        for section, items in data.items():
+            if section == "screen_sections":
+                for name, section_data in items.items():
+                    screen_sections[name] = Region(
+                        section_data["left_x"],
+                        section_data["upper_y"],
+                        section_data["right_x"],
+                        section_data["lower_y"],
+                        section_data["name"],
+                    )
+                    if section_data.get("capture"):
+                        capture_settings[name] = dict(section_data["capture"])
+                continue
+
+            digest = hashlib.sha1(json.dumps(items, sort_keys=True).encode()).hexdigest()
+            reused = previous._sections.get(section) if previous is not None else None
+            if reused is not None and reused.digest == digest:
+                sections[section] = reused
+                coordinates[section] = reused.points
+                continue
+
+            if isinstance(items, dict):
+                coordinates[section] = {
+                    subsection: [_make_point(item, section, subsection) for item in coords]
+                    for subsection, coords in items.items()
+                }
+            else:
+                coordinates[section] = [_make_point(item, section, None) for item in items]
+            sections[section] = SectionIndex(coordinates[section], digest)
+
+        return cls(coordinates, screen_sections, source, sections, capture_settings)
+
+    def __len__(self) -> int:
+        return sum(len(index.sorted.get(None, ())) for index in self._sections.values())
+
+    def find(self, section: str, name: str, subsection: Optional[str] = None) -> Optional[Point]:
+        """Exact, case-insensitive lookup of an element"""
+        index = self._sections.get(section)
+        if index is None:
+            return None
+        return index.exact.get((index.scope(subsection), name.casefold()))
+
+    def find_prefix(self, section: str, prefix: str, subsection: Optional[str] = None, limit: int = 10) -> List[Point]:
+        """Elements whose name starts with the given prefix, in name order"""
+        index = self._sections.get(section)
+        if index is None:
+            return []
+        entries = index.sorted.get(index.scope(subsection), [])
+        folded = prefix.casefold()
+        matches = []
+        for i in range(bisect_left(entries, (folded,)), len(entries)):
+            entry_name, point = entries[i]
+            if not entry_name.startswith(folded) or len(matches) >= limit:
+                break
+            matches.append(point)
+        return matches
+
+    def suggest(self, section: str, name: str, subsection: Optional[str] = None, limit: int = 3) -> List[str]:
+        """Near-miss element names for an unknown name, best match first"""
+        index = self._sections.get(section)
+        if index is None:
+            return []
+
+        by_folded = {}
+        for entry_name, point in index.sorted.get(index.scope(subsection), []):
+            by_folded.setdefault(entry_name, point.name)
+
+        folded = name.casefold()
+        names = [by_folded[match] for match in difflib.get_close_matches(folded, by_folded, n=limit, cutoff=0.6)]
+        for point in self.find_prefix(section, name, subsection, limit):
+            if len(names) >= limit:
+                break
+            if point.name not in names:
+                names.append(point.name)
+        return names
+
+    def changed_sections(self, previous: Optional["CoordinateCatalog"]) -> List[str]:
+        """Sections added, removed or recompiled relative to `previous`"""
+        if previous is None:
+            return list(self._sections)
+        names = set(self._sections) | set(previous._sections)
+        return sorted(name for name in names if _digest(self._sections.get(name)) != _digest(previous._sections.get(name)))
+
+    def region_for(self, section: Optional[str], default: Optional[str] = None) -> Optional[Region]:
+        """
+        Screen section that shows the elements of `section`: an exact name match,
+        else the first screen section whose name starts with it (media_gallery ->
+        media_gallery_folder), else the `default` screen section.
+        """
+        if section in self.screen_sections:
+            return self.screen_sections[section]
+        if section:
+            for name, region in self.screen_sections.items():
+                if name.startswith(section):
+                    return region
+        return self.screen_sections.get(default)
+
+def _digest(index: Optional[SectionIndex]) -> Optional[str]:
+    return index.digest if index is not None else None
+
+def _make_point(item: Dict[str, Any], section: str, subsection: Optional[str]) -> Point:
+    return Point(int(item["x"]), int(item["y"]), item["name"], item.get("description"), section, subsection)
+
+# ===================================
+# Loading
+# ===================================
+
+def load_catalog(path: str, previous: Optional[CoordinateCatalog] = None) -> Tuple[CoordinateCatalog, bool]:
+    """
+    Load and compile coordinates.json at `path`. When the file's SHA-256 matches
+    `previous`, that catalog is returned as is (a touched-but-unchanged file); otherwise
+    sections that are unchanged from `previous` are reused. Returns (catalog, unchanged).
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    if previous is not None and previous.digest == digest:
+        return previous, True
+
+    catalog = CoordinateCatalog.from_dict(json.loads(raw), path, previous)
+    catalog.digest = digest
+    return catalog, False
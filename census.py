@@ -0,0 +1,160 @@
+"""
+Census Runner
+
+Walks the patient list and runs one workflow per patient in a single batch,
+instead of one LLM round trip per click. Progress is checkpointed to
+checkpoint.json after every patient (written to a temp file and swapped in with
+os.replace, so a crash never leaves a torn file), and a rerun with the same run id
+resumes at the first patient that is not finished. Captured frames go through the
+capture pipeline, so the UI thread moves on to the next click while the previous
+frame is still being compressed.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from capture import CaptureOptions
+from catalog import Region
+from metrics import METRICS
+from paths import write_atomic
+from pipeline import CaptureHandle, CapturePipeline
+from workflows import Runtime, WorkflowPlan, execute
+
+CHECKPOINT_VERSION = 1
+
+class CensusError(Exception):
+    """A census run that cannot be started or resumed"""
+
+class PatientResult(NamedTuple):
+    position: int
+    ok: bool
+    seconds: float
+    captures: List[str]
+    error: Optional[str] = None
+
+class CensusRunner:
+    """
+    Runs `plan` for each patient position, checkpointing to <directory>/checkpoint.json.
+
+    Args:
+        run_id: Name of the run; its captures and checkpoint live in <root>/<run_id>
+        plan: Workflow run for each patient
+        positions: Patient list positions to visit, in order
+        root: Directory holding all census runs
+        select_patient: Opens the patient at a position (runs on the UI thread)
+        runtime: Side effects for the workflow executor
+        pipeline: Encodes and writes captured frames
+        return_plan: Optional workflow run after each patient to get back to the list
+        options: Encoding for captured frames
+    """
+
+    def __init__(self, run_id: str, plan: WorkflowPlan, positions: List[int], root: Path,
+                 select_patient: Callable[[int], None], runtime: Runtime, pipeline: CapturePipeline,
+                 return_plan: Optional[WorkflowPlan] = None, options: CaptureOptions = CaptureOptions(compress_level=1)):
+        self.run_id = run_id
+        self.plan = plan
+        self.return_plan = return_plan
+        self.directory = root / run_id
+        self.checkpoint_path = self.directory / "checkpoint.json"
+        self.select_patient = select_patient
+        self.runtime = runtime
+        self.pipeline = pipeline
+        self.options = options
+        self.state = self._load(positions)
+        self._pending: Dict[int, List[CaptureHandle]] = {}
+
+    # Checkpoint
+
+    def _load(self, positions: List[int]) -> dict:
+        if self.checkpoint_path.exists():
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+            if state.get("workflow") != self.plan.name:
+                raise CensusError(f"run '{self.run_id}' was started with workflow '{state.get('workflow')}'")
+            # New positions are appended; finished ones keep their results
+            state["positions"] += [p for p in positions if p not in state["positions"]]
+            return state
+        return {
+            "version": CHECKPOINT_VERSION, "run_id": self.run_id, "workflow": self.plan.name,
+            "positions": list(positions), "done": {}, "failed": {}, "started": time.time(), "updated": time.time(),
+        }
+
+    def checkpoint(self):
+        self.state["updated"] = time.time()
+        write_atomic(self.checkpoint_path, json.dumps(self.state, indent=2).encode())
+
+    def is_done(self, position: int) -> bool:
+        """
+        Finished, with every capture on disk (a crash can lose frames that were still being
+        written) or still being written by this run (finish() fails the patient if a write fails)
+        """
+        entry = self.state["done"].get(str(position))
+        if entry is None:
+            return False
+        return position in self._pending or all(os.path.exists(path) for path in entry["captures"])
+
+    def remaining(self) -> List[int]:
+        return [p for p in self.state["positions"] if not self.is_done(p)]
+
+    # Running
+
+    def _save_capture(self, position: int, index: int, region: Region, frame) -> str:
+        path = self.directory / f"patient_{position:02d}" / f"{index:02d}_{region.name}.{self.options.format}"
+        self._pending.setdefault(position, []).append(self.pipeline.submit(frame, path, self.options))
+        return str(path)
+
+    def run_patient(self, position: int) -> PatientResult:
+        """Open one patient and run the workflow; call on the UI thread"""
+        start = time.perf_counter()
+        captures: List[str] = []
+        runtime = self.runtime._replace(
+            on_capture=lambda region, frame: captures.append(self._save_capture(position, len(captures) + 1, region, frame))
+        )
+        try:
+            self.select_patient(position)
+            result = execute(self.plan, runtime)
+            error = result.error
+            if error is None and self.return_plan is not None:
+                error = execute(self.return_plan, self.runtime._replace(on_capture=None)).error
+        except Exception as e:
+            error = str(e) or type(e).__name__
+
+        seconds = time.perf_counter() - start
+        key = str(position)
+        if error is None:
+            self.state["done"][key] = {"captures": captures, "seconds": round(seconds, 3), "finished": time.time()}
+            self.state["failed"].pop(key, None)
+        else:
+            self.state["failed"][key] = error
+        self.checkpoint()
+        METRICS.count("census.patients_done" if error is None else "census.patients_failed")
+        return PatientResult(position, error is None, seconds, captures, error)
+
+    def finish(self) -> Dict[int, str]:
+        """Wait for pending writes; patients whose captures failed to write are marked failed again"""
+        errors = {}
+        for position, handles in self._pending.items():
+            self.pipeline.drain(handles)
+            for handle in handles:
+                if handle.error is not None:
+                    errors[position] = f"writing capture failed: {handle.error}"
+        self._pending.clear()
+        for position, error in errors.items():
+            self.state["done"].pop(str(position), None)
+            self.state["failed"][str(position)] = error
+        self.checkpoint()
+        return errors
+
+    def summary(self) -> str:
+        done = sum(1 for p in self.state["positions"] if self.is_done(p))
+        total = len(self.state["positions"])
+        lines = [f"Census '{self.run_id}' ({self.plan.name}): {done}/{total} patients done. Captures in {self.directory}"]
+        for position, error in sorted(self.state["failed"].items(), key=lambda item: int(item[0])):
+            lines.append(f"Patient {position} failed: {error}")
+        remaining = self.remaining()
+        if remaining:
+            lines.append(f"Run again with run_id '{self.run_id}' to resume at patient {remaining[0]}")
+        return "\n".join(lines)
@@ -0,0 +1,158 @@
+"""
+Change Detection
+
+Keeps the last grayscale frame per screen section and diffs new grabs against it
+with NumPy, so callers can tell whether a section changed (and where) without
+sending a screenshot to the LLM.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from catalog import Region
+
+Box = Tuple[int, int, int, int]  # left, top, right, bottom in screen coordinates
+
+# ITU-R 601 luma, integer weights summing to 1024
+LUMA_WEIGHTS = np.array([306, 601, 117], dtype=np.uint32)
+
+class ChangeReport(NamedTuple):
+    """Result of diffing one section against its previous frame"""
+    changed: bool
+    changed_fraction: float
+    boxes: List[Box]
+    changed_tiles: int
+    total_tiles: int
+    first_frame: bool
+
+    def as_dict(self) -> dict:
+        return {
+            "changed": self.changed,
+            "changed_fraction": round(self.changed_fraction, 6),
+            "boxes": [list(box) for box in self.boxes],
+            "changed_tiles": self.changed_tiles,
+            "total_tiles": self.total_tiles,
+            "first_frame": self.first_frame,
+        }
+
+def to_gray(image) -> np.ndarray:
+    """Grayscale uint8 array for a PIL image or an existing array"""
+    if isinstance(image, np.ndarray):
+        if image.ndim == 3:
+            return (np.dot(image[..., :3], LUMA_WEIGHTS) >> 10).astype(np.uint8)
+        return image
+    return np.asarray(image.convert("L"))
+
+def diff_mask(previous: np.ndarray, current: np.ndarray, threshold: int) -> np.ndarray:
+    """Boolean mask of pixels whose gray level moved by more than `threshold`"""
+    return (np.maximum(previous, current) - np.minimum(previous, current)) > threshold
+
+def tile_map(mask: np.ndarray, tile_size: int) -> np.ndarray:
+    """Boolean grid with one cell per tile_size x tile_size tile, True where any pixel changed"""
+    height, width = mask.shape
+    rows = -(-height // tile_size)
+    cols = -(-width // tile_size)
+    padded = np.zeros((rows * tile_size, cols * tile_size), dtype=bool)
+    padded[:height, :width] = mask
+    return padded.reshape(rows, tile_size, cols, tile_size).any(axis=(1, 3))
+
+def tile_boxes(tiles: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """Bounding boxes (row0, col0, row1, col1), exclusive ends, of 8-connected groups of changed tiles"""
+    rows, cols = tiles.shape
+    seen = np.zeros_like(tiles)
+    boxes = []
+    for start in zip(*np.nonzero(tiles)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        queue = deque([start])
+        r0, c0, r1, c1 = start[0], start[1], start[0], start[1]
+        while queue:
+            r, c = queue.popleft()
+            r0, c0, r1, c1 = min(r0, r), min(c0, c), max(r1, r), max(c1, c)
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    nr, nc = r + dr, c + dc
+                    if 0 <= nr < rows and 0 <= nc < cols and tiles[nr, nc] and not seen[nr, nc]:
+                        seen[nr, nc] = True
+                        queue.append((nr, nc))
+        boxes.append((int(r0), int(c0), int(r1) + 1, int(c1) + 1))
+    return boxes
+
+class ChangeDetector:
+    """Per-key frame store and differ. Keys are usually screen section names"""
+
+    def __init__(self, threshold: int = 16, tile_size: int = 32, min_fraction: float = 0.0):
+        self.threshold = threshold
+        self.tile_size = tile_size
+        self.min_fraction = min_fraction
+        self._frames: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def reset(self, key: Optional[str] = None):
+        """Forget the stored frame for `key`, or for every key"""
+        with self._lock:
+            if key is None:
+                self._frames.clear()
+            else:
+                self._frames.pop(key, None)
+
+    def compare(self, key: str, image, region: Optional[Region] = None,
+                threshold: Optional[int] = None, tile_size: Optional[int] = None,
+                min_fraction: Optional[float] = None) -> ChangeReport:
+        """
+        Diff `image` against the last frame stored under `key`, then store it.
+        The section counts as changed when more than `min_fraction` of its
+        pixels moved by more than `threshold` gray levels.
+
+        Boxes are mapped back to screen coordinates when `region` is given; on
+        Retina displays the grab is larger than the logical region and boxes are
+        scaled down accordingly.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        tile_size = self.tile_size if tile_size is None else tile_size
+        min_fraction = self.min_fraction if min_fraction is None else min_fraction
+        current = to_gray(image)
+
+        with self._lock:
+            previous = self._frames.get(key)
+            self._frames[key] = current
+
+        rows = -(-current.shape[0] // tile_size)
+        cols = -(-current.shape[1] // tile_size)
+        if previous is None or previous.shape != current.shape:
+            box = (0, 0, current.shape[1], current.shape[0])
+            return ChangeReport(True, 1.0, [self._to_screen(box, current, region)], rows * cols, rows * cols, previous is None)
+
+        mask = diff_mask(previous, current, threshold)
+        changed_pixels = int(np.count_nonzero(mask))
+        fraction = changed_pixels / mask.size
+        if not changed_pixels or fraction <= min_fraction:
+            return ChangeReport(False, fraction, [], 0, rows * cols, False)
+
+        tiles = tile_map(mask, tile_size)
+        boxes = []
+        for r0, c0, r1, c1 in tile_boxes(tiles):
+            # Tighten each tile group to the changed pixels inside it
+            ys, xs = np.nonzero(mask[r0 * tile_size:r1 * tile_size, c0 * tile_size:c1 * tile_size])
+            box = (c0 * tile_size + int(xs.min()), r0 * tile_size + int(ys.min()),
+                   c0 * tile_size + int(xs.max()) + 1, r0 * tile_size + int(ys.max()) + 1)
+            boxes.append(self._to_screen(box, current, region))
+
+        return ChangeReport(True, fraction, boxes, int(np.count_nonzero(tiles)), rows * cols, False)
+
+    @staticmethod
+    def _to_screen(box: Box, frame: np.ndarray, region: Optional[Region]) -> Box:
+        if region is None or not region.width:
+            return box
+        scale = frame.shape[1] / region.width
+        left, top, right, bottom = box
+        return (
+            region.left_x + int(left / scale),
+            region.upper_y + int(top / scale),
+            region.left_x + int(-(-right // scale)),
+            region.upper_y + int(-(-bottom // scale)),
+        )
@@ -0,0 +1,59 @@
+"""
+Clipboard Access
+
+Reading what a ctrl+c in the Citrix session put on the host clipboard. The
+backend is chosen like the input backend: pbcopy/pbpaste on macOS, xclip on Linux,
+or any object with read()/write() installed with set_clipboard (the simulator does
+this).
+"""
+
+import platform
+import shutil
+import subprocess
+from typing import Optional
+
+class CommandClipboard:
+    """Clipboard driven by a pair of copy/paste commands"""
+
+    def __init__(self, copy_command, paste_command):
+        self.copy_command = list(copy_command)
+        self.paste_command = list(paste_command)
+
+    def read(self) -> str:
+        return subprocess.run(self.paste_command, capture_output=True, check=True).stdout.decode("utf-8", "replace")
+
+    def write(self, text: str):
+        subprocess.run(self.copy_command, input=text.encode("utf-8"), check=True)
+
+class MemoryClipboard:
+    """In-process clipboard for tests"""
+
+    def __init__(self, text: str = ""):
+        self.text = text
+
+    def read(self) -> str:
+        return self.text
+
+    def write(self, text: str):
+        self.text = text
+
+def default_clipboard():
+    if platform.system() == "Darwin":
+        return CommandClipboard(["pbcopy"], ["pbpaste"])
+    if shutil.which("xclip"):
+        return CommandClipboard(["xclip", "-selection", "clipboard"], ["xclip", "-selection", "clipboard", "-o"])
+    raise RuntimeError("No clipboard available (needs pbcopy/pbpaste or xclip)")
+
+_clipboard = None
+
+def get_clipboard():
+    """The process-wide clipboard, created on first use"""
+    global _clipboard
+    if _clipboard is None:
+        _clipboard = default_clipboard()
+    return _clipboard
+
+def set_clipboard(clipboard: Optional[object]):
+    """Replace the clipboard (None restores the default)"""
+    global _clipboard
+    _clipboard = clipboard
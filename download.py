@@ -8,20 +8,31 @@ import platform
 from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright
 
+from session import StorefrontSession
+
+APP_NAME = "Powerchart P275 TRUM_MO"
+APP_LINK = f'a:has-text("{APP_NAME}")'
+
 def download_powerchart_ica(
     username=None, 
     password=None, 
     download_path=None, 
-    headless=True
+    headless=True,
+    reuse_session=True,
 ):
     """
     Downloads and opens the PowerChart ICA file from Cerner
     
+    A login is saved as Playwright storage state and reused by later runs until
+    StoreFront stops accepting it, and an ICA file downloaded moments ago that was
+    never launched is opened again instead of downloading a new one.
+    
     Args:
         username: Optional username (falls back to env variable)
         password: Optional password (falls back to env variable)
         download_path: Optional custom download path
         headless: Whether to run browser in headless mode (default: True)
+        reuse_session: Reuse the saved login and a fresh ICA file (default: True)
     
     Returns:
         Path to the downloaded file
@@ -38,6 +49,17 @@ def download_powerchart_ica(
         print(f"Working directory: {os.getcwd()}")
     
     try:
+        base_url = os.environ.get("CERNER_BASE_URL", "https://trummo.cernerworks.com/Citrix/ProdWeb/")
+        session = StorefrontSession(base_url)
+        
+        if reuse_session:
+            ica_path = session.reusable_ica()
+            if ica_path:
+                print(f"Reusing ICA file downloaded moments ago: {ica_path}")
+                if open_ica_file(ica_path):
+                    session.mark_ica_launched()
+                return ica_path
+        
         # Get credentials from parameters or environment variables
         user_creds = username or os.environ.get("CERNER_USERNAME")
         pass_creds = password or os.environ.get("CERNER_PASSWORD")
@@ -68,38 +90,53 @@ def download_powerchart_ica(
             downloaded_path = ""
             
             try:
-                # Create new context and page
-                context = browser.new_context(accept_downloads=True)
+                # Create new context and page, logged in already if the saved state is still good
+                state = session.saved_state() if reuse_session else None
+                print("Restoring saved login state" if state else "No usable saved login state")
+                context = browser.new_context(accept_downloads=True, storage_state=state)
                 page = context.new_page()
                 print("Browser page created")
 
-                # Navigate to login page
-                base_url = os.environ.get("CERNER_BASE_URL", "https://trummo.cernerworks.com/Citrix/ProdWeb/")
+                # Navigate to the StoreFront page
                 print(f"Navigating to Cerner login page at {base_url}...")
                 page.goto(base_url)
                 print("Login page loaded")
 
-                # Fill in credentials
-                print("Filling in credentials...")
-                page.get_by_role("textbox", name="User name:").fill(user_creds)
-                page.get_by_role("textbox", name="User name:").press("Tab")
-                page.get_by_role("textbox", name="Password:").fill(pass_creds)
+                # Whichever shows up first: the app list (still logged in) or the login form
+                app_link = page.locator(APP_LINK)
+                username_box = page.get_by_role("textbox", name="User name:")
+                app_link.or_(username_box).first.wait_for()
+                
+                if not app_link.first.is_visible():
+                    if state:
+                        print("Saved login has expired")
+                        session.discard_state()
+                    
+                    # Fill in credentials
+                    print("Filling in credentials...")
+                    username_box.fill(user_creds)
+                    username_box.press("Tab")
+                    page.get_by_role("textbox", name="Password:").fill(pass_creds)
 
-                # Log in
-                print("Logging in...")
-                page.get_by_role("link", name="Log On").click()
-                print("Login submitted")
+                    # Log in
+                    print("Logging in...")
+                    page.get_by_role("link", name="Log On").click()
+                    print("Login submitted")
 
-                # Wait for download to be triggered by button click
-                print("Waiting for PowerChart link to appear...")
-                page.wait_for_selector('a:has-text("Powerchart P275 TRUM_MO")')
+                    # Wait for the app list
+                    print("Waiting for PowerChart link to appear...")
+                    page.wait_for_selector(APP_LINK)
+                    session.save_state(context)
+                    print("Login state saved for the next run")
+                else:
+                    print("Still logged in, skipping login")
                 
                 # Set up download handler
                 print("Setting up download handler...")
                 with page.expect_download() as download_info:
                     # Click the PowerChart app link
                     print("Clicking PowerChart link...")
-                    page.get_by_role("link", name="Powerchart P275 TRUM_MO Powerchart P275 TRUM_MO").click()
+                    app_link.first.click()
                     print("PowerChart link clicked")
                 
                 # Wait for the download to complete
@@ -110,6 +147,7 @@ def download_powerchart_ica(
                 # Save the file
                 download.save_as(file_path)
                 downloaded_path = file_path
+                session.record_ica(file_path)
                 
                 print(f"Download completed successfully to: {file_path}")
                 
@@ -125,7 +163,8 @@ def download_powerchart_ica(
         # Open the file if download was successful
         if downloaded_path:
             print("Attempting to open ICA file...")
-            open_ica_file(downloaded_path)
+            if open_ica_file(downloaded_path):
+                session.mark_ica_launched()
         
         return downloaded_path
     
@@ -139,6 +178,9 @@ def open_ica_file(file_path):
     
     Args:
         file_path: Path to the ICA file
+    
+    Returns:
+        True if the file was handed to Citrix Workspace
     """
     print("Opening ICA file with system default application")
     
@@ -149,6 +191,7 @@ def open_ica_file(file_path):
         try:
             subprocess.run(["open", file_path], check=True)
             print("ICA file opened successfully")
+            return True
         except subprocess.CalledProcessError as e:
             print(f"Failed to open ICA file: {e}")
     
@@ -158,11 +201,13 @@ def open_ica_file(file_path):
             # Windows-specific function to open a file with its associated application
             os.startfile(file_path)
             print("ICA file opened successfully")
+            return True
         except Exception as e:
             print(f"Failed to open ICA file: {e}")
     
     else:  # Linux or other OS
         print(f"Detected other OS ({system}). ICA file downloaded to: {file_path}. Please open it manually.")
+    return False
 
 if __name__ == "__main__":
     try:
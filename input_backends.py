@@ -0,0 +1,321 @@
+"""
+Input Backends
+
+Mouse and keyboard drivers for PowerChart automation. Every backend accepts a
+batch of input ops and sends the whole run in as few invocations as it can, so a
+double click or a run of scroll clicks costs one process start (cliclick) or no
+process start at all (pyautogui, recording).
+"""
+
+import os
+import platform
+import subprocess
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from metrics import METRICS
+
+CLICLICK_PATH = "/opt/homebrew/bin/cliclick"
+
+# ===================================
+# Input Ops
+# ===================================
+
+class InputOp(NamedTuple):
+    """A single mouse/keyboard action. `value` holds keys, text or a wait in seconds"""
+    kind: str
+    x: Optional[int] = None
+    y: Optional[int] = None
+    value: object = None
+
+OP_KINDS = ("click", "double_click", "move", "mouse_down", "mouse_up", "key", "hotkey", "type", "wait")
+
+def click(x: int, y: int) -> InputOp:
+    return InputOp("click", x, y)
+
+def double_click(x: int, y: int) -> InputOp:
+    return InputOp("double_click", x, y)
+
+def move(x: int, y: int) -> InputOp:
+    return InputOp("move", x, y)
+
+def mouse_down(x: int, y: int) -> InputOp:
+    return InputOp("mouse_down", x, y)
+
+def mouse_up(x: int, y: int) -> InputOp:
+    return InputOp("mouse_up", x, y)
+
+def key(name: str) -> InputOp:
+    """Press and release a named key, e.g. "tab", "enter", "esc", "down" """
+    return InputOp("key", value=name)
+
+def hotkey(*keys: str) -> InputOp:
+    """Press keys together, modifiers first, e.g. hotkey("ctrl", "a")"""
+    return InputOp("hotkey", value=tuple(keys))
+
+def type_text(text: str) -> InputOp:
+    return InputOp("type", value=text)
+
+def wait(seconds: float) -> InputOp:
+    return InputOp("wait", value=seconds)
+
+def click_ops(x: int, y: int, clicks: int = 1, interval: float = 0.0) -> List[InputOp]:
+    """Ops for `clicks` single clicks at one point, `interval` seconds apart"""
+    ops = []
+    for i in range(clicks):
+        if i and interval:
+            ops.append(wait(interval))
+        ops.append(click(x, y))
+    return ops
+
+# ===================================
+# Latency Accounting
+# ===================================
+
+class LatencyStats:
+    """Running per-batch and per-op latency for one backend, excluding explicit waits"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.batches = 0
+            self.ops = 0
+            self.active_seconds = 0.0
+            self.wait_seconds = 0.0
+            self.max_batch_seconds = 0.0
+
+    def record(self, op_count: int, active: float, waited: float):
+        with self._lock:
+            self.batches += 1
+            self.ops += op_count
+            self.active_seconds += active
+            self.wait_seconds += waited
+            self.max_batch_seconds = max(self.max_batch_seconds, active)
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "ops": self.ops,
+                "active_seconds": round(self.active_seconds, 6),
+                "wait_seconds": round(self.wait_seconds, 6),
+                "mean_batch_ms": round(self.active_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+                "mean_op_ms": round(self.active_seconds / self.ops * 1000, 3) if self.ops else 0.0,
+                "max_batch_ms": round(self.max_batch_seconds * 1000, 3),
+            }
+
+# ===================================
+# Backends
+# ===================================
+
+class InputBackend:
+    """Base class for input drivers. Subclasses implement `_execute`"""
+
+    name = "base"
+
+    def __init__(self):
+        self.stats = LatencyStats()
+
+    def run(self, ops: Sequence[InputOp]) -> float:
+        """Send a batch of ops and return the elapsed wall time in seconds"""
+        ops = list(ops)
+        if not ops:
+            return 0.0
+        for op in ops:
+            if op.kind not in OP_KINDS:
+                raise ValueError(f"Unknown input op '{op.kind}'")
+
+        start = time.perf_counter()
+        self._execute(ops)
+        elapsed = time.perf_counter() - start
+
+        waited = sum(float(op.value) for op in ops if op.kind == "wait")
+        input_ops = sum(1 for op in ops if op.kind != "wait")
+        self.stats.record(input_ops, max(elapsed - waited, 0.0), waited)
+        METRICS.record(f"input.{self.name}", start, elapsed, ops=input_ops, wait_ms=round(waited * 1000))
+        METRICS.count("input.ops", input_ops)
+        return elapsed
+
+    def click(self, x: int, y: int, clicks: int = 1, interval: float = 0.0) -> float:
+        return self.run(click_ops(x, y, clicks, interval))
+
+    def _execute(self, ops: List[InputOp]):
+        raise NotImplementedError
+
+    def warmup(self):
+        """Load the driver ahead of the first batch"""
+
+    def close(self):
+        """Release any long-lived driver resources"""
+
+class CliclickBackend(InputBackend):
+    """macOS driver that sends a whole batch as one cliclick invocation"""
+
+    name = "cliclick"
+
+    KEY_NAMES = {
+        "enter": "return", "return": "return", "tab": "tab", "esc": "esc", "escape": "esc",
+        "space": "space", "delete": "delete", "backspace": "delete",
+        "up": "arrow-up", "down": "arrow-down", "left": "arrow-left", "right": "arrow-right",
+        "home": "home", "end": "end", "pageup": "page-up", "pagedown": "page-down",
+    }
+    MODIFIERS = {"ctrl": "ctrl", "control": "ctrl", "cmd": "cmd", "command": "cmd",
+                 "alt": "alt", "option": "alt", "shift": "shift", "fn": "fn"}
+
+    def __init__(self, path: str = CLICLICK_PATH):
+        super().__init__()
+        self.path = path
+
+    def commands(self, ops: Sequence[InputOp]) -> List[str]:
+        """Translate ops into cliclick command arguments"""
+        commands = []
+        for op in ops:
+            if op.kind == "click":
+                commands.append(f"c:{op.x},{op.y}")
+            elif op.kind == "double_click":
+                commands.append(f"dc:{op.x},{op.y}")
+            elif op.kind == "move":
+                commands.append(f"m:{op.x},{op.y}")
+            elif op.kind == "mouse_down":
+                commands.append(f"dd:{op.x},{op.y}")
+            elif op.kind == "mouse_up":
+                commands.append(f"du:{op.x},{op.y}")
+            elif op.kind == "key":
+                commands.append(f"kp:{self.KEY_NAMES.get(op.value, op.value)}")
+            elif op.kind == "hotkey":
+                modifiers = [self.MODIFIERS[k] for k in op.value if k in self.MODIFIERS]
+                keys = [k for k in op.value if k not in self.MODIFIERS]
+                if modifiers:
+                    commands.append("kd:" + ",".join(modifiers))
+                for k in keys:
+                    commands.append(f"kp:{self.KEY_NAMES[k]}" if k in self.KEY_NAMES else f"t:{k}")
+                if modifiers:
+                    commands.append("ku:" + ",".join(modifiers))
+            elif op.kind == "type":
+                commands.append(f"t:{op.value}")
+            elif op.kind == "wait":
+                commands.append(f"w:{int(round(float(op.value) * 1000))}")
+        return commands
+
+    def _execute(self, ops: List[InputOp]):
+        subprocess.run([self.path] + self.commands(ops))
+
+class PyAutoGUIBackend(InputBackend):
+    """In-process driver; pyautogui is imported once and kept for the server's lifetime"""
+
+    name = "pyautogui"
+
+    def __init__(self, pause: Optional[float] = None):
+        super().__init__()
+        self.pause = pause
+        self._pyautogui = None
+
+    @property
+    def driver(self):
+        if self._pyautogui is None:
+            import pyautogui
+            if self.pause is not None:
+                pyautogui.PAUSE = self.pause
+            self._pyautogui = pyautogui
+        return self._pyautogui
+
+    def warmup(self):
+        self.driver
+
+    def _execute(self, ops: List[InputOp]):
+        gui = self.driver
+        for op in ops:
+            if op.kind == "click":
+                gui.click(x=op.x, y=op.y)
+            elif op.kind == "double_click":
+                gui.doubleClick(x=op.x, y=op.y)
+            elif op.kind == "move":
+                gui.moveTo(op.x, op.y)
+            elif op.kind == "mouse_down":
+                gui.mouseDown(x=op.x, y=op.y)
+            elif op.kind == "mouse_up":
+                gui.mouseUp(x=op.x, y=op.y)
+            elif op.kind == "key":
+                gui.press(op.value)
+            elif op.kind == "hotkey":
+                gui.hotkey(*op.value)
+            elif op.kind == "type":
+                gui.write(op.value)
+            elif op.kind == "wait":
+                time.sleep(float(op.value))
+
+class RecordingBackend(InputBackend):
+    """Fake backend for tests and benchmarks; records every batch instead of touching the screen"""
+
+    name = "recording"
+
+    def __init__(self, honor_waits: bool = False):
+        super().__init__()
+        self.honor_waits = honor_waits
+        self.batches: List[List[InputOp]] = []
+
+    @property
+    def ops(self) -> List[InputOp]:
+        return [op for batch in self.batches for op in batch]
+
+    @property
+    def clicks(self) -> List[Tuple[int, int]]:
+        return [(op.x, op.y) for op in self.ops if op.kind in ("click", "double_click")]
+
+    def _execute(self, ops: List[InputOp]):
+        self.batches.append(list(ops))
+        if self.honor_waits:
+            for op in ops:
+                if op.kind == "wait":
+                    time.sleep(float(op.value))
+
+    def clear(self):
+        self.batches.clear()
+        self.stats.reset()
+
+# ===================================
+# Backend Selection
+# ===================================
+
+BACKENDS = {
+    "cliclick": CliclickBackend,
+    "pyautogui": PyAutoGUIBackend,
+    "recording": RecordingBackend,
+}
+
+_backend: Optional[InputBackend] = None
+_backend_lock = threading.Lock()
+
+def default_backend_name() -> str:
+    """POWERCHART_INPUT_BACKEND if set, else cliclick on macOS when installed, else pyautogui"""
+    name = os.environ.get("POWERCHART_INPUT_BACKEND")
+    if name:
+        return name
+    if platform.system() == "Darwin" and os.path.exists(CLICLICK_PATH):
+        return "cliclick"
+    return "pyautogui"
+
+def create_backend(name: str) -> InputBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend '{name}'. Available: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+def get_backend() -> InputBackend:
+    """The process-wide input backend, created on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(default_backend_name())
+    return _backend
+
+def set_backend(backend: InputBackend) -> InputBackend:
+    """Replace the process-wide backend (e.g. with a RecordingBackend) and return the old one"""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    return previous
@@ -0,0 +1,242 @@
+"""
+Template Locator
+
+coordinates.json holds absolute points for one display layout. When the window
+shifts (a SmartZone hidden, a toolbar collapsed), every click in that part of the
+screen misses. The locator finds an element from a small reference crop instead:
+
+- `save_template` grabs a square around the element's stored point and keeps it
+  as <root>/<section>/<element>.png
+- `resolve` grabs a region of interest around the stored point, finds the crop in
+  it by normalized cross-correlation (FFT correlation plus integral-image window
+  statistics, all in NumPy), and returns the point moved by the offset found
+
+The offset is cached per element, so after the first lookup a resolve only grabs
+the template-sized window at the cached spot and checks it still matches; when it
+doesn't, the element has moved again and the full region is searched. The fact that a template wasn't found is only kept for a few seconds:
+the element may just not be drawn yet. Elements without a template, or whose
+template isn't found confidently, resolve to their stored point.
+"""
+
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from catalog import Point, Region
+from metrics import METRICS
+
+class Match(NamedTuple):
+    x: int  # Where the element is now, in screen coordinates
+    y: int
+    dx: int  # Offset from the stored point
+    dy: int
+    score: float  # Normalized cross-correlation, 1.0 = identical
+    cached: bool
+
+    def as_dict(self) -> dict:
+        return {"x": self.x, "y": self.y, "dx": self.dx, "dy": self.dy,
+                "score": round(self.score, 3), "cached": self.cached}
+
+# ===================================
+# Matching
+# ===================================
+
+def to_gray(image) -> np.ndarray:
+    return np.asarray(image.convert("L"), dtype=np.float64)
+
+def _window_sums(image: np.ndarray, height: int, width: int) -> np.ndarray:
+    """Sum over every height x width window, from an integral image"""
+    integral = np.zeros((image.shape[0] + 1, image.shape[1] + 1))
+    integral[1:, 1:] = image.cumsum(axis=0).cumsum(axis=1)
+    return (integral[height:, width:] - integral[:-height, width:]
+            - integral[height:, :-width] + integral[:-height, :-width])
+
+def match_template(image: np.ndarray, template: np.ndarray) -> Tuple[int, int, float]:
+    """
+    Best placement of `template` in `image` by normalized cross-correlation.
+
+    Returns:
+        (left, top, score) of the best window; score is in [-1, 1] and 0 for a flat template
+    """
+    ih, iw = image.shape
+    th, tw = template.shape
+    if th > ih or tw > iw:
+        raise ValueError("template is larger than the search region")
+    t = template - template.mean()
+    t_norm = np.sqrt((t * t).sum())
+    if t_norm == 0:
+        return 0, 0, 0.0
+
+    # Correlation of every window with the zero-mean template, via one FFT product
+    shape = (ih + th - 1, iw + tw - 1)
+    spectrum = np.fft.rfft2(image, shape) * np.fft.rfft2(t[::-1, ::-1], shape)
+    correlation = np.fft.irfft2(spectrum, shape)[th - 1:ih, tw - 1:iw]
+
+    # Each window's standard deviation (times its size) from integral images
+    n = th * tw
+    sums = _window_sums(image, th, tw)
+    variance = np.maximum(_window_sums(image * image, th, tw) - sums * sums / n, 0)
+    denominator = np.sqrt(variance) * t_norm
+    scores = np.where(denominator > 1e-6 * t_norm, correlation / np.maximum(denominator, 1e-12), 0)
+
+    top, left = np.unravel_index(int(np.argmax(scores)), scores.shape)
+    return int(left), int(top), float(scores[top, left])
+
+# ===================================
+# Locator
+# ===================================
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_") or "_"
+
+class Locator:
+    """
+    Resolves element points against reference crops.
+
+    Args:
+        root: Directory of templates
+        grab: Grabs a screen region as a PIL image
+        search_radius: How far (logical pixels) from the stored point to search
+        threshold: Lowest correlation score accepted as a match
+        miss_ttl: Seconds a template that wasn't found stays unsearched
+    """
+
+    def __init__(self, root: Path, grab: Callable[[Region], object], search_radius: int = 150, threshold: float = 0.8,
+                 miss_ttl: float = 5.0):
+        self.root = Path(root)
+        self.grab = grab
+        self.search_radius = search_radius
+        self.threshold = threshold
+        self.miss_ttl = miss_ttl
+        self._templates: Dict[Path, Tuple[float, np.ndarray]] = {}  # path -> (mtime, pixels)
+        self._offsets: Dict[tuple, Tuple[int, int, float]] = {}  # element key -> (dx, dy, screen scale)
+        self._misses: Dict[tuple, float] = {}  # element key -> monotonic time it wasn't found
+        self._lock = threading.Lock()
+
+    def template_path(self, point: Point) -> Path:
+        directory = self.root / _slug(point.section or "_")
+        if point.subsection:
+            directory = directory / _slug(point.subsection)
+        return directory / f"{_slug(point.name)}.png"
+
+    def has_template(self, point: Point) -> bool:
+        return self.template_path(point).exists()
+
+    def save_template(self, point: Point, size: int = 48) -> Path:
+        """Grab a size x size square centered on the element's stored point and keep it as its template"""
+        half = size // 2
+        image = self.grab(Region(point.x - half, point.y - half, point.x - half + size, point.y - half + size, "template"))
+        path = self.template_path(point)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        image.convert("L").save(path, format="PNG")
+        self.forget(point)
+        return path
+
+    def _template(self, point: Point) -> Optional[np.ndarray]:
+        """The element's template as grayscale pixels, reloaded when the file changes"""
+        path = self.template_path(point)
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._templates.get(path)
+        if cached is None or cached[0] != mtime:
+            from PIL import Image
+
+            with Image.open(path) as image:
+                cached = (mtime, to_gray(image))
+            with self._lock:
+                self._templates[path] = cached
+        return cached[1]
+
+    def locate(self, point: Point, use_cache: bool = True) -> Optional[Match]:
+        """Find the element on screen; None if it has no template or the template isn't found"""
+        key = (point.section, point.subsection, point.name)
+        if use_cache:
+            with self._lock:
+                offset = self._offsets.get(key)
+                missed = self._misses.get(key)
+            if offset is not None:
+                match = self._recheck(point, offset)
+                if match is not None:
+                    METRICS.count("locator.cache_hits")
+                    return match
+                METRICS.count("locator.cache_stale")
+            elif missed is not None and time.monotonic() - missed < self.miss_ttl:
+                METRICS.count("locator.cache_hits")
+                return None
+
+        template = self._template(point)
+        if template is None:
+            return None
+
+        with METRICS.timed("locator.match", element=point.name):
+            radius = self.search_radius
+            area = Region(max(point.x - radius, 0), max(point.y - radius, 0), point.x + radius, point.y + radius, "locator")
+            roi = self.grab(area)
+            scale = roi.width / area.width  # 2 on Retina displays
+            left, top, score = match_template(to_gray(roi), template)
+
+        if score < self.threshold:
+            METRICS.count("locator.misses")
+            with self._lock:
+                self._offsets.pop(key, None)
+                self._misses[key] = time.monotonic()
+            return None
+        # Center of the best window, back in logical screen coordinates
+        x = round(area.left_x + (left + template.shape[1] / 2) / scale)
+        y = round(area.upper_y + (top + template.shape[0] / 2) / scale)
+        dx, dy = x - point.x, y - point.y
+        with self._lock:
+            self._offsets[key] = (dx, dy, scale)
+            self._misses.pop(key, None)
+        return Match(x, y, dx, dy, score, False)
+
+    def _recheck(self, point: Point, offset: Tuple[int, int, float]) -> Optional[Match]:
+        """Score the template against one window (plus a pixel of slack) at the cached offset"""
+        template = self._template(point)
+        if template is None:
+            return None
+        dx, dy, scale = offset
+        x, y = point.x + dx, point.y + dy
+        half_w, half_h = template.shape[1] / scale / 2, template.shape[0] / scale / 2
+        window = Region(max(int(x - half_w) - 1, 0), max(int(y - half_h) - 1, 0),
+                        int(x + half_w) + 2, int(y + half_h) + 2, "locator")
+        with METRICS.timed("locator.recheck", element=point.name):
+            try:
+                _, _, score = match_template(to_gray(self.grab(window)), template)
+            except ValueError:
+                return None  # Window clipped at the screen edge; search again
+        if score < self.threshold:
+            with self._lock:
+                self._offsets.pop((point.section, point.subsection, point.name), None)
+            return None
+        return Match(x, y, dx, dy, score, True)
+
+    def resolve(self, point: Point) -> Point:
+        """The element's current point, or its stored point when it can't be located"""
+        try:
+            match = self.locate(point)
+        except Exception as e:
+            print(f"Locator failed for '{point.name}', using the stored point: {e}", file=sys.stderr)
+            return point
+        if match is None or (match.dx == 0 and match.dy == 0):
+            return point
+        return point._replace(x=match.x, y=match.y)
+
+    def forget(self, point: Optional[Point] = None):
+        """Drop the cached offset of one element, or of every element"""
+        with self._lock:
+            if point is None:
+                self._offsets.clear()
+                self._misses.clear()
+            else:
+                key = (point.section, point.subsection, point.name)
+                self._offsets.pop(key, None)
+                self._misses.pop(key, None)
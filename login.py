@@ -7,68 +7,98 @@ import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
-def wait_for_apps(app_names):
+from process_monitor import MONITOR
+
+def wait_for_apps(app_names, timeout=40):
     """
     Waits for specified applications to be running
     
+    Checks every app against one process-table snapshot per poll, polling quickly
+    at first and backing off to once a second.
+    
     Args:
         app_names: List of application names to wait for
+        timeout: Seconds to wait at most
     
     Returns:
         True when all apps are running
     """
     print(f"Waiting for applications to be running: {', '.join(app_names)}")
     
-    def is_app_running(app_name):
-        """Check if an app is running on the current platform"""
-        try:
-            system = platform.system()
-            if system == "Darwin":  # macOS
-                script = f'tell application "System Events" to count processes whose name is "{app_name}"'
-                result = subprocess.run(['osascript', '-e', script], 
-                                        capture_output=True, text=True, check=True)
-                return int(result.stdout.strip()) > 0
-            
-            elif system == "Windows":  # Windows
-                result = subprocess.run(f'tasklist /FI "IMAGENAME eq {app_name}.exe" /NH', 
-                                      shell=True, capture_output=True, text=True, check=False)
-                return 'No tasks' not in result.stdout
-            
-            else:
-                print(f"Platform {system} is not supported for app detection.")
-                return False
-                
-        except Exception as error:
-            print(f"Error checking if {app_name} is running: {error}")
-            return False
+    reported = {}
+    def report(status):
+        """Print an app's state when it changes"""
+        for app, running in status.items():
+            if reported.get(app) != running:
+                print(f"{app}: {'Running' if running else 'Not running'}")
+                reported[app] = running
     
-    def check_apps():
-        """Check status of all apps"""
-        statuses = []
-        for app in app_names:
-            running = is_app_running(app)
-            print(f"{app}: {'Running' if running else 'Not running'}")
-            statuses.append({"app": app, "running": running})
-        
-        # Return True only if all apps are running
-        return all(status["running"] for status in statuses)
+    start = time.monotonic()
+    if not MONITOR.wait_for(app_names, timeout=timeout, on_poll=report):
+        raise Exception(f"Timed out waiting for applications to launch: {', '.join(app_names)}")
     
-    # Poll until all apps are running
-    all_running = check_apps()
-    attempts = 1
-    max_attempts = 40  # 40 seconds with 1-second intervals
+    print(f"All required applications are now running! ({time.monotonic() - start:.1f} s)")
+    return True
+
+def login_window_ready(app_name):
+    """
+    Checks whether the app's login window is up
     
-    while not all_running and attempts < max_attempts:
-        print(f"Attempt {attempts}/{max_attempts}: Not all apps running yet. Checking again in 1 second...")
-        time.sleep(1)  # Wait 1 second
-        all_running = check_apps()
-        attempts += 1
+    Args:
+        app_name: Process that shows the Cerner security login window
     
-    if not all_running:
-        raise Exception(f"Timed out waiting for applications to launch: {', '.join(app_names)}")
+    Returns:
+        True or False, or None when the platform can't tell
+    """
+    system = platform.system()
+    if system == "Darwin":  # macOS
+        script = f'tell application "System Events" to count windows of process "{app_name}"'
+        result = subprocess.run(['osascript', '-e', script], capture_output=True, text=True, check=False)
+        return result.returncode == 0 and result.stdout.strip().isdigit() and int(result.stdout.strip()) > 0
     
-    print("All required applications are now running!")
-    return True
+    elif system == "Windows":  # Windows
+        script = '(Get-Process | Where-Object { $_.MainWindowTitle -match "Cerner Server Security" }).Count'
+        result = subprocess.run(['powershell', '-Command', script], capture_output=True, text=True, check=False)
+        return result.stdout.strip().isdigit() and int(result.stdout.strip()) > 0
+    
+    return None
+
+def wait_for_login_window(app_name, timeout=None, settle=None):
+    """
+    Waits until the login window is showing, instead of a fixed delay
+    
+    Polls quickly at first and backs off to once a second. Once the window is
+    up, waits `settle` seconds more for its fields to take keystrokes.
+    
+    Args:
+        app_name: Process that shows the Cerner security login window
+        timeout: Seconds to wait at most (POWERCHART_LOGIN_TIMEOUT, default 30)
+        settle: Seconds to wait after the window appears (POWERCHART_LOGIN_SETTLE, default 0.5)
+    
+    Returns:
+        True if the window was seen, False if the wait timed out or can't be done here
+    """
+    timeout = timeout if timeout is not None else float(os.environ.get("POWERCHART_LOGIN_TIMEOUT", "30"))
+    settle = settle if settle is not None else float(os.environ.get("POWERCHART_LOGIN_SETTLE", "0.5"))
+    start = time.monotonic()
+    interval = 0.1
+    
+    while True:
+        ready = login_window_ready(app_name)
+        if ready is None:
+            # No way to see windows on this platform: fall back to the old fixed delay
+            print("Cannot detect the login window on this platform, waiting 8 seconds...")
+            time.sleep(8)
+            return False
+        if ready:
+            print(f"Login window is up after {time.monotonic() - start:.1f} s")
+            time.sleep(settle)
+            return True
+        if time.monotonic() - start >= timeout:
+            print(f"Login window did not appear within {timeout:.0f} s, trying anyway")
+            return False
+        time.sleep(interval)
+        interval = min(interval * 1.5, 1.0)
 
 def login_to_powerchart():
     """
@@ -107,9 +137,8 @@ def login_to_powerchart():
         wait_for_apps(apps_to_wait_for)
         print("Required applications detected as running")
         
-        # Add a 8-second delay for margins as requested
-        print("Adding 8-second delay for margins...")
-        time.sleep(8)
+        # Wait for the login window itself rather than a fixed 8-second margin
+        wait_for_login_window('Citrix   Husk')
         
         system = platform.system()
         if system == "Darwin":  # macOS
@@ -0,0 +1,252 @@
+"""
+Macros
+
+A macro is a recorded run of tool calls (navigate_to, double_click_element,
+scroll_section, captures, wait_for_probes), saved by name and replayed as one
+tool call. Calls are stored as workflow steps, so a macro compiles with the
+workflow compiler. Each input call also keeps what it did to the screen while it
+was recorded: whether the screen changed, and which probes flipped to their
+expected color. The replay is then optimized:
+
+- a click on an element clicked earlier in the macro is dropped when it left
+  the screen unchanged while recorded; repeats that changed it (paging) are kept
+- back-to-back scrolls of one section in one direction become one scroll
+- input steps with nothing to render in between (the earlier call changed
+  nothing, or both are scrolls) go to the input backend as one batch
+- after a call that flipped a probe, the replay waits for that probe instead of
+  for the screen to settle, and drops a fixed wait that followed it
+- back-to-back captures share one screen grab, as in workflows
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from input_backends import wait
+from paths import write_atomic
+from workflows import CompileContext, Step, WorkflowError, WorkflowPlan, compile_step, merge_captures
+
+# Tool calls a macro can hold (the workflow actions of the same name)
+ACTIONS = ("navigate_to", "double_click_element", "scroll_section", "capture_screen_section",
+           "capture_sections", "capture_section_text", "wait", "wait_for_probes")
+
+CLICK_ACTIONS = ("navigate_to", "double_click_element")
+
+# Gap between two calls sent as one batch, the same spacing scroll clicks use
+BATCH_INTERVAL = 0.2
+
+# Timeout of the probe wait that replaces a settle wait
+PROBE_TIMEOUT = 5.0
+
+class MacroStats(NamedTuple):
+    """What optimization did to a macro"""
+    calls: int  # Calls recorded
+    dropped: int  # Repeated clicks, scrolls folded together and waits a probe wait replaced
+    batched: int  # Input steps joined onto the previous batch
+    probe_waits: int  # Settle waits replaced by probe waits
+    steps: int  # Steps in the compiled replay
+
+    def summary(self) -> str:
+        return (f"{self.calls} call(s) compile to {self.steps} step(s): {self.dropped} dropped, "
+                f"{self.batched} batched, {self.probe_waits} probe wait(s)")
+
+# ===================================
+# Recording
+# ===================================
+
+class MacroRecorder:
+    """Collects tool calls while a macro is being recorded; one recording at a time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.name: Optional[str] = None
+        self.description = ""
+        self.calls: List[Dict[str, Any]] = []
+
+    @property
+    def recording(self) -> bool:
+        return self.name is not None
+
+    def start(self, name: str, description: str = ""):
+        with self._lock:
+            if self.name is not None:
+                raise ValueError(f"already recording macro '{self.name}'")
+            self.name, self.description, self.calls = name, description, []
+
+    def record(self, action: str, params: Dict[str, Any], changed: Optional[bool] = None, probes: List[str] = ()):
+        """
+        Add a call to the recording (a no-op when not recording).
+
+        Args:
+            action: The tool called
+            params: Its arguments, as the workflow action of the same name takes them
+            changed: Whether the screen changed after an input call (None: not observed)
+            probes: Probes that flipped to their expected color during the call
+        """
+        with self._lock:
+            if self.name is None:
+                return
+            call = {"action": action, "params": {k: v for k, v in params.items() if v is not None}}
+            if changed is not None:
+                call["changed"] = changed
+            if probes:
+                call["probes"] = list(probes)
+            self.calls.append(call)
+
+    def stop(self) -> Tuple[str, Dict[str, Any]]:
+        """End the recording; returns (name, macro definition)"""
+        with self._lock:
+            if self.name is None:
+                raise ValueError("no macro is being recorded")
+            name = self.name
+            macro = {"description": self.description, "recorded": time.strftime("%Y-%m-%d %H:%M:%S"), "calls": self.calls}
+            self.name, self.description, self.calls = None, "", []
+        return name, macro
+
+# ===================================
+# Storage
+# ===================================
+
+class MacroStore:
+    """Macros by name in one JSON file"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _load(self, writing: bool = False) -> Dict[str, Any]:
+        """
+        The stored macros. An unreadable file reads as no macros; before a write replaces
+        it, a corrupt file is moved aside to macros.json.corrupt-<time> so nothing is lost.
+        """
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            if not writing:
+                print(f"Could not read macros from {self.path}, treating it as empty: {e}", file=sys.stderr)
+                return {}
+            aside = self.path.with_name(f"{self.path.name}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}")
+            os.replace(self.path, aside)
+            print(f"Could not read macros from {self.path}; moved it to {aside.name} and started a new file: {e}",
+                  file=sys.stderr)
+            return {}
+        except OSError as e:
+            if writing:
+                raise
+            print(f"Could not read macros from {self.path}, treating it as empty: {e}", file=sys.stderr)
+            return {}
+
+    def all(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._load()
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.all().get(name)
+
+    def save(self, name: str, macro: Dict[str, Any]):
+        with self._lock:
+            macros = self._load(writing=True)
+            macros[name] = macro
+            write_atomic(self.path, json.dumps(macros, indent=2).encode())
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            macros = self._load(writing=True)
+            if macros.pop(name, None) is None:
+                return False
+            write_atomic(self.path, json.dumps(macros, indent=2).encode())
+            return True
+
+# ===================================
+# Compilation
+# ===================================
+
+def simplify(calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop redundant clicks and fold back-to-back scrolls of one section in one direction"""
+    kept: List[Dict[str, Any]] = []
+    clicked = set()
+    for call in calls:
+        action, params = call["action"], call.get("params", {})
+        previous = kept[-1] if kept else None
+        if action in CLICK_ACTIONS:
+            key = (action, json.dumps(params, sort_keys=True))
+            # A click that changed the screen is kept even when it repeats ("next page" pages on)
+            if call.get("changed") is False and key in clicked:
+                continue
+            clicked.add(key)
+        if (action == "scroll_section" and previous is not None and previous["action"] == action
+                and {k: v for k, v in previous["params"].items() if k != "clicks"} == {k: v for k, v in params.items() if k != "clicks"}):
+            clicks = int(previous["params"].get("clicks", 1)) + int(params.get("clicks", 1))
+            kept[-1] = {**call, "params": {**params, "clicks": clicks}, "probes": call.get("probes", [])}
+            continue
+        kept.append(call)
+    return kept
+
+def compile_macro(context: CompileContext, name: str, macro: Dict[str, Any]) -> Tuple[WorkflowPlan, MacroStats]:
+    """
+    Compile a recorded macro into an optimized plan.
+
+    Input steps that wait on probes have no settle region: the runtime's send must
+    not wait when a step's region is None, since a probe step follows.
+
+    Raises:
+        WorkflowError: A call references something that no longer exists
+    """
+    recorded = macro.get("calls", [])
+    calls = simplify(recorded)
+    steps: List[Step] = []
+    dropped, batched, probe_waits = len(recorded) - len(calls), 0, 0
+    previous_call: Optional[Dict[str, Any]] = None
+
+    for number, call in enumerate(calls, 1):
+        if call["action"] not in ACTIONS:
+            raise WorkflowError(f"macro '{name}' call {number}: '{call['action']}' can't be replayed")
+        try:
+            step = compile_step(context, {"action": call["action"], "params": call.get("params", {})})
+        except WorkflowError as e:
+            raise WorkflowError(f"macro '{name}' call {number}: {e}") from None
+
+        # The probe wait before this fixed wait already waited for what it was for
+        if step.kind == "wait" and steps and steps[-1].kind == "probe":
+            dropped += 1
+            previous_call = call
+            continue
+
+        probes = tuple(context.probes[probe] for probe in call.get("probes", ())
+                       if probe in context.probes and context.probes[probe].expect is not None)
+        if step.kind == "input" and probes:
+            step = step._replace(region=None, pause=0.0)
+
+        previous = steps[-1] if steps else None
+        nothing_to_render = previous_call is not None and (
+            previous_call.get("changed") is False
+            or previous_call["action"] == call["action"] == "scroll_section"
+        )
+        if step.kind == "input" and previous is not None and previous.kind == "input" and nothing_to_render:
+            steps[-1] = Step(
+                "input", f"{previous.label}; {step.label}",
+                ops=previous.ops + (wait(BATCH_INTERVAL),) + step.ops,
+                region=step.region, pause=max(previous.pause, step.pause),
+            )
+            batched += 1
+        else:
+            steps.append(step)
+
+        if step.kind == "input" and probes:
+            steps.append(Step("probe", f"Probes matched: {', '.join(p.name for p in probes)}",
+                              probes=probes, seconds=PROBE_TIMEOUT))
+            probe_waits += 1
+        previous_call = call
+
+    if not steps:
+        raise WorkflowError(f"macro '{name}' has no steps")
+    steps = merge_captures(steps)
+    plan = WorkflowPlan(name, macro.get("description", ""), tuple(steps))
+    return plan, MacroStats(len(recorded), dropped, batched, probe_waits, len(steps))
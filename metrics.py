@@ -0,0 +1,204 @@
+"""
+Timing Instrumentation
+
+Process-wide counters and latency histograms for tools, input batches, captures,
+encodes and waits, plus per-run traces. While a trace is open (one per workflow
+run), every timed span from any thread is also recorded as an event. The trace is
+written as JSONL and as a Chrome trace-event file that can be opened in
+chrome://tracing or Perfetto.
+
+    with METRICS.timed("capture.grab", section="inpatient_manage"):
+        ...
+"""
+
+import bisect
+import collections
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from paths import cache_dir
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open-ended
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+RECENT_SAMPLES = 512  # Samples kept per histogram for percentiles
+KEEP_TRACES = 50  # Trace runs kept on disk
+
+class Histogram:
+    """Bucketed latency distribution with exact totals and percentiles over recent samples"""
+
+    __slots__ = ("count", "total", "max", "buckets", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.recent = collections.deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.recent.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+    def as_dict(self) -> dict:
+        labels = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.5) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "buckets": {label: n for label, n in zip(labels, self.buckets) if n},
+        }
+
+class TraceEvent(NamedTuple):
+    name: str
+    start: float  # Seconds since the trace opened
+    duration: float
+    thread: str
+    args: dict
+
+class Trace:
+    """The spans recorded while one run (e.g. a workflow) was in progress"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.events: List[TraceEvent] = []
+        self.paths: Tuple[str, ...] = ()  # Files written by export
+
+    def add(self, name: str, start: float, duration: float, args: dict):
+        self.events.append(TraceEvent(name, start - self.started, duration, threading.current_thread().name, args))
+
+    def chrome_events(self) -> List[dict]:
+        threads = {}
+        events = []
+        for event in self.events:
+            tid = threads.setdefault(event.thread, len(threads) + 1)
+            events.append({
+                "name": event.name, "cat": event.name.split(".")[0], "ph": "X",
+                "ts": round(event.start * 1e6, 1), "dur": round(event.duration * 1e6, 1),
+                "pid": 1, "tid": tid, "args": event.args,
+            })
+        events += [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": thread}}
+                   for thread, tid in threads.items()]
+        return events
+
+    def export(self, directory: Path) -> Tuple[str, ...]:
+        """Write <time>-<name>.jsonl and <time>-<name>.trace.json to `directory`"""
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.wall_started)) + f".{int(self.wall_started * 1000) % 1000:03d}"
+        base = f"{stamp}-{re.sub(r'[^A-Za-z0-9_.-]+', '_', self.name)}"
+
+        jsonl = directory / f"{base}.jsonl"
+        with open(jsonl, "w") as f:
+            for event in self.events:
+                f.write(json.dumps({
+                    "name": event.name, "start_ms": round(event.start * 1000, 3),
+                    "duration_ms": round(event.duration * 1000, 3), "thread": event.thread, **event.args,
+                }) + "\n")
+
+        chrome = directory / f"{base}.trace.json"
+        with open(chrome, "w") as f:
+            json.dump({"traceEvents": self.chrome_events(), "displayTimeUnit": "ms"}, f)
+
+        _prune(directory)
+        self.paths = (str(jsonl), str(chrome))
+        return self.paths
+
+def _prune(directory: Path):
+    """Keep the newest KEEP_TRACES runs"""
+    runs = sorted(directory.glob("*.trace.json"))
+    for old in runs[:-KEEP_TRACES]:
+        old.unlink(missing_ok=True)
+        old.with_name(old.name[:-len(".trace.json")] + ".jsonl").unlink(missing_ok=True)
+
+class Metrics:
+    """Counters, histograms and open traces, safe to use from any thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = collections.defaultdict(int)
+        self.histograms: Dict[str, Histogram] = collections.defaultdict(Histogram)
+        self._traces: List[Trace] = []
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def record(self, name: str, start: float, duration: float, **args):
+        """Record a span that began at perf_counter() time `start`"""
+        with self._lock:
+            self.histograms[name].observe(duration)
+            for trace in self._traces:
+                trace.add(name, start, duration, args)
+
+    @contextmanager
+    def timed(self, name: str, **args):
+        """Time the enclosed block as a span called `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start, **args)
+
+    @contextmanager
+    def trace(self, name: str, directory: Optional[Path] = None):
+        """Collect every span recorded inside the block, then export it to `directory` (if given)"""
+        trace = Trace(name)
+        with self._lock:
+            self._traces.append(trace)
+        try:
+            with self.timed(name):
+                yield trace
+        finally:
+            with self._lock:
+                self._traces.remove(trace)
+            if directory is not None:
+                try:
+                    trace.export(directory)
+                except OSError as e:
+                    print(f"Could not write trace for {name}: {e}", file=sys.stderr)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timings": {name: h.as_dict() for name, h in self.histograms.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+METRICS = Metrics()
+
+def trace_dir() -> Optional[Path]:
+    """Where workflow traces are written: POWERCHART_TRACE_DIR, else <cache dir>/traces. POWERCHART_TRACES=0 disables"""
+    if os.environ.get("POWERCHART_TRACES", "1") == "0":
+        return None
+    if os.environ.get("POWERCHART_TRACE_DIR"):
+        return Path(os.environ["POWERCHART_TRACE_DIR"]).expanduser()
+    try:
+        return cache_dir() / "traces"
+    except OSError:
+        return None
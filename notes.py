@@ -0,0 +1,205 @@
+"""
+Documentation Note Harvester
+
+Reads the notes in the Documentation view one at a time: click the note, select
+all, copy, and read the clipboard. The clipboard is primed with a marker before
+each copy, so "the copy landed" is a clipboard poll rather than a fixed sleep.
+Every note is keyed by a hash of its text in a small SQLite store, per patient.
+Notes are listed newest first, so a re-run stops as soon as it reaches notes it
+has already stored and only the new ones are read.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Set
+
+from catalog import CoordinateCatalog, Point, Region
+from input_backends import InputOp, click_ops, hotkey
+from metrics import METRICS
+
+# Put on the clipboard before each copy; still there afterwards means nothing was copied
+COPY_MARKER = "<powerchart-mcp: copy pending>"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    patient TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    text TEXT NOT NULL,
+    harvested REAL NOT NULL,
+    PRIMARY KEY (patient, hash)
+);
+"""
+
+def note_hash(text: str) -> str:
+    """Hash of a note's text, ignoring line-ending and trailing whitespace differences"""
+    normalized = "\n".join(line.rstrip() for line in text.strip().splitlines())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+class NoteStore:
+    """Harvested notes by (patient, text hash); safe to use from several threads"""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def known(self, patient: Optional[str], hash: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM notes WHERE patient = ? AND hash = ?", (patient or "", hash)).fetchone()
+        return row is not None
+
+    def add(self, patient: Optional[str], hash: str, text: str) -> bool:
+        """Store a note; False if it was already stored"""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO notes (patient, hash, text, harvested) VALUES (?, ?, ?, ?)",
+                (patient or "", hash, text, time.time()),
+            )
+        return cursor.rowcount == 1
+
+    def count(self, patient: Optional[str]) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM notes WHERE patient = ?", (patient or "",)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class Note(NamedTuple):
+    page: int  # 1 = most recent page
+    position: int  # 1..18 on the page
+    hash: str
+    text: str
+    new: bool  # False when the note was stored by an earlier harvest
+
+    def as_dict(self) -> dict:
+        return {"page": self.page, "position": self.position, "hash": self.hash[:16], "new": self.new, "text": self.text}
+
+class NoteLayout(NamedTuple):
+    notes: List[Point]  # "note 1".."note N", top to bottom
+    next_page: Optional[Point]
+
+    @classmethod
+    def from_catalog(cls, catalog: CoordinateCatalog, section: str = "documentation") -> "NoteLayout":
+        notes = []
+        while True:
+            point = catalog.find(section, f"note {len(notes) + 1}")
+            if point is None:
+                break
+            notes.append(point)
+        return cls(notes, catalog.find(section, "next page"))
+
+class NoteHarvester:
+    """
+    Walks the note list, newest first, one note per `step()`; call it on the UI thread.
+
+    Args:
+        layout: Note rows and the next page control
+        send: Sends input ops and waits for `region` to settle
+        send_keys: Sends input ops without a settle wait (the clipboard poll is the wait)
+        clipboard: Object with read() and write(text)
+        wait_until: Polls a predicate until it is true or a timeout passes
+        store: Where notes are recorded
+        patient: Patient the notes belong to
+        region: Screen section that repaints when a note is opened
+        max_pages: Pages of the note list to walk at most
+        stop_after_known: Stop after this many notes in a row that an earlier harvest stored (0: never)
+        copy_timeout: Seconds to wait for a copy to reach the clipboard
+    """
+
+    def __init__(self, layout: NoteLayout, send: Callable[[List[InputOp], Optional[Region]], None],
+                 send_keys: Callable[[List[InputOp]], object], clipboard, wait_until: Callable[..., bool],
+                 store: NoteStore, patient: Optional[str] = None, region: Optional[Region] = None,
+                 max_pages: int = 1, stop_after_known: int = 1, copy_timeout: float = 2.0):
+        if not layout.notes:
+            raise ValueError("no note coordinates in the documentation section")
+        self.layout = layout
+        self.send = send
+        self.send_keys = send_keys
+        self.clipboard = clipboard
+        self.wait_until = wait_until
+        self.store = store
+        self.patient = patient
+        self.region = region
+        self.max_pages = max_pages
+        self.stop_after_known = stop_after_known
+        self.copy_timeout = copy_timeout
+
+        self.page = 1
+        self.position = 0
+        self.read = 0
+        self.new = 0
+        self.known_in_a_row = 0
+        self.stopped: Optional[str] = None  # Why the walk ended
+        self._seen: Set[str] = set()
+
+    def copy_note(self, point: Point) -> Optional[str]:
+        """Open the note at `point` and copy its text; None if nothing reached the clipboard"""
+        self.clipboard.write(COPY_MARKER)
+        self.send(click_ops(point.x, point.y), self.region)
+        self.send_keys([hotkey("ctrl", "a"), hotkey("ctrl", "c")])
+        copied = []
+
+        def landed() -> bool:
+            text = self.clipboard.read()
+            if text == COPY_MARKER:
+                return False
+            copied.append(text)
+            return True
+
+        with METRICS.timed("notes.copy"):
+            if not self.wait_until(landed, timeout=self.copy_timeout, interval=0.05):
+                return None
+        return copied[-1]
+
+    def step(self) -> Optional[Note]:
+        """Read the next note; None once the walk has stopped (see `stopped`)"""
+        if self.stopped:
+            return None
+        if self.position == len(self.layout.notes):
+            if self.page >= self.max_pages:
+                self.stopped = f"read {self.max_pages} page(s)"
+                return None
+            if self.layout.next_page is None:
+                self.stopped = "no 'next page' coordinates"
+                return None
+            self.send(click_ops(self.layout.next_page.x, self.layout.next_page.y), self.region)
+            self.page += 1
+            self.position = 0
+
+        self.position += 1
+        text = self.copy_note(self.layout.notes[self.position - 1])
+        if text is None or not text.strip():
+            self.stopped = f"nothing copied from note {self.position} on page {self.page}"
+            return None
+
+        # A blank row or a page turn that did nothing leaves a note we already read open
+        hash = note_hash(text)
+        if hash in self._seen:
+            self.stopped = "reached the end of the note list"
+            return None
+        self._seen.add(hash)
+        self.read += 1
+        METRICS.count("notes.read")
+
+        new = self.store.add(self.patient, hash, text)
+        if new:
+            self.new += 1
+            self.known_in_a_row = 0
+        else:
+            self.known_in_a_row += 1
+            if self.stop_after_known and self.known_in_a_row >= self.stop_after_known:
+                self.stopped = "reached notes from an earlier harvest"
+        return Note(self.page, self.position, hash, text, new)
+
+    @property
+    def done(self) -> bool:
+        return self.stopped is not None
+
+    def summary(self) -> str:
+        return f"Read {self.read} note(s), {self.new} new, over {self.page} page(s); stopped: {self.stopped}"
@@ -0,0 +1,184 @@
+"""
+Local OCR
+
+Turns a captured screen section into text with a bounding box per line, so the
+LLM can read a section as a few hundred tokens of text instead of an image. The
+engine is a locally installed Tesseract, run as one `tesseract` process per image
+with TSV output (no Python binding needed); POWERCHART_TESSERACT points at the
+binary if it isn't on PATH.
+
+Results are cached in SQLite by a hash of the frame's pixels plus the engine
+settings, so an unchanged screen is never OCR'd twice, across restarts too.
+"""
+
+import csv
+import io
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from archive import frame_hash
+from catalog import Region
+from metrics import METRICS
+
+class OcrUnavailable(Exception):
+    """No OCR engine is installed"""
+
+class OcrLine(NamedTuple):
+    text: str
+    box: Tuple[int, int, int, int]  # left, top, right, bottom in screen coordinates
+    confidence: float  # Mean word confidence, 0-100
+
+    def as_dict(self) -> dict:
+        return {"text": self.text, "box": list(self.box), "confidence": round(self.confidence, 1)}
+
+class OcrResult(NamedTuple):
+    lines: List[OcrLine]
+    seconds: float  # Engine time; 0 when cached
+    cached: bool
+
+    @property
+    def text(self) -> str:
+        return "\n".join(line.text for line in self.lines)
+
+    def as_dict(self, min_confidence: float = 0.0) -> dict:
+        lines = [line for line in self.lines if line.confidence >= min_confidence]
+        return {"text": "\n".join(line.text for line in lines), "lines": [line.as_dict() for line in lines],
+                "cached": self.cached, "ocr_ms": round(self.seconds * 1000, 1)}
+
+# ===================================
+# Engine
+# ===================================
+
+def tesseract_path() -> Optional[str]:
+    return os.environ.get("POWERCHART_TESSERACT") or shutil.which("tesseract")
+
+def tesseract_lines(image, language: str = "eng", psm: int = 3) -> List[Tuple[str, Tuple[int, int, int, int], float]]:
+    """
+    Run Tesseract on a PIL image; returns (text, pixel box, confidence) per line.
+
+    Raises:
+        OcrUnavailable: tesseract is not installed
+    """
+    binary = tesseract_path()
+    if binary is None:
+        raise OcrUnavailable("tesseract is not installed (brew install tesseract, or set POWERCHART_TESSERACT)")
+    buf = io.BytesIO()
+    image.convert("L").save(buf, format="PNG", compress_level=1)
+    result = subprocess.run([binary, "stdin", "stdout", "-l", language, "--psm", str(psm), "tsv"],
+                            input=buf.getvalue(), capture_output=True, check=True)
+
+    # One row per word; words of a line share block, paragraph and line numbers
+    lines: Dict[Tuple[str, str, str], list] = {}
+    for row in csv.DictReader(io.StringIO(result.stdout.decode("utf-8", "replace")), delimiter="\t", quoting=csv.QUOTE_NONE):
+        text = (row.get("text") or "").strip()
+        if row.get("level") != "5" or not text:
+            continue
+        left, top = int(row["left"]), int(row["top"])
+        box = (left, top, left + int(row["width"]), top + int(row["height"]))
+        lines.setdefault((row["block_num"], row["par_num"], row["line_num"]), []).append((text, box, float(row["conf"])))
+
+    merged = []
+    for words in lines.values():
+        boxes = [box for _, box, _ in words]
+        merged.append((
+            " ".join(text for text, _, _ in words),
+            (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes)),
+            sum(conf for _, _, conf in words) / len(words),
+        ))
+    merged.sort(key=lambda line: (line[1][1], line[1][0]))
+    return merged
+
+# ===================================
+# Cached reader
+# ===================================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr (
+    key TEXT PRIMARY KEY,
+    lines TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+class OcrReader:
+    """
+    OCR with a content-hash cache.
+
+    Args:
+        cache_path: SQLite file for cached results (None: memory only)
+        engine: Returns (text, pixel box, confidence) per line for a PIL image
+        language: Tesseract language
+        psm: Tesseract page segmentation mode
+    """
+
+    def __init__(self, cache_path: Optional[Path] = None, engine: Callable = tesseract_lines,
+                 language: str = "eng", psm: int = 3):
+        self.engine = engine
+        self.language = language
+        self.psm = psm
+        self._lock = threading.Lock()
+        self._db = None
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(cache_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+        self._memory: Dict[str, Tuple[list, float]] = {}
+
+    def _cached(self, key: str) -> Optional[Tuple[list, float]]:
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is None and self._db is not None:
+                row = self._db.execute("SELECT lines, seconds FROM ocr WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    hit = self._memory[key] = (json.loads(row[0]), row[1])
+        return hit
+
+    def _store(self, key: str, lines: list, seconds: float):
+        with self._lock:
+            self._memory[key] = (lines, seconds)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("INSERT OR REPLACE INTO ocr (key, lines, seconds, created) VALUES (?, ?, ?, ?)",
+                                     (key, json.dumps(lines), seconds, time.time()))
+
+    def read(self, frame, region: Optional[Region] = None) -> OcrResult:
+        """
+        OCR a grabbed frame. Line boxes are in screen coordinates when `region` (where
+        the frame was grabbed from) is given, else in frame pixels.
+        """
+        with METRICS.timed("ocr.hash"):
+            key = f"{frame_hash(frame)}:{self.language}:{self.psm}"
+        hit = self._cached(key)
+        cached = hit is not None
+        if cached:
+            METRICS.count("ocr.cache_hits")
+            pixel_lines, seconds = hit[0], 0.0
+        else:
+            start = time.perf_counter()
+            with METRICS.timed("ocr.engine", width=frame.width, height=frame.height):
+                pixel_lines = [[text, list(box), conf] for text, box, conf in self.engine(frame, self.language, self.psm)]
+            seconds = time.perf_counter() - start
+            self._store(key, pixel_lines, seconds)
+
+        scale = frame.width / region.width if region is not None else 1.0
+        left, top = (region.left_x, region.upper_y) if region is not None else (0, 0)
+        lines = [
+            OcrLine(text, (round(left + box[0] / scale), round(top + box[1] / scale),
+                           round(left + box[2] / scale), round(top + box[3] / scale)), conf)
+            for text, box, conf in pixel_lines
+        ]
+        return OcrResult(lines, seconds, cached)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
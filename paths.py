@@ -0,0 +1,33 @@
+"""
+Local storage locations for the PowerChart MCP server
+"""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+def cache_dir() -> Path:
+    """Directory for rebuildable caches (POWERCHART_CACHE_DIR, default ~/.cache/powerchart_mcp)"""
+    path = Path(os.environ.get("POWERCHART_CACHE_DIR", Path.home() / ".cache" / "powerchart_mcp"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def write_atomic(path: Path, data: bytes, mode: Optional[int] = None):
+    """
+    Write `data` to `path` so readers see either the old file or the complete new one.
+    With `mode` (e.g. 0o600 for secrets) the file has exactly those permissions from the start.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666 if mode is None else mode)
+    with os.fdopen(fd, "wb") as f:
+        if mode is not None:
+            os.fchmod(f.fileno(), mode)  # The umask doesn't apply, and a leftover tmp file keeps its old mode otherwise
+        f.write(data)
+    os.replace(tmp, path)
+
+def data_dir() -> Path:
+    """Directory for output worth keeping, such as census captures (POWERCHART_DATA_DIR, default ~/.local/share/powerchart_mcp)"""
+    path = Path(os.environ.get("POWERCHART_DATA_DIR", Path.home() / ".local" / "share" / "powerchart_mcp"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
@@ -0,0 +1,156 @@
+"""
+Capture Pipeline
+
+Encoding a capture (PNG compression in particular) takes far longer than grabbing
+it. The pipeline moves encoding and writing off the thread that drives the UI:
+`submit` queues a grabbed frame and returns a handle right away, and a small pool
+of workers encodes and writes it, either to a given path or into the capture
+archive (which skips frames it already has). At most `max_pending` frames are in
+flight; when the workers fall behind, `submit` blocks until a slot frees up, so a
+long batch run can't pile up raw frames in memory.
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from archive import CaptureArchive
+from capture import DEFAULT_OPTIONS, CaptureOptions, encode
+from metrics import METRICS
+from paths import write_atomic
+
+class CaptureHandle:
+    """A queued capture; `wait()` blocks until it has been written"""
+
+    def __init__(self, id: str, path: Optional[Path]):
+        self.id = id
+        self.path = path  # Known once written when the capture goes to the archive
+        self.submitted = time.time()
+        self.status = "pending"  # "pending", "done" or "error"
+        self.new: Optional[bool] = None  # Archive only: False when the frame was already stored
+        self.size = 0  # Encoded bytes
+        self.seconds = 0.0  # Encode + write time
+        self.error: Optional[str] = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def as_dict(self) -> dict:
+        result = {"id": self.id, "status": self.status, "path": str(self.path) if self.path else None}
+        if self.status == "done":
+            result.update(bytes=self.size, encode_ms=round(self.seconds * 1000, 1))
+        if self.new is not None:
+            result["new"] = self.new
+        if self.error:
+            result["error"] = self.error
+        return result
+
+class CapturePipeline:
+    """
+    Bounded encode-and-write queue.
+
+    Args:
+        workers: Encoding threads
+        max_pending: Frames queued or being encoded before `submit` blocks
+        keep: Finished handles remembered for status lookups
+        archive: Where captures submitted without a path are stored
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 8, keep: int = 500,
+                 archive: Optional[CaptureArchive] = None):
+        self.archive = archive
+        self.workers = workers
+        self.max_pending = max_pending
+        self.keep = keep
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="powerchart-encode")
+        self._handles: "OrderedDict[str, CaptureHandle]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, frame, path: Optional[Path] = None, options: CaptureOptions = DEFAULT_OPTIONS,
+               section: Optional[str] = None, patient: Optional[str] = None) -> CaptureHandle:
+        """
+        Queue a raw frame to be encoded with `options` and written to `path`, or without a
+        path, stored in the archive under `section` and `patient`. Blocks while the queue is full.
+        """
+        if path is None and (self.archive is None or section is None):
+            raise ValueError("captures without a path need an archive and a section")
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            METRICS.count("pipeline.backpressure_waits")
+            self._slots.acquire()
+            METRICS.record("pipeline.backpressure", start, time.perf_counter() - start)
+
+        handle = CaptureHandle(f"cap-{next(self._ids)}", Path(path) if path is not None else None)
+        with self._lock:
+            self._handles[handle.id] = handle
+            while len(self._handles) > self.keep:
+                oldest = next(iter(self._handles.values()))
+                if not oldest.done:
+                    break
+                self._handles.popitem(last=False)
+        try:
+            self._executor.submit(self._run, handle, frame, options, section, patient)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        return handle
+
+    def _run(self, handle: CaptureHandle, frame, options: CaptureOptions, section: Optional[str], patient: Optional[str]):
+        start = time.perf_counter()
+        try:
+            if handle.path is None:
+                entry = self.archive.store(frame, section, patient, options)
+                handle.path, handle.size, handle.new = entry.path, entry.size, entry.new
+            else:
+                data = encode(frame, options)
+                write_atomic(handle.path, data)
+                handle.size = len(data)
+            handle.status = "done"
+        except Exception as e:
+            handle.error = str(e) or type(e).__name__
+            handle.status = "error"
+            METRICS.count("pipeline.errors")
+        finally:
+            handle.seconds = time.perf_counter() - start
+            METRICS.record("pipeline.encode_write", start, handle.seconds, section=section)
+            self._slots.release()
+            handle._done.set()
+
+    def get(self, id: str) -> Optional[CaptureHandle]:
+        with self._lock:
+            return self._handles.get(id)
+
+    def recent(self, n: int = 20) -> List[CaptureHandle]:
+        with self._lock:
+            return list(self._handles.values())[-n:]
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for handle in self._handles.values() if not handle.done)
+
+    def drain(self, handles: Optional[List[CaptureHandle]] = None, timeout: Optional[float] = None) -> bool:
+        """Wait for `handles` (default: everything queued so far) to finish"""
+        if handles is None:
+            with self._lock:
+                handles = list(self._handles.values())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for handle in handles:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not handle.wait(remaining):
+                return False
+        return True
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -6,193 +6,502 @@ via pre-defined coordinates for clicking and navigating the interface.
 """
 
 import os
-import subprocess
-import platform
+import sys
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import time
-import json
-from typing import Any, Dict, List, Optional, Tuple, Literal
+from typing import Dict, List, NamedTuple, Optional, Tuple, Literal, Union
 from pathlib import Path
-from pydantic import BaseModel, Field
-from mcp.server.fastmcp import FastMCP, Context
+from mcp.server.fastmcp import FastMCP, Context, Image
+
+from archive import CaptureArchive, frame_hash
+from capture import DEFAULT_OPTIONS, CaptureOptions, encode, grab_region, grab_regions, options_from_dict, shaped_size
+from catalog import CoordinateCatalog, Point, Region, load_catalog
+from census import CensusError, CensusRunner
+from change_detection import ChangeDetector
+from clipboard import get_clipboard
+from input_backends import InputOp, click_ops, get_backend
+from locator import Locator
+from macros import MacroRecorder, MacroStore, compile_macro
+from metrics import METRICS, trace_dir
+from notes import NoteHarvester, NoteLayout, NoteStore
+from ocr import OcrReader, OcrUnavailable
+from paths import data_dir
+from pipeline import CapturePipeline
+from process_monitor import MONITOR, citrix_processes
+from probes import Probe, all_match, load_probes, sample as sample_probes
+from settle import WaitEngine
+from state import KINDS as MARKER_KINDS, StateStore
+from stitch import Stitcher
+from watcher import FileWatcher
+from workflows import CompileContext, Runtime, WorkflowError, WorkflowPlan, execute as execute_workflow, load_workflows
 
 # Create an MCP server
 mcp = FastMCP(
     "PowerChart Automation", 
     description="Automates PowerChart EHR interactions using coordinate-based automation",
-    dependencies=["pyautogui", "Pillow", "python-dotenv"]
+    dependencies=["pyautogui", "Pillow", "numpy", "python-dotenv"]
 )
 
 # ===================================
-# Models for PowerChart Navigation
+# Load Coordinates and Workflows
 # ===================================
 
-class NavigationLocation(BaseModel):
-    """Represents a clickable location in PowerChart UI"""
-    x: int
-    y: int
-    name: str
-    description: Optional[str] = None
-
-class ScreenSection(BaseModel):
-    """Screen section with capture coordinates"""
-    left_x: int
-    upper_y: int
-    right_x: int
-    lower_y: int
-    name: str
+class LoadedConfig(NamedTuple):
+    """Everything compiled from the data files. Replaced as one object on reload"""
+    catalog: CoordinateCatalog
+    workflows: Dict[str, WorkflowPlan]
+    workflow_errors: Dict[str, str]
+    probes: Dict[str, Probe]
+    paths: Tuple[str, ...]  # Data files that were loaded, for the reload watcher
 
-# ===================================
-# Load Coordinates from JSON
-# ===================================
+# Tools read CONFIG once per call, so a reload never hands them a half-loaded mix
+CONFIG = LoadedConfig(CoordinateCatalog({}, {}), {}, {}, {}, ())
 
-# This dictionary will hold all coordinates organized by section
-COORDINATES = {}
-SCREEN_SECTIONS = {}
-
-def load_coordinates_json():
-    """Load coordinates from the coordinates.json file"""
-    possible_paths = [
-        "coordinates.json",  # Current directory
-        "../coordinates.json",  # Parent directory
-        str(Path.home() / "coordinates.json"),  # Home directory
-        str(Path(__file__).parent / "coordinates.json"),  # Script directory
+# Screen section watched after clicks whose own section has no screen section
+SETTLE_DEFAULT_SECTION = os.environ.get("POWERCHART_SETTLE_SECTION", "inpatient_manage")
+
+def data_file_paths(filename: str) -> List[str]:
+    """Places a data file such as coordinates.json is looked for, in priority order"""
+    return [
+        filename,  # Current directory
+        f"../{filename}",  # Parent directory
+        str(Path.home() / filename),  # Home directory
+        str(Path(__file__).parent / filename),  # Script directory
     ]
+
+def load_coordinates_json(previous: CoordinateCatalog = None) -> Tuple[Optional[CoordinateCatalog], Optional[str]]:
+    """Load coordinates from the coordinates.json file and compile the catalog"""
+    for path in data_file_paths("coordinates.json"):
+        if os.path.exists(path):
+            try:
+                catalog, unchanged = load_catalog(path, previous)
+                print(f"Loaded coordinates from {path}" + (" (unchanged)" if unchanged else ""), file=sys.stderr)
+                return catalog, path
+            except Exception as e:
+                print(f"Error loading coordinates from {path}: {e}", file=sys.stderr)
+    
+    print("Warning: coordinates.json file not found. Proceeding with empty coordinates.", file=sys.stderr)
+    return None, None
+
+def load_probes_json() -> Tuple[Dict[str, Probe], Optional[str]]:
+    """Load pixel probe definitions from probes.json"""
+    for path in data_file_paths("probes.json"):
+        if os.path.exists(path):
+            try:
+                probes = load_probes(path)
+                print(f"Loaded {len(probes)} probes from {path}", file=sys.stderr)
+                return probes, path
+            except Exception as e:
+                print(f"Error loading probes from {path}: {e}", file=sys.stderr)
     
-    for path in possible_paths:
+    return {}, None
+
+def load_workflows_json(context: CompileContext) -> Tuple[Dict[str, WorkflowPlan], Dict[str, str], Optional[str]]:
+    """Load workflows.json and compile each workflow against the coordinate catalog and probes"""
+    for path in data_file_paths("workflows.json"):
         if os.path.exists(path):
             try:
-                with open(path, 'r') as f:
-                    data = json.load(f)
-                    
-                    # Load coordinates
-                    for section, items in data.items():
-                        if section == "screen_sections":
-                            # Handle screen sections specially
-                            for name, section_data in items.items():
-                                SCREEN_SECTIONS[name] = ScreenSection(
-                                    left_x=section_data["left_x"],
-                                    upper_y=section_data["upper_y"],
-                                    right_x=section_data["right_x"],
-                                    lower_y=section_data["lower_y"],
-                                    name=section_data["name"]
-                                )
-                        else:
-                            # Handle regular coordinate sections
-                            if isinstance(items, dict):
-                                # Section has subsections
-                                COORDINATES[section] = {}
-                                for subsection, coords in items.items():
-                                    COORDINATES[section][subsection] = []
-                                    for item in coords:
-                                        COORDINATES[section][subsection].append(
-                                            NavigationLocation(**item)
-                                        )
-                            else:
-                                # Regular section with coordinates
-                                COORDINATES[section] = []
-                                for item in items:
-                                    COORDINATES[section].append(
-                                        NavigationLocation(**item)
-                                    )
-                    
-                    print(f"Loaded coordinates from {path}")
-                    return True
+                workflows, errors = load_workflows(path, context)
+                for name, error in errors.items():
+                    print(f"Warning: {error}", file=sys.stderr)
+                print(f"Loaded {len(workflows)} workflows from {path}", file=sys.stderr)
+                return workflows, errors, path
             except Exception as e:
-                print(f"Error loading coordinates from {path}: {e}")
+                print(f"Error loading workflows from {path}: {e}", file=sys.stderr)
+    
+    print("Warning: workflows.json file not found. No workflows available.", file=sys.stderr)
+    return {}, {}, None
+
+def load_config(previous: LoadedConfig = None) -> LoadedConfig:
+    """Compile coordinates, probes and workflows. On reload, a catalog that fails to load keeps the previous one"""
+    previous_catalog = previous.catalog if previous is not None else None
+    catalog, coordinates_path = load_coordinates_json(previous_catalog)
+    if catalog is None:
+        catalog = previous_catalog or CoordinateCatalog({}, {})
+    probes, probes_path = load_probes_json()
+    workflows, errors, workflows_path = load_workflows_json(CompileContext(catalog, SETTLE_DEFAULT_SECTION, probes))
+    paths = tuple(os.path.abspath(path) for path in (coordinates_path, workflows_path, probes_path) if path)
+    return LoadedConfig(catalog, workflows, errors, probes, paths)
+
+_reload_lock = threading.Lock()
+
+def reload_config() -> str:
+    """Rebuild CONFIG from the data files and swap it in with a single assignment"""
+    global CONFIG
+    
+    with _reload_lock:
+        start = time.perf_counter()
+        previous = CONFIG
+        config = load_config(previous)
+        CONFIG = config
+        if LOCATOR is not None:
+            LOCATOR.forget()  # Offsets were measured from the old stored points
+        
+        for path in config.paths:
+            CONFIG_WATCHER.watch(path)
     
-    print("Warning: coordinates.json file not found. Proceeding with empty coordinates.")
-    return False
+    changed = config.catalog.changed_sections(previous.catalog)
+    elapsed = (time.perf_counter() - start) * 1000
+    return (f"Reloaded in {elapsed:.1f} ms: {len(changed)} coordinate section(s) recompiled"
+            + (f" ({', '.join(changed)})" if changed else "")
+            + f", {len(config.workflows)} workflows, {len(config.probes)} probes")
 
-# Initialize coordinates
-load_coordinates_json()
+# Initialize coordinates and workflows
+CONFIG = load_config()
+
+# Hot reload: recalibrating coordinates.json or editing workflows.json or probes.json takes
+# effect without restarting the server (POWERCHART_HOT_RELOAD=0 disables)
+CONFIG_WATCHER = FileWatcher(CONFIG.paths, lambda changed: print(reload_config(), file=sys.stderr))
+if os.environ.get("POWERCHART_HOT_RELOAD", "1") != "0":
+    CONFIG_WATCHER.start()
 
 # ===================================
 # Automation Helper Functions
 # ===================================
 
-def click_at_coordinates(x: int, y: int, clicks: int = 1, interval: float = 0.5):
-    """Click at specific coordinates using platform-appropriate methods"""
-    system = platform.system()
-    
-    if system == "Darwin":  # macOS
-        # Use cliclick if available
-        if os.path.exists("/opt/homebrew/bin/cliclick"):
-            cmd = ["/opt/homebrew/bin/cliclick", f"c:{x},{y}"]
-            if clicks > 1:
-                for _ in range(clicks):
-                    subprocess.run(cmd)
-                    time.sleep(interval)
-            else:
-                subprocess.run(cmd)
-        else:
-            # Fallback to pyautogui
-            print("Starting powerchart_mcp.py...")
-            import pyautogui
-            print("Imported pyautogui")
-            pyautogui.click(x=x, y=y, clicks=clicks, interval=interval)
-    else:
-        # Use pyautogui for other platforms
-        import pyautogui
-        pyautogui.click(x=x, y=y, clicks=clicks, interval=interval)
-    
-    # Wait a moment after clicking
-    time.sleep(0.3)
-
-def take_screenshot(section: str = None):
-    """Take a screenshot of the specified section or full screen"""
-    import pyautogui
-    from PIL import Image
-    import io
-    
-    if section and section in SCREEN_SECTIONS:
-        section_info = SCREEN_SECTIONS[section]
-        region = (
-            section_info.left_x, 
-            section_info.upper_y, 
-            section_info.right_x - section_info.left_x, 
-            section_info.lower_y - section_info.upper_y
-        )
-        screenshot = pyautogui.screenshot(region=region)
+# Last frame per screen section, for has_section_changed
+CHANGES = ChangeDetector()
+
+# Waits after input either poll the screen until it settles or sleep a fixed delay
+WAIT = WaitEngine(grab_region)
+
+def open_locator() -> Optional[Locator]:
+    """Template locator over <data dir>/templates; POWERCHART_LOCATOR=0 disables it"""
+    if os.environ.get("POWERCHART_LOCATOR", "1") == "0":
+        return None
+    return Locator(data_dir() / "templates", grab_region,
+                   search_radius=int(os.environ.get("POWERCHART_LOCATOR_RADIUS", "150")))
+
+# Elements with a reference crop are found on screen, so a shifted window doesn't make clicks miss
+LOCATOR = open_locator()
+
+def open_archive() -> Optional[CaptureArchive]:
+    """The capture archive in <data dir>/archive; POWERCHART_ARCHIVE=0 disables it"""
+    if os.environ.get("POWERCHART_ARCHIVE", "1") == "0":
+        return None
+    try:
+        return CaptureArchive(data_dir() / "archive")
+    except Exception as e:
+        print(f"Capture archive unavailable: {e}", file=sys.stderr)
+        return None
+
+# Captures are stored by content, so repeat captures of an unchanged screen are free
+ARCHIVE = open_archive()
+
+# Captures that are saved to disk are encoded and written off the UI thread
+PIPELINE = CapturePipeline(
+    workers=int(os.environ.get("POWERCHART_ENCODE_WORKERS", "2")),
+    max_pending=int(os.environ.get("POWERCHART_MAX_PENDING_CAPTURES", "8")),
+    archive=ARCHIVE,
+)
+
+def open_note_store() -> Optional[NoteStore]:
+    """Harvested documentation notes in <data dir>/notes.sqlite3"""
+    try:
+        return NoteStore(data_dir() / "notes.sqlite3")
+    except Exception as e:
+        print(f"Note store unavailable: {e}", file=sys.stderr)
+        return None
+
+NOTES = open_note_store()
+
+def open_state_store() -> Optional[StateStore]:
+    """Last-seen markers per patient and section in <data dir>/state.sqlite3"""
+    try:
+        return StateStore(data_dir() / "state.sqlite3")
+    except Exception as e:
+        print(f"State store unavailable: {e}", file=sys.stderr)
+        return None
+
+# What each patient's sections showed last time, so runs can skip what hasn't changed
+STATE = open_state_store()
+
+# Recorded macros in <data dir>/macros.json, and the recording in progress
+MACROS = MacroStore(data_dir() / "macros.json")
+RECORDER = MacroRecorder()
+
+def frame_unchanged(patient: Optional[str], section: str, frame) -> bool:
+    """Record a frame's hash as the last-seen frame of `section`; True if it matches the previous one"""
+    if STATE is None:
+        return False
+    new, _ = STATE.update(patient, section, "frame", frame_hash(frame))
+    return not new
+
+def open_ocr_reader() -> Optional[OcrReader]:
+    """OCR with its result cache in <data dir>/ocr.sqlite3; POWERCHART_OCR=0 disables it"""
+    if os.environ.get("POWERCHART_OCR", "1") == "0":
+        return None
+    try:
+        return OcrReader(data_dir() / "ocr.sqlite3", language=os.environ.get("POWERCHART_OCR_LANG", "eng"))
+    except Exception as e:
+        print(f"OCR cache unavailable: {e}", file=sys.stderr)
+        return None
+
+# Sections read as text are cached by frame hash, so an unchanged screen is OCR'd once
+OCR = open_ocr_reader()
+
+def read_section_text(region: Region, frame) -> str:
+    """OCR a frame for a workflow text step; failures come back as the step's text"""
+    if OCR is None:
+        return "Error: OCR is disabled (POWERCHART_OCR=0)"
+    try:
+        return OCR.read(frame, region).text
+    except OcrUnavailable as e:
+        return f"Error: {e}"
+    except Exception as e:
+        return f"Error: OCR of '{region.name}' failed: {e}"
+
+def capture_path(*parts: str) -> Path:
+    """Where a saved capture goes when the archive is off: <data dir>/captures/<parts>"""
+    return data_dir().joinpath("captures", *parts)
+
+def store_capture(frame, section: str, patient: Optional[str], options: CaptureOptions) -> Tuple[bytes, Optional[bool]]:
+    """Encode a frame through the archive; returns (encoded bytes, whether the frame was new or None without an archive)"""
+    if ARCHIVE is None:
+        return encode(frame, options), None
+    entry = ARCHIVE.store(frame, section, patient, options)
+    return entry.path.read_bytes(), entry.new
+
+def queue_capture(frame, section: str, patient: Optional[str], options: CaptureOptions, *fallback_path: str):
+    """Queue a frame for the archive, or for <data dir>/captures/<fallback_path> when the archive is off"""
+    if ARCHIVE is not None:
+        return PIPELINE.submit(frame, options=options, section=section, patient=patient)
+    return PIPELINE.submit(frame, capture_path(*fallback_path), options)
+
+def section_options(section: str, **overrides) -> CaptureOptions:
+    """
+    Encoding for a capture of `section`: its "capture" settings from coordinates.json,
+    then every override that isn't None. max_dim=0 and colors=0 turn those settings off.
+
+    Raises:
+        ValueError: The section's settings name an unknown option
+    """
+    options = options_from_dict(CONFIG.catalog.capture_settings.get(section, {}))
+    options = options._replace(**{name: value for name, value in overrides.items() if value is not None})
+    if options.format != "png" and overrides.get("colors") is None:
+        options = options._replace(colors=None)  # A section's palette doesn't carry over to another format
+    return options._replace(max_dim=options.max_dim or None, colors=options.colors or None)
+
+def payload_summary(section: str, frame, options: CaptureOptions, size: int, new: Optional[bool] = None) -> str:
+    """
+    One line describing how a capture was shaped: raw frame size vs. encoded bytes, and
+    whether the archive had seen the frame before (`new` is None without an archive)
+    """
+    width, height = shaped_size(frame.size, options)
+    raw = frame.width * frame.height * len(frame.getbands())
+    encoding = options.format + (f", {options.colors} colors" if options.colors else "") + (", grayscale" if options.grayscale else "")
+    summary = (f"Capture of '{section}': {frame.width}x{frame.height} frame ({raw:,} bytes raw) "
+               f"sent as {width}x{height} {encoding}: {size:,} bytes ({size / raw:.1%})")
+    if new is not None:
+        summary += "; new frame" if new else "; unchanged since an earlier capture"
+    return summary
+
+def settle_region(section: str = None) -> Optional[Region]:
+    """The screen section to watch after acting on elements of `section`"""
+    return CONFIG.catalog.region_for(section, SETTLE_DEFAULT_SECTION)
+
+def click_at_coordinates(x: int, y: int, clicks: int = 1, interval: float = 0.5, settle_section: str = None):
+    """Click at specific coordinates, then wait for the screen to settle"""
+    with WAIT.settle_after(settle_region(settle_section), fixed_delay=0.3):
+        get_backend().click(x, y, clicks=clicks, interval=interval)
+
+def run_input(ops: List[InputOp], settle_section: str = None):
+    """Send a run of input ops to the backend as a single batch, then wait for the screen to settle"""
+    send_input(ops, settle_region(settle_section))
+
+def send_input(ops, region: Optional[Region]):
+    """Send a batch of input ops, then wait for `region` to settle"""
+    with WAIT.settle_after(region, fixed_delay=0.3):
+        get_backend().run(ops)
+
+def send_macro_input(ops, region: Optional[Region]):
+    """send_input for macro replays, where an input step without a settle region is followed by its own probe wait"""
+    if region is None:
+        get_backend().run(ops)
     else:
-        screenshot = pyautogui.screenshot()
+        send_input(ops, region)
+
+def recorded_input(action: str, params: dict, fn, *args, **kwargs):
+    """
+    Run an input call; while a macro is being recorded, add the call to it along with
+    whether the screen changed and which probes flipped to their expected color.
+    """
+    if not RECORDER.recording:
+        return fn(*args, **kwargs)
+    probes = [probe for probe in CONFIG.probes.values() if probe.expect is not None]
+    before = read_probes(probes) if probes else {}
+    WAIT.last_result = None
+    result = fn(*args, **kwargs)
+    after = read_probes(probes) if probes else {}
+    settle = WAIT.last_result
+    flipped = [name for name, reading in after.items() if reading["match"] and not before[name]["match"]]
+    RECORDER.record(action, params, changed=settle.changed if settle is not None else None, probes=flipped)
+    return result
+
+def read_probes(probes: List[Probe]) -> dict:
+    """Sample probes from one grab; returns readings by probe name"""
+    return {name: reading.as_dict() for name, reading in sample_probes(probes, grab_region).items()}
+
+def wait_for_probe_match(probes: Tuple[Probe, ...], timeout: float, interval: float = 0.03) -> bool:
+    """Poll the probes until every expected color matches, or `timeout` seconds pass"""
+    probes = list(probes)
+    return WAIT.wait_until(lambda: all_match(sample_probes(probes, grab_region)), timeout=timeout, interval=interval)
+
+def scroll_and_stitch(scroll: Point, region: Region, clicks_per_page: int, max_pages: int, ignore_right: int):
+    """
+    Capture `region`, scroll a page at a time and keep only the rows each scroll reveals.
     
-    # Convert to bytes for return
-    buf = io.BytesIO()
-    screenshot.save(buf, format='PNG')
-    buf.seek(0)
+    Returns:
+        (stitched image, pages captured, whether the end of the content was reached)
+    """
+    first = grab_region(region)
+    scale = first.width / region.width  # 2 on Retina displays
+    stitcher = Stitcher(first, ignore_right=round(ignore_right * scale))
+    pages = 1
+    while pages < max_pages:
+        send_input(click_ops(scroll.x, scroll.y, clicks_per_page, interval=0.2), region)
+        if stitcher.add(grab_region(region)) == 0:
+            return stitcher.image(), pages, True
+        pages += 1
+    return stitcher.image(), pages, False
+
+def run_workflow(plan: WorkflowPlan, runtime: Runtime):
+    """Execute a plan inside a trace; returns (result, trace files written)"""
+    with METRICS.trace(f"workflow.{plan.name}", trace_dir()) as trace:
+        result = execute_workflow(plan, runtime)
+    return result, trace.paths
+
+def workflow_runtime(name: str, patient: Optional[str], save_captures: bool, send=send_input) -> Tuple[Runtime, list]:
+    """The runtime for one workflow or macro run, and the list its capture handles are added to"""
+    # Captured frames are queued for encoding; the next step's input doesn't wait for them
+    run_dir = f"{time.strftime('%Y%m%d-%H%M%S')}-{name}"
+    handles = []
+    def save_capture(region: Region, frame):
+        handles.append(queue_capture(frame, region.name, patient, DEFAULT_OPTIONS,
+                                     "workflows", run_dir, f"{len(handles) + 1:02d}_{region.name}.png"))
     
-    return buf.getvalue()
+    runtime = Runtime(send, grab_region, WAIT.pause, wait_for_probe_match, save_capture if save_captures else None,
+                      functools.partial(frame_unchanged, patient), read_section_text, grab_regions)
+    return runtime, handles
 
-def find_location_by_name(section: str, name: str, subsection: str = None) -> Optional[NavigationLocation]:
-    """Find a location by its name in the specified section"""
-    if section in COORDINATES:
-        section_coords = COORDINATES[section]
-        
-        if isinstance(section_coords, list):
-            for loc in section_coords:
-                if loc.name.lower() == name.lower():
-                    return loc
-        elif isinstance(section_coords, dict):
-            if subsection and subsection in section_coords:
-                # Search in specific subsection if provided
-                for loc in section_coords[subsection]:
-                    if loc.name.lower() == name.lower():
-                        return loc
-            else:
-                # Search in all subsections
-                for subsection_items in section_coords.values():
-                    for loc in subsection_items:
-                        if loc.name.lower() == name.lower():
-                            return loc
-    
-    return None
+def run_summary(result, handles: list, trace_files: List[str]) -> str:
+    """A workflow or macro result, with its capture handles and trace file"""
+    summary = result.summary()
+    if handles:
+        summary += f"\nCaptures queued: {', '.join(h.id for h in handles)} (see capture_status)"
+    if trace_files:
+        summary += f"\nTrace: {trace_files[-1]}"
+    return summary
+
+def open_patient(position: int):
+    """Double-click the patient at a list position, then wait for the screen to settle"""
+    location = find_location_by_name("specific_patient_list", f"Patient {position}")
+    if location is None:
+        raise ValueError(f"no patient at position {position} in the patient list coordinates")
+    click_element(location, clicks=2, interval=0.1)
+
+def patient_positions(catalog: CoordinateCatalog) -> List[int]:
+    """Positions of every "Patient N" entry in the patient list coordinates"""
+    positions = []
+    for point in catalog.coordinates.get("specific_patient_list", []):
+        name = point.name.split()
+        if len(name) == 2 and name[0] == "Patient" and name[1].isdigit():
+            positions.append(int(name[1]))
+    return sorted(positions)
+
+def find_location_by_name(section: str, name: str, subsection: str = None) -> Optional[Point]:
+    """Find a location by its name in the specified section (its stored point; see on_screen)"""
+    return CONFIG.catalog.find(section, name, subsection)
+
+def on_screen(location: Point) -> Point:
+    """
+    Where an element is now: moved to where its template is on screen if it has one.
+    Grabs the screen, so it runs on the UI thread, under UI_LOCK, right before the click.
+    """
+    if LOCATOR is None:
+        return location
+    return LOCATOR.resolve(location)
+
+def click_element(location: Point, clicks: int = 1, interval: float = 0.5, settle_section: str = None) -> Point:
+    """Click an element where it is on screen now, then wait for the screen to settle; returns the point clicked"""
+    location = on_screen(location)
+    click_at_coordinates(location.x, location.y, clicks=clicks, interval=interval, settle_section=settle_section)
+    return location
+
+def scroll_element(location: Point, clicks: int, settle_section: str = None) -> Point:
+    """Click a scroll arrow where it is on screen now, as one batch 0.2 s apart; returns the point clicked"""
+    location = on_screen(location)
+    run_input(click_ops(location.x, location.y, clicks, interval=0.2), settle_section=settle_section)
+    return location
+
+def not_found_message(section: str, element: str, subsection: str = None) -> str:
+    """Error message for an unknown element, with near-miss names when there are any"""
+    if subsection:
+        message = f"Error: Could not find element '{element}' in section '{section}', subsection '{subsection}'"
+    else:
+        message = f"Error: Could not find element '{element}' in section '{section}'"
+    
+    suggestions = CONFIG.catalog.suggest(section, element, subsection)
+    if suggestions:
+        message += ". Did you mean: " + ", ".join(f"'{name}'" for name in suggestions) + "?"
+    return message
+
+# ===================================
+# Async Execution
+# ===================================
+
+# Physical input runs on one dedicated thread, one tool at a time. Captures,
+# diffing and resource reads use other threads and never wait for this lock.
+UI_LOCK = asyncio.Lock()
+UI_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="powerchart-ui")
+
+async def in_ui_thread(fn, *args, **kwargs):
+    """Run blocking input work (clicks and their settle waits) on the UI thread"""
+    async with UI_LOCK:
+        return await on_ui_thread(fn, *args, **kwargs)
+
+async def on_ui_thread(fn, *args, **kwargs):
+    """Run on the UI thread without taking UI_LOCK; for callers that already hold it across several calls"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(UI_EXECUTOR, functools.partial(fn, *args, **kwargs))
+
+async def in_worker(fn, *args, **kwargs):
+    """Run blocking capture or analysis work off the event loop"""
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+def warmup():
+    """Load the input driver and the capture/encode path before the first tool call"""
+    try:
+        get_backend().warmup()
+        from PIL import PngImagePlugin  # noqa: F401 - registers the PNG encoder
+        grab_region(Region(0, 0, 1, 1, "warmup"))
+    except Exception as e:
+        print(f"Warmup failed: {e}", file=sys.stderr)
+
+# Opt-in: warm up on the UI thread so pyautogui is first imported where it is used
+if os.environ.get("POWERCHART_WARMUP") == "1":
+    UI_EXECUTOR.submit(warmup)
+
+def timed_tool():
+    """mcp.tool() that also records each call's latency as tool.<name> in METRICS"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def timed(*args, **kwargs):
+            METRICS.count(f"tool.{fn.__name__}.calls")
+            with METRICS.timed(f"tool.{fn.__name__}"):
+                return await fn(*args, **kwargs)
+        return mcp.tool()(timed)
+    return decorator
 
 # ===================================
 # MCP Tools for PowerChart Automation
 # ===================================
 
-@mcp.tool()
-def navigate_to(section: str, element: str, subsection: str = None) -> str:
+@timed_tool()
+async def navigate_to(section: str, element: str, subsection: str = None) -> str:
     """
     Navigate to a specific element within a section of PowerChart.
     
@@ -207,19 +516,17 @@ def navigate_to(section: str, element: str, subsection: str = None) -> str:
     location = find_location_by_name(section, element, subsection)
     
     if not location:
-        if subsection:
-            return f"Error: Could not find element '{element}' in section '{section}', subsection '{subsection}'"
-        else:
-            return f"Error: Could not find element '{element}' in section '{section}'"
+        return not_found_message(section, element, subsection)
     
-    click_at_coordinates(location.x, location.y)
+    location = await in_ui_thread(recorded_input, "navigate_to", {"section": section, "element": element, "subsection": subsection},
+                                  click_element, location, settle_section=section)
     if subsection:
         return f"Clicked on {element} (coordinates: {location.x}, {location.y}) in subsection {subsection}"
     else:
         return f"Clicked on {element} (coordinates: {location.x}, {location.y})"
 
-@mcp.tool()
-def double_click_element(section: str, element: str, subsection: str = None) -> str:
+@timed_tool()
+async def double_click_element(section: str, element: str, subsection: str = None) -> str:
     """
     Double-click on a specific element within a section of PowerChart.
     
@@ -233,19 +540,17 @@ def double_click_element(section: str, element: str, subsection: str = None) ->
     location = find_location_by_name(section, element, subsection)
     
     if not location:
-        if subsection:
-            return f"Error: Could not find element '{element}' in section '{section}', subsection '{subsection}'"
-        else:
-            return f"Error: Could not find element '{element}' in section '{section}'"
+        return not_found_message(section, element, subsection)
     
-    click_at_coordinates(location.x, location.y, clicks=2, interval=0.1)
+    location = await in_ui_thread(recorded_input, "double_click_element", {"section": section, "element": element, "subsection": subsection},
+                                  click_element, location, clicks=2, interval=0.1, settle_section=section)
     if subsection:
         return f"Double-clicked on {element} (coordinates: {location.x}, {location.y}) in subsection {subsection}"
     else:
         return f"Double-clicked on {element} (coordinates: {location.x}, {location.y})"
 
-@mcp.tool()
-def scroll_section(section: str, direction: Literal["up", "down"], clicks: int = 1) -> str:
+@timed_tool()
+async def scroll_section(section: str, direction: Literal["up", "down"], clicks: int = 1) -> str:
     """
     Scroll up or down within a section of PowerChart.
     
@@ -264,28 +569,588 @@ def scroll_section(section: str, direction: Literal["up", "down"], clicks: int =
     if not location:
         return f"Error: Could not find scroll {direction} element for section '{section}'"
     
-    for _ in range(clicks):
-        click_at_coordinates(location.x, location.y)
-        time.sleep(0.2)  # Small delay between scrolls
+    # All scroll clicks go to the backend as one batch, 0.2 s apart
+    await in_ui_thread(recorded_input, "scroll_section", {"section": section, "direction": direction, "clicks": clicks},
+                       scroll_element, location, clicks, settle_section=section)
     
     return f"Scrolled {direction} {clicks} times in section '{section}'"
 
-@mcp.tool()
-def capture_screen_section(section: str) -> bytes:
+@timed_tool()
+async def capture_screen_section(
+    section: str,
+    format: Literal["png", "jpeg", "webp"] = None,
+    compress_level: int = None,
+    quality: int = None,
+    max_dim: int = None,
+    grayscale: bool = None,
+    colors: int = None,
+    patient: str = None,
+    ctx: Context = None,
+) -> Union[List[Union[Image, str]], str]:
     """
-    Capture a screenshot of a specific section of PowerChart.
+    Capture a screenshot of a specific section of PowerChart. Each section has its own
+    encoding defaults (the "capture" block of its screen_sections entry in coordinates.json),
+    chosen to keep the image small; any option passed here overrides them. The capture is
+    archived, and a log message says whether the frame was new or identical to an earlier one.
     
     Args:
         section: The section of PowerChart to capture
+        format: Image format ("png", "jpeg" or "webp")
+        compress_level: PNG compression level 0-9 (1 is fastest) or WebP method 0-6
+        quality: JPEG/WebP quality 1-100
+        max_dim: Maximum width/height in pixels; larger captures are downscaled (0: full size)
+        grayscale: Whether to convert the capture to grayscale
+        colors: PNG only: quantize to a palette of this many colors, 2-256 (0: no palette)
+        patient: Optional patient the capture belongs to, for latest_capture lookups
     
     Returns:
-        Screenshot image data
+        The screenshot, and a line with its size before and after encoding
     """
-    if section not in SCREEN_SECTIONS:
+    region = CONFIG.catalog.screen_sections.get(section)
+    if region is None:
         return f"Error: Section '{section}' not defined for screenshots"
     
-    screenshot_data = take_screenshot(section)
-    return screenshot_data
+    try:
+        options = section_options(section, format=format, compress_level=compress_level, quality=quality,
+                                  max_dim=max_dim, grayscale=grayscale, colors=colors)
+    except ValueError as e:
+        return f"Error: Section '{section}' has invalid capture settings: {e}"
+    error = options.validate()
+    if error:
+        return f"Error: {error}"
+    
+    frame = await in_worker(grab_region, region)
+    screenshot_data, new = await in_worker(store_capture, frame, section, patient, options)
+    if ctx is not None and new is not None:
+        await ctx.info(f"Capture of '{section}': " + ("new frame" if new else "unchanged since an earlier capture"))
+    RECORDER.record("capture_screen_section", {"section": section})
+    return [Image(data=screenshot_data, format=options.format), payload_summary(section, frame, options, len(screenshot_data))]
+
+@timed_tool()
+async def capture_sections(
+    sections: List[str],
+    format: Literal["png", "jpeg", "webp"] = None,
+    compress_level: int = None,
+    quality: int = None,
+    max_dim: int = None,
+    grayscale: bool = None,
+    colors: int = None,
+    patient: str = None,
+) -> Union[List[Union[Image, str]], str]:
+    """
+    Capture several sections of PowerChart from a single screen grab, e.g. inpatient_manage
+    and warning_sign. Cheaper than one capture_screen_section call per section, and every
+    image shows the same moment. Encoding works as for capture_screen_section: each section's
+    own defaults, overridden by any option passed here.
+    
+    Args:
+        sections: The sections of PowerChart to capture
+        format: Image format ("png", "jpeg" or "webp")
+        compress_level: PNG compression level 0-9 (1 is fastest) or WebP method 0-6
+        quality: JPEG/WebP quality 1-100
+        max_dim: Maximum width/height in pixels; larger captures are downscaled (0: full size)
+        grayscale: Whether to convert the captures to grayscale
+        colors: PNG only: quantize to a palette of this many colors, 2-256 (0: no palette)
+        patient: Optional patient the captures belong to, for latest_capture lookups
+    
+    Returns:
+        For each section in order, its screenshot and a line with its size before and after encoding
+        and whether the frame was new or identical to an earlier capture
+    """
+    catalog = CONFIG.catalog
+    if not sections:
+        return "Error: No sections given"
+    missing = [section for section in sections if section not in catalog.screen_sections]
+    if missing:
+        return f"Error: Section(s) not defined for screenshots: {', '.join(missing)}"
+    
+    all_options = []
+    for section in sections:
+        try:
+            options = section_options(section, format=format, compress_level=compress_level, quality=quality,
+                                      max_dim=max_dim, grayscale=grayscale, colors=colors)
+        except ValueError as e:
+            return f"Error: Section '{section}' has invalid capture settings: {e}"
+        error = options.validate()
+        if error:
+            return f"Error: {error}"
+        all_options.append(options)
+    
+    frames = await in_worker(grab_regions, [catalog.screen_sections[section] for section in sections])
+    # Sections are encoded in parallel; the encoders release the GIL
+    encoded = await asyncio.gather(*(
+        in_worker(store_capture, frame, section, patient, options)
+        for frame, section, options in zip(frames, sections, all_options)
+    ))
+    RECORDER.record("capture_sections", {"sections": list(sections)})
+    result = []
+    for frame, section, options, (data, new) in zip(frames, sections, all_options, encoded):
+        result += [Image(data=data, format=options.format), payload_summary(section, frame, options, len(data), new)]
+    return result
+
+@timed_tool()
+async def capture_section_text(section: str, min_confidence: float = 0.0) -> dict:
+    """
+    Read a section of PowerChart as text with a locally installed OCR engine (Tesseract),
+    instead of returning a screenshot. Results are cached by image content, so reading
+    an unchanged section again costs no OCR.
+    
+    Args:
+        section: The section of PowerChart to read
+        min_confidence: Drop lines whose mean word confidence (0-100) is below this
+    
+    Returns:
+        text of the section, lines with their bounding boxes (left, top, right, bottom) in
+        screen coordinates and confidence, whether the result came from the cache, and ocr_ms
+    """
+    region = CONFIG.catalog.screen_sections.get(section)
+    if region is None:
+        return {"error": f"Section '{section}' not defined for screenshots"}
+    if OCR is None:
+        return {"error": "OCR is disabled (POWERCHART_OCR=0)"}
+    
+    frame = await in_worker(grab_region, region)
+    try:
+        result = await in_worker(OCR.read, frame, region)
+    except OcrUnavailable as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"OCR failed: {e}"}
+    RECORDER.record("capture_section_text", {"section": section})
+    return {"section": section, **result.as_dict(min_confidence)}
+
+@timed_tool()
+async def capture_scrolling_section(
+    section: str,
+    clicks_per_page: int = 9,
+    max_pages: int = 20,
+    ignore_right: int = 30,
+    format: Literal["png", "jpeg", "webp"] = "png",
+    compress_level: int = 6,
+    quality: int = 85,
+    max_dim: int = None,
+    grayscale: bool = False,
+    patient: str = None,
+) -> Union[List[Union[Image, str]], str]:
+    """
+    Capture a whole scrollable section as one tall image. Scrolls down a page at a time,
+    keeps only the rows each scroll reveals and stops when a scroll shows nothing new.
+    
+    Args:
+        section: The section of PowerChart to scroll (it must have a "scroll down" element)
+        clicks_per_page: Scroll-down clicks per page
+        max_pages: Maximum number of pages to capture
+        ignore_right: Width in pixels at the right edge (the scrollbar) ignored when aligning pages
+        format: Image format ("png", "jpeg" or "webp")
+        compress_level: PNG compression level 0-9 (1 is fastest) or WebP method 0-6
+        quality: JPEG/WebP quality 1-100
+        max_dim: Optional maximum width/height in pixels; larger captures are downscaled
+        grayscale: Whether to convert the capture to grayscale
+        patient: Optional patient the capture belongs to, for latest_capture lookups
+    
+    Returns:
+        The stitched image, and a line with its size, the number of pages and whether it is new
+    """
+    catalog = CONFIG.catalog
+    scroll = catalog.find(section, "scroll down")
+    if scroll is None:
+        return f"Error: Could not find scroll down element for section '{section}'"
+    region = catalog.region_for(section)
+    if region is None:
+        return f"Error: Section '{section}' has no screen section to capture"
+    if clicks_per_page < 1 or max_pages < 1:
+        return "Error: clicks_per_page and max_pages must be at least 1"
+    
+    options = CaptureOptions(format, compress_level, quality, max_dim, grayscale)
+    error = options.validate()
+    if error:
+        return f"Error: {error}"
+    
+    image, pages, reached_end = await in_ui_thread(scroll_and_stitch, scroll, region, clicks_per_page, max_pages, ignore_right)
+    name = f"{section} (scrolled)"
+    data, new = await in_worker(store_capture, image, name, patient, options)
+    summary = payload_summary(name, image, options, len(data), new)
+    summary += f"\n{pages} page(s) stitched" + ("" if reached_end else ", stopped at max_pages before the end")
+    return [Image(data=data, format=options.format), summary]
+
+@timed_tool()
+async def save_screen_section(
+    section: str,
+    format: Literal["png", "jpeg", "webp"] = "png",
+    compress_level: int = 6,
+    quality: int = 85,
+    max_dim: int = None,
+    grayscale: bool = False,
+    patient: str = None,
+) -> dict:
+    """
+    Capture a screen section to a file in the background and return a handle at once,
+    without waiting for the image to be encoded. Check on it with capture_status, which
+    also reports whether the frame was new.
+    
+    Args:
+        section: The section of PowerChart to capture
+        format: Image format ("png", "jpeg" or "webp")
+        compress_level: PNG compression level 0-9 (1 is fastest) or WebP method 0-6
+        quality: JPEG/WebP quality 1-100
+        max_dim: Optional maximum width/height in pixels; larger captures are downscaled
+        grayscale: Whether to convert the capture to grayscale
+        patient: Optional patient the capture belongs to, for latest_capture lookups
+    
+    Returns:
+        The capture handle: id and status ("pending")
+    """
+    region = CONFIG.catalog.screen_sections.get(section)
+    if region is None:
+        return {"error": f"Section '{section}' not defined for screenshots"}
+    
+    options = CaptureOptions(format, compress_level, quality, max_dim, grayscale)
+    error = options.validate()
+    if error:
+        return {"error": error}
+    
+    frame = await in_worker(grab_region, region)
+    now = time.time()
+    stamp = time.strftime("%H%M%S", time.localtime(now)) + f"{int(now * 1000) % 1000:03d}"
+    # submit() blocks while the queue is full, so keep it off the event loop
+    handle = await in_worker(queue_capture, frame, section, patient, options,
+                             time.strftime("%Y-%m-%d", time.localtime(now)), f"{stamp}-{section}.{format}")
+    return handle.as_dict()
+
+@timed_tool()
+async def capture_status(handles: List[str] = None, wait: bool = False) -> dict:
+    """
+    Report the status of captures queued by save_screen_section, perform_workflow or run_census.
+    
+    Args:
+        handles: Capture handle ids (default: the 20 most recent captures)
+        wait: Wait until the listed captures have been written
+    
+    Returns:
+        For each capture: status ("pending", "done" or "error"), path, size and encode time,
+        plus how many captures are still queued
+    """
+    if handles:
+        found = {handle_id: PIPELINE.get(handle_id) for handle_id in handles}
+        unknown = [handle_id for handle_id, handle in found.items() if handle is None]
+        if unknown:
+            return {"error": f"Unknown capture handle(s): {', '.join(unknown)}"}
+        selected = list(found.values())
+    else:
+        selected = PIPELINE.recent()
+    
+    if wait:
+        await in_worker(PIPELINE.drain, selected, 60.0)
+    return {"captures": [handle.as_dict() for handle in selected], "pending": PIPELINE.pending}
+
+@timed_tool()
+async def latest_capture(section: str, patient: str = None) -> Union[List[Union[Image, dict]], str]:
+    """
+    Return the most recent archived capture of a section without touching the screen.
+    
+    Args:
+        section: The screen section (for capture_scrolling_section captures, "<section> (scrolled)")
+        patient: The patient the capture was made for (omit for captures made without one)
+    
+    Returns:
+        The archived image, and its record: when it was taken, its hash and whether it was new then
+    """
+    if ARCHIVE is None:
+        return "Error: The capture archive is disabled (POWERCHART_ARCHIVE=0)"
+    entry = await in_worker(ARCHIVE.latest, section, patient)
+    if entry is None:
+        who = f" for patient '{patient}'" if patient else ""
+        return f"Error: No archived capture of '{section}'{who}"
+    data = await in_worker(entry.path.read_bytes)
+    record = {key: value for key, value in entry.as_dict().items() if key != "path"}
+    return [Image(data=data, format=entry.path.suffix.lstrip(".")), record]
+
+@timed_tool()
+async def capture_history(section: str, patient: str = None, limit: int = 20) -> dict:
+    """
+    List archived captures of a section, newest first. Consecutive entries with the
+    same hash are identical frames.
+    
+    Args:
+        section: The screen section
+        patient: The patient the captures were made for (omit for captures made without one)
+        limit: Maximum number of entries
+    
+    Returns:
+        Capture time, content hash, size and whether each frame was new, plus archive totals
+    """
+    if ARCHIVE is None:
+        return {"error": "The capture archive is disabled (POWERCHART_ARCHIVE=0)"}
+    entries = await in_worker(ARCHIVE.history, section, patient, max(limit, 1))
+    return {"captures": [entry.as_dict() for entry in entries], "archive": await in_worker(ARCHIVE.stats)}
+
+@timed_tool()
+async def has_section_changed(
+    section: str,
+    threshold: int = 16,
+    min_fraction: float = 0.0,
+    tile_size: int = 32,
+    reset: bool = False,
+) -> dict:
+    """
+    Check whether a screen section changed since the last time it was checked,
+    without returning a screenshot. Use this to skip captures when nothing is new.
+    
+    Args:
+        section: The screen section to check
+        threshold: Minimum gray-level difference (0-255) for a pixel to count as changed
+        min_fraction: Fraction of changed pixels (0-1) at or below which the section counts as unchanged
+        tile_size: Tile edge in pixels used to group changes into bounding boxes
+        reset: Forget the stored frame first, so this call only records a new baseline
+    
+    Returns:
+        changed flag, changed_fraction of pixels, and bounding boxes (left, top, right, bottom)
+        of the changed areas in screen coordinates
+    """
+    region = CONFIG.catalog.screen_sections.get(section)
+    if region is None:
+        return {"error": f"Section '{section}' not defined for screenshots"}
+    
+    if reset:
+        CHANGES.reset(section)
+    
+    frame = await in_worker(grab_region, region)
+    report = await in_worker(
+        CHANGES.compare, section, frame, region,
+        threshold=threshold, tile_size=max(tile_size, 1), min_fraction=min_fraction,
+    )
+    return {"section": section, **report.as_dict()}
+
+@timed_tool()
+async def has_new_content(section: str, patient: str = None, record: bool = True) -> dict:
+    """
+    Check whether a screen section shows anything new since the last run for this
+    patient, without returning a screenshot. Unlike has_section_changed, the
+    comparison survives server restarts.
+    
+    Args:
+        section: The screen section to check
+        patient: The patient whose last run to compare against
+        record: Store this frame as the new last-seen frame
+    
+    Returns:
+        new flag, and when the section was last seen and last changed
+    """
+    if STATE is None:
+        return {"error": "The state store is unavailable (see the server log)"}
+    region = CONFIG.catalog.screen_sections.get(section)
+    if region is None:
+        return {"error": f"Section '{section}' not defined for screenshots"}
+    
+    frame = await in_worker(grab_region, region)
+    hash = await in_worker(frame_hash, frame)
+    if record:
+        new, previous = await in_worker(STATE.update, patient, section, "frame", hash)
+    else:
+        previous = await in_worker(STATE.get, patient, section, "frame")
+        new = previous is None or previous.value != hash
+    result = {"section": section, "new": new}
+    if previous is not None:
+        marker = previous.as_dict()
+        result.update(last_seen=marker["seen"], last_changed=marker["changed"])
+    return result
+
+@timed_tool()
+async def mark_seen(section: str, value: str, kind: str = "date", patient: str = None) -> dict:
+    """
+    Record what was seen in a section, e.g. the latest media date or a microbiology
+    LAST_UPDATED, and find out whether it is new for this patient.
+    
+    Args:
+        section: Section the value was read from (any name, e.g. "media_gallery" or "microbiology")
+        value: The value seen; dates like 03/14/2025 or 2025-03-14 14:05 are compared as dates
+        kind: "date", "frame" or "note"
+        patient: The patient the value belongs to
+    
+    Returns:
+        new flag (a date must be later than the stored one) and the previous value
+    """
+    if STATE is None:
+        return {"error": "The state store is unavailable (see the server log)"}
+    if kind not in MARKER_KINDS:
+        return {"error": f"Unknown kind '{kind}' (expected one of {', '.join(MARKER_KINDS)})"}
+    new, previous = await in_worker(STATE.update, patient, section, kind, value)
+    return {"section": section, "kind": kind, "new": new, "previous": previous.value if previous else None}
+
+@timed_tool()
+async def last_seen(patient: str = None, section: str = None) -> dict:
+    """
+    List what was last seen for a patient: dates, frame hashes and newest note hashes per section.
+    
+    Args:
+        patient: The patient
+        section: Only this section
+    
+    Returns:
+        The stored markers with when each was last seen and last changed
+    """
+    if STATE is None:
+        return {"error": "The state store is unavailable (see the server log)"}
+    markers = await in_worker(STATE.markers, patient, section)
+    return {"patient": patient, "markers": [marker.as_dict() for marker in markers]}
+
+@timed_tool()
+async def reset_last_seen(patient: str = None, section: str = None) -> str:
+    """
+    Forget what was last seen for a patient, so the next run treats every section as new.
+    
+    Args:
+        patient: The patient
+        section: Only forget this section
+    
+    Returns:
+        How many markers were removed
+    """
+    if STATE is None:
+        return "Error: The state store is unavailable (see the server log)"
+    removed = await in_worker(STATE.forget, patient, section)
+    return f"Removed {removed} last-seen marker(s)"
+
+@timed_tool()
+async def capture_element_template(section: str, element: str, subsection: str = None, size: int = 48) -> str:
+    """
+    Save a small reference crop around an element's stored coordinates, so later clicks
+    on it find it on screen even if the window has shifted. Run this while the screen
+    matches coordinates.json.
+    
+    Args:
+        section: The section containing the element
+        element: The element to save a template for
+        subsection: Optional subsection
+        size: Edge of the square crop in screen points; pick a size that covers the element's label or icon
+    
+    Returns:
+        Where the template was saved
+    """
+    if LOCATOR is None:
+        return "Error: The locator is disabled (POWERCHART_LOCATOR=0)"
+    location = CONFIG.catalog.find(section, element, subsection)
+    if location is None:
+        return not_found_message(section, element, subsection)
+    if not 8 <= size <= LOCATOR.search_radius:
+        return f"Error: size must be between 8 and {LOCATOR.search_radius}"
+    path = await in_worker(LOCATOR.save_template, location, size)
+    return f"Saved a {size}x{size} template for '{element}' at ({location.x}, {location.y}) to {path}"
+
+@timed_tool()
+async def locate_element(section: str, element: str, subsection: str = None, relocate: bool = False) -> dict:
+    """
+    Find where an element is on screen now, using its template.
+    
+    Args:
+        section: The section containing the element
+        element: The element to locate
+        subsection: Optional subsection
+        relocate: Search the screen again instead of using the cached position
+    
+    Returns:
+        Stored and current coordinates, the offset between them and the match score
+    """
+    if LOCATOR is None:
+        return {"error": "The locator is disabled (POWERCHART_LOCATOR=0)"}
+    location = CONFIG.catalog.find(section, element, subsection)
+    if location is None:
+        return {"error": not_found_message(section, element, subsection).removeprefix("Error: ")}
+    if not LOCATOR.has_template(location):
+        return {"error": f"No template for '{element}'; save one with capture_element_template"}
+    match = await in_worker(LOCATOR.locate, location, not relocate)
+    result = {"element": element, "stored": {"x": location.x, "y": location.y}}
+    if match is None:
+        return {**result, "found": False, "using": "stored coordinates"}
+    return {**result, "found": True, **match.as_dict()}
+
+@timed_tool()
+async def reload_coordinates() -> str:
+    """
+    Reload coordinates.json and workflows.json now, without restarting the server.
+    Changes are also picked up automatically within about a second.
+    
+    Returns:
+        Reload time and which coordinate sections were recompiled
+    """
+    return await in_worker(reload_config)
+
+@timed_tool()
+async def health() -> dict:
+    """
+    Check that PowerChart can be driven: whether the Citrix session processes are
+    running, from one process-table snapshot, plus the server's own state.
+    
+    Returns:
+        ok flag, running state of each Citrix process, input backend, whether a tool holds
+        the UI lock, queued captures and invalid workflows
+    """
+    config = CONFIG
+    apps = citrix_processes()
+    result = {"input_backend": get_backend().name, "ui_busy": UI_LOCK.locked(), "captures_pending": PIPELINE.pending,
+              "invalid_workflows": sorted(config.workflow_errors)}
+    try:
+        citrix = await in_worker(MONITOR.status, apps)
+    except Exception as e:
+        return {"ok": False, "citrix_error": f"Cannot list processes: {e}", **result}
+    return {"ok": bool(citrix) and all(citrix.values()), "citrix": citrix, **result}
+
+@timed_tool()
+async def probe_pixels(names: List[str] = None) -> dict:
+    """
+    Read the colors of named pixel probes (from probes.json) in a single small grab.
+    Much cheaper than a screenshot for checking UI state, e.g. whether a warning is showing.
+    
+    Args:
+        names: Probes to read (default: all)
+    
+    Returns:
+        For each probe, its color [r, g, b], the expected color and whether it matches,
+        plus "all_match" (probes without an expected color are ignored)
+    """
+    config = CONFIG
+    names = names or list(config.probes)
+    missing = [name for name in names if name not in config.probes]
+    if missing:
+        return {"error": f"Unknown probe(s): {', '.join(missing)}. Available: {', '.join(config.probes)}"}
+    if not names:
+        return {"error": "No probes defined. Add them to probes.json"}
+    
+    readings = await in_worker(read_probes, [config.probes[name] for name in names])
+    return {"probes": readings, "all_match": all(r["match"] is not False for r in readings.values())}
+
+@timed_tool()
+async def wait_for_probes(names: List[str], timeout: float = 5.0, interval: float = 0.03) -> str:
+    """
+    Wait until every named probe shows its expected color, polling tens of times per second.
+    
+    Args:
+        names: Probes that must all match (each needs an "expect" color in probes.json)
+        timeout: Maximum seconds to wait
+        interval: Seconds between polls
+    
+    Returns:
+        How long the wait took, or a timeout error with the last colors seen
+    """
+    config = CONFIG
+    missing = [name for name in names if name not in config.probes]
+    if missing:
+        return f"Error: Unknown probe(s): {', '.join(missing)}"
+    probes = [config.probes[name] for name in names]
+    unexpected = [probe.name for probe in probes if probe.expect is None]
+    if unexpected:
+        return f"Error: Probe(s) have no expected color: {', '.join(unexpected)}"
+    
+    start = time.perf_counter()
+    matched = await in_worker(wait_for_probe_match, tuple(probes), timeout, max(interval, 0.0))
+    elapsed = time.perf_counter() - start
+    if matched:
+        RECORDER.record("wait_for_probes", {"probes": list(names), "timeout": timeout})
+        return f"Probes matched after {elapsed * 1000:.0f} ms"
+    
+    readings = await in_worker(read_probes, probes)
+    seen = ", ".join(f"{name}={reading['color']}" for name, reading in readings.items())
+    return f"Error: Timed out after {elapsed:.2f} s waiting for probes ({seen})"
 
 @mcp.resource("coordinates://{section}")
 def get_coordinates(section: str) -> str:
@@ -298,10 +1163,11 @@ def get_coordinates(section: str) -> str:
     Returns:
         Information about available coordinates
     """
-    if section not in COORDINATES:
+    coordinates = CONFIG.catalog.coordinates
+    if section not in coordinates:
         return f"No coordinates available for section '{section}'"
     
-    section_coords = COORDINATES[section]
+    section_coords = coordinates[section]
     result = f"Available coordinates in section '{section}':\n\n"
     
     if isinstance(section_coords, list):
@@ -330,19 +1196,35 @@ def list_sections() -> str:
     Returns:
         List of available sections
     """
+    catalog = CONFIG.catalog
     result = "Available PowerChart sections:\n\n"
     
-    for section in COORDINATES.keys():
+    for section in catalog.coordinates.keys():
         result += f"- {section}\n"
     
     result += "\nAvailable screenshot sections:\n\n"
-    for section in SCREEN_SECTIONS.keys():
+    for section in catalog.screen_sections.keys():
         result += f"- {section}\n"
     
     return result
 
-@mcp.tool()
-def click_patient_from_list(position: int) -> str:
+@mcp.resource("input://stats")
+def input_stats() -> str:
+    """
+    Report latency statistics for the active input backend.
+    
+    Returns:
+        Backend name with batch and per-op timings
+    """
+    backend = get_backend()
+    stats = backend.stats.summary()
+    result = f"Input backend: {backend.name}\n\n"
+    for name, value in stats.items():
+        result += f"- {name}: {value}\n"
+    return result
+
+@timed_tool()
+async def click_patient_from_list(position: int) -> str:
     """
     Click on a patient at a specific position in the patient list.
     
@@ -359,90 +1241,336 @@ def click_patient_from_list(position: int) -> str:
     if not location:
         return f"Error: Could not find patient at position {position}"
     
-    double_click = click_at_coordinates(location.x, location.y, clicks=2, interval=0.1)
+    location = await in_ui_thread(click_element, location, clicks=2, interval=0.1)
     return f"Double-clicked on patient at position {position} (coordinates: {location.x}, {location.y})"
 
-@mcp.tool()
-def perform_workflow(workflow_name: str) -> str:
+@timed_tool()
+async def perform_workflow(workflow_name: str, save_captures: bool = True, patient: str = None) -> str:
     """
     Perform a predefined workflow in PowerChart.
     
     Args:
-        workflow_name: Name of the workflow to perform
-    
-    Returns:
-        Result of the workflow
-    """
-    workflows = {
-        "open_patient_list": [
-            {"action": "navigate_to", "params": {"section": "home", "element": "Patient List"}},
-            {"action": "navigate_to", "params": {"section": "patient_lists", "element": "Pink A"}}
-        ],
-        "check_documentation": [
-            {"action": "navigate_to", "params": {"section": "specific_patient", "element": "Provider View"}},
-            {"action": "navigate_to", "params": {"section": "documentation", "element": "Documentation"}},
-            {"action": "capture_screen_section", "params": {"section": "inpatient_manage"}}
-        ],
-        "view_lab_results": [
-            {"action": "navigate_to", "params": {"section": "specific_patient", "element": "Provider View"}},
-            {"action": "navigate_to", "params": {"section": "labs", "element": "Results Review"}},
-            {"action": "navigate_to", "params": {"section": "labs", "element": "All Laboratory"}}
-        ],
-        "check_patient_details": [
-            {"action": "navigate_to", "params": {"section": "specific_patient", "element": "Provider View"}},
-            {"action": "navigate_to", "params": {"section": "specific_patient", "element": "Inpatient/Manage"}},
-            {"action": "navigate_to", "params": {"section": "section_headers", "element": "Hospital Course", "subsection": "default"}},
-            {"action": "capture_screen_section", "params": {"section": "inpatient_manage"}},
-            {"action": "navigate_to", "params": {"section": "section_headers", "element": "Problem List", "subsection": "default"}},
-            {"action": "capture_screen_section", "params": {"section": "inpatient_manage"}}
-        ],
-        "view_media_gallery": [
-            {"action": "navigate_to", "params": {"section": "specific_patient", "element": "Provider View"}},
-            {"action": "navigate_to", "params": {"section": "specific_patient", "element": "Inpatient/Manage"}},
-            {"action": "navigate_to", "params": {"section": "section_headers", "element": "Media Gallery", "subsection": "default"}},
-            {"action": "capture_screen_section", "params": {"section": "media_gallery_folder"}}
-        ]
-    }
+        workflow_name: Name of the workflow to perform (see workflows://list)
+        save_captures: Save the workflow's screenshots as PNG files (see capture_status)
+        patient: Optional patient the captures belong to, for latest_capture lookups and for
+            skip_if_unchanged steps, which skip sections that look the same as on this patient's last run
     
-    if workflow_name not in workflows:
+    Returns:
+        Result of the workflow, with the time taken by each step, the text of capture_section_text steps
+        and the capture handles
+    """
+    config = CONFIG
+    if workflow_name in config.workflow_errors:
+        return f"Error: Workflow '{workflow_name}' is invalid: {config.workflow_errors[workflow_name]}"
+    if workflow_name not in config.workflows:
         return f"Error: Workflow '{workflow_name}' not defined"
     
-    results = []
-    for step in workflows[workflow_name]:
-        action = step["action"]
-        params = step["params"]
-        
-        if action == "navigate_to":
-            # Check if subsection is specified
-            subsection = params.pop("subsection", None)
-            if subsection:
-                # Find location in specific subsection
-                location = find_location_by_name(params["section"], params["element"], subsection)
-                if not location:
-                    message = f"Error: Could not find element '{params['element']}' in section '{params['section']}', subsection '{subsection}'"
-                    results.append(message)
-                    continue
-                
-                # Click on the location
-                click_at_coordinates(location.x, location.y)
-                message = f"Clicked on {params['element']} (coordinates: {location.x}, {location.y}) in subsection {subsection}"
-                results.append(message)
-            else:
-                # Use regular navigate_to function
-                result = navigate_to(**params)
-                results.append(result)
-            
-            time.sleep(1)  # Wait between navigation steps
-        elif action == "capture_screen_section":
-            section = params.get("section")
-            if section in SCREEN_SECTIONS:
-                result = f"Screen section '{section}' captured"
-                capture_screen_section(**params)
-                results.append(result)
-            else:
-                results.append(f"Error: Screen section '{section}' not found")
-    
-    return f"Workflow '{workflow_name}' completed. Steps performed:\n" + "\n".join(results)
+    # The whole workflow holds the UI lock so no other tool's input interleaves with it
+    runtime, handles = workflow_runtime(workflow_name, patient, save_captures)
+    result, trace_files = await in_ui_thread(run_workflow, config.workflows[workflow_name], runtime)
+    return run_summary(result, handles, trace_files)
+
+@timed_tool()
+async def run_census(
+    workflow_name: str,
+    positions: List[int] = None,
+    return_workflow: str = None,
+    run_id: str = None,
+    restart: bool = False,
+    ctx: Context = None,
+) -> str:
+    """
+    Run a workflow for every patient on the open patient list in one call (rounding on
+    the whole list). Progress is saved after each patient; calling again with the same
+    run_id resumes at the first unfinished patient, e.g. after a Citrix hiccup.
+    
+    Args:
+        workflow_name: Workflow to run for each patient, after double-clicking them in the list
+        positions: Patient list positions to visit (default: every "Patient N" in the coordinates)
+        return_workflow: Optional workflow run after each patient to get back to the list (e.g. "open_patient_list")
+        run_id: Name of the run (default: today's date and the workflow name)
+        restart: Discard saved progress for this run_id and start from the first patient
+    
+    Returns:
+        How many patients were done, any failure, and where the captures were written
+    """
+    config = CONFIG
+    plans = {}
+    for name in filter(None, (workflow_name, return_workflow)):
+        if name in config.workflow_errors:
+            return f"Error: Workflow '{name}' is invalid: {config.workflow_errors[name]}"
+        if name not in config.workflows:
+            return f"Error: Workflow '{name}' not defined"
+        plans[name] = config.workflows[name]
+    
+    known = patient_positions(config.catalog)
+    positions = positions or known
+    unknown = [p for p in positions if p not in known]
+    if unknown:
+        return f"Error: No coordinates for patient position(s) {', '.join(map(str, unknown))}"
+    
+    run_id = run_id or f"{time.strftime('%Y-%m-%d')}-{workflow_name}"
+    root = data_dir() / "census"
+    if restart:
+        (root / run_id / "checkpoint.json").unlink(missing_ok=True)
+    
+    # Wired like workflow_runtime, except check steps never skip: a list position isn't a patient identity
+    runtime = Runtime(send_input, grab_region, WAIT.pause, wait_for_probe_match, None, None,
+                      read_section_text, grab_regions)
+    try:
+        runner = CensusRunner(run_id, plans[workflow_name], positions, root, open_patient, runtime, PIPELINE,
+                              plans.get(return_workflow))
+    except (CensusError, ValueError, OSError) as e:
+        return f"Error: Cannot start census: {e}"
+    
+    remaining = runner.remaining()
+    total = len(runner.state["positions"])
+    async with UI_LOCK:
+        for position in remaining:
+            result = await on_ui_thread(runner.run_patient, position)
+            if ctx is not None:
+                done = total - len(runner.remaining())
+                await ctx.report_progress(done, total)
+                await ctx.info(f"Patient {position}: " + ("done" if result.ok else f"failed: {result.error}"))
+            if not result.ok:
+                break
+    
+    # Encoding and writing finish off the UI thread
+    await in_worker(runner.finish)
+    return runner.summary()
+
+@timed_tool()
+async def harvest_notes(
+    patient: str = None,
+    max_pages: int = 1,
+    stop_after_known: int = 1,
+    open_view: bool = True,
+    ctx: Context = None,
+) -> dict:
+    """
+    Read the notes in the Documentation view, newest first, in one call: click each
+    note, select all, copy. Each note's text is sent as a log message as soon as it is
+    read, with progress after every note. Notes already harvested for this patient are
+    recognised by a hash of their text, so a re-run stops once it reaches them.
+    
+    Args:
+        patient: The patient the notes belong to (keys the already-harvested check)
+        max_pages: Pages of 18 notes to walk at most
+        stop_after_known: Stop after this many already-harvested notes in a row (0: read every page)
+        open_view: Click "Documentation" first to open the Documentation view
+    
+    Returns:
+        The new notes' text, how many notes were read, and why the walk stopped
+    """
+    if NOTES is None:
+        return {"error": "The note store is unavailable (see the server log)"}
+    config = CONFIG
+    try:
+        clipboard = get_clipboard()
+    except RuntimeError as e:
+        return {"error": str(e)}
+    
+    region = settle_region("documentation")
+    try:
+        harvester = NoteHarvester(NoteLayout.from_catalog(config.catalog), send_input, lambda ops: get_backend().run(ops), clipboard,
+                                  WAIT.wait_until, NOTES, patient, region, max(max_pages, 1), max(stop_after_known, 0))
+    except ValueError as e:
+        return {"error": f"Cannot harvest notes: {e}"}
+    
+    new_notes = []
+    async with UI_LOCK:
+        if open_view:
+            view = config.catalog.find("documentation", "Documentation")
+            if view is None:
+                return {"error": "Could not find element 'Documentation' in section 'documentation'"}
+            await on_ui_thread(send_input, click_ops(view.x, view.y), region)
+        while True:
+            note = await on_ui_thread(harvester.step)
+            if note is None:
+                break
+            if harvester.read == 1 and STATE is not None:
+                await in_worker(STATE.update, patient, "documentation", "note", note.hash)
+            if note.new:
+                new_notes.append(note.as_dict())
+            if ctx is not None:
+                await ctx.report_progress(harvester.read, None)
+                if note.new:
+                    await ctx.info(f"Note {note.page}.{note.position}:\n{note.text}")
+                else:
+                    await ctx.info(f"Note {note.page}.{note.position}: already harvested")
+    
+    return {
+        "patient": patient,
+        "notes": new_notes,
+        "read": harvester.read,
+        "new": harvester.new,
+        "pages": harvester.page,
+        "stopped": harvester.stopped,
+        "stored": await in_worker(NOTES.count, patient),
+    }
+
+@timed_tool()
+async def record_macro(name: str, description: str = "") -> str:
+    """
+    Start recording a macro. Every navigate_to, double_click_element, scroll_section,
+    capture and wait_for_probes call from now on is added to it, until stop_recording.
+    
+    Args:
+        name: Name to save the macro under (an existing macro of that name is replaced)
+        description: What the macro does
+    
+    Returns:
+        Confirmation that recording started
+    """
+    if not name.strip():
+        return "Error: A macro needs a name"
+    try:
+        RECORDER.start(name.strip(), description)
+    except ValueError as e:
+        return f"Error: Cannot start recording, {e}"
+    return f"Recording macro '{name.strip()}'. Call the tools to record, then stop_recording"
+
+@timed_tool()
+async def stop_recording(save: bool = True) -> str:
+    """
+    Stop recording the current macro and save it.
+    
+    Args:
+        save: Save the macro; False discards the recording
+    
+    Returns:
+        How many calls were recorded and what the optimized replay compiles to
+    """
+    try:
+        name, macro = RECORDER.stop()
+    except ValueError as e:
+        return f"Error: {e}"
+    if not save:
+        return f"Discarded the recording of macro '{name}' ({len(macro['calls'])} calls)"
+    if not macro["calls"]:
+        return f"Error: Macro '{name}' recorded no calls and was not saved"
+    
+    await in_worker(MACROS.save, name, macro)
+    config = CONFIG
+    try:
+        _, stats = compile_macro(CompileContext(config.catalog, SETTLE_DEFAULT_SECTION, config.probes), name, macro)
+    except WorkflowError as e:
+        return f"Saved macro '{name}', but it doesn't compile: {e}"
+    return f"Saved macro '{name}': {stats.summary()}. Replay it with run_macro"
+
+@timed_tool()
+async def run_macro(name: str, save_captures: bool = True, patient: str = None) -> str:
+    """
+    Replay a recorded macro as one call. The replay skips repeated clicks, sends input
+    that doesn't need to wait for the screen as one batch, and waits on pixel probes
+    instead of screen-settle where the recording saw a probe change.
+    
+    Args:
+        name: Name of the macro (see macros://list)
+        save_captures: Save the macro's screenshots as PNG files (see capture_status)
+        patient: Optional patient the captures belong to, for latest_capture lookups
+    
+    Returns:
+        Result of the replay, with the time taken by each step and the capture handles
+    """
+    macro = await in_worker(MACROS.get, name)
+    if macro is None:
+        return f"Error: Macro '{name}' not found"
+    config = CONFIG
+    try:
+        plan, _ = compile_macro(CompileContext(config.catalog, SETTLE_DEFAULT_SECTION, config.probes), name, macro)
+    except WorkflowError as e:
+        return f"Error: {e}"
+    
+    runtime, handles = workflow_runtime(name, patient, save_captures, send=send_macro_input)
+    result, trace_files = await in_ui_thread(run_workflow, plan, runtime)
+    return run_summary(result, handles, trace_files)
+
+@timed_tool()
+async def delete_macro(name: str) -> str:
+    """
+    Delete a recorded macro.
+    
+    Args:
+        name: Name of the macro
+    
+    Returns:
+        Result message
+    """
+    if not await in_worker(MACROS.delete, name):
+        return f"Error: Macro '{name}' not found"
+    return f"Deleted macro '{name}'"
+
+@mcp.resource("macros://list")
+def list_macros() -> str:
+    """
+    List the recorded macros.
+    
+    Returns:
+        Macro names with their descriptions, recorded calls and the steps their replay compiles to
+    """
+    config = CONFIG
+    context = CompileContext(config.catalog, SETTLE_DEFAULT_SECTION, config.probes)
+    macros = MACROS.all()
+    if not macros:
+        return "No macros recorded. Start one with record_macro"
+    
+    result = "Recorded macros:\n\n"
+    for name, macro in macros.items():
+        try:
+            _, stats = compile_macro(context, name, macro)
+            result += f"- {name}: {macro.get('description', '')} ({stats.summary()})\n"
+        except WorkflowError as e:
+            result += f"- {name}: invalid, {e}\n"
+    if RECORDER.recording:
+        result += f"\nRecording: {RECORDER.name} ({len(RECORDER.calls)} calls so far)\n"
+    return result
+
+@mcp.resource("metrics://summary")
+def metrics_summary() -> str:
+    """
+    Report where time is going: latency of every tool, input batch, capture, encode
+    and wait since the server started, slowest total first.
+    
+    Returns:
+        A table of timings (count, total, mean, p50, p95, max in ms) and the counters
+    """
+    summary = METRICS.summary()
+    timings = sorted(summary["timings"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    
+    result = f"{'name':<40} {'count':>7} {'total ms':>11} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9}\n"
+    for name, t in timings:
+        result += (f"{name:<40} {t['count']:>7} {t['total_ms']:>11.1f} {t['mean_ms']:>9.1f} "
+                   f"{t['p50_ms']:>9.1f} {t['p95_ms']:>9.1f} {t['max_ms']:>9.1f}\n")
+    
+    result += "\nCounters:\n\n"
+    for name, value in sorted(summary["counters"].items()):
+        result += f"- {name}: {value}\n"
+    
+    directory = trace_dir()
+    if directory is not None:
+        result += f"\nWorkflow traces (JSONL and Chrome trace-event): {directory}\n"
+    return result
+
+@mcp.resource("workflows://list")
+def list_workflows() -> str:
+    """
+    List the predefined workflows.
+    
+    Returns:
+        Workflow names with their descriptions and step counts
+    """
+    config = CONFIG
+    result = "Available workflows:\n\n"
+    for name, plan in config.workflows.items():
+        result += f"- {name}: {plan.description} ({len(plan.steps)} steps)\n"
+    
+    if config.workflow_errors:
+        result += "\nInvalid workflows:\n\n"
+        for name, error in config.workflow_errors.items():
+            result += f"- {name}: {error}\n"
+    
+    return result
 
 # Start the server when run directly
 if __name__ == "__main__":
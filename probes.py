@@ -0,0 +1,86 @@
+"""
+Pixel Probes
+
+Named screen points whose colors signal UI state (e.g. whether a warning is
+showing). A batch of probes is sampled from a single grab of the smallest region
+that contains all of them, so checking UI state costs one small capture instead of
+a full screenshot. Definitions live in probes.json next to coordinates.json.
+"""
+
+import json
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from catalog import Region
+
+Color = Tuple[int, int, int]
+
+class Probe(NamedTuple):
+    """A screen point with an optional expected color"""
+    name: str
+    x: int
+    y: int
+    expect: Optional[Color] = None
+    tolerance: int = 16  # Maximum per-channel difference that still counts as a match
+    description: Optional[str] = None
+
+class ProbeReading(NamedTuple):
+    name: str
+    color: Color
+    expect: Optional[Color]
+    match: Optional[bool]  # None when the probe has no expected color
+
+    def as_dict(self) -> dict:
+        return {"color": list(self.color), "expect": list(self.expect) if self.expect else None, "match": self.match}
+
+def load_probes(path: str) -> Dict[str, Probe]:
+    """Read probes.json: {"probe name": {"x", "y", optional "expect" [r, g, b], "tolerance", "description"}}"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    probes = {}
+    for name, item in data.items():
+        expect = item.get("expect")
+        if expect is not None and len(expect) != 3:
+            raise ValueError(f"probe '{name}': expect must be [r, g, b]")
+        probes[name] = Probe(
+            name, int(item["x"]), int(item["y"]),
+            tuple(int(c) for c in expect) if expect is not None else None,
+            int(item.get("tolerance", 16)),
+            item.get("description"),
+        )
+    return probes
+
+def bounding_region(probes: Iterable[Probe]) -> Region:
+    """Smallest screen region containing every probe"""
+    probes = list(probes)
+    left = min(p.x for p in probes)
+    top = min(p.y for p in probes)
+    return Region(left, top, max(p.x for p in probes) + 1, max(p.y for p in probes) + 1, "probes")
+
+def sample(probes: List[Probe], grab: Callable[[Region], object]) -> Dict[str, ProbeReading]:
+    """Read every probe's color from one grab and compare it with the expected color"""
+    if not probes:
+        return {}
+    region = bounding_region(probes)
+    pixels = np.asarray(grab(region).convert("RGB"))
+
+    # Retina grabs come back at 2x the logical region size
+    scale_x = pixels.shape[1] / region.width
+    scale_y = pixels.shape[0] / region.height
+    xs = np.array([min(int((p.x - region.left_x) * scale_x), pixels.shape[1] - 1) for p in probes])
+    ys = np.array([min(int((p.y - region.upper_y) * scale_y), pixels.shape[0] - 1) for p in probes])
+    colors = pixels[ys, xs].astype(np.int16)
+
+    readings = {}
+    for probe, color in zip(probes, colors):
+        match = None
+        if probe.expect is not None:
+            match = bool(np.abs(color - np.array(probe.expect)).max() <= probe.tolerance)
+        readings[probe.name] = ProbeReading(probe.name, tuple(int(c) for c in color), probe.expect, match)
+    return readings
+
+def all_match(readings: Dict[str, ProbeReading]) -> bool:
+    """True when every probe that has an expected color matches it"""
+    return all(reading.match is not False for reading in readings.values())
@@ -0,0 +1,204 @@
+"""
+Process Monitor
+
+Answers "is Citrix Viewer running?" for any number of apps from a single
+process-table snapshot per poll, instead of spawning osascript, tasklist or pgrep
+once per app. Snapshots come from /proc on Linux (no subprocess at all), one `ps`
+call on macOS, and one `tasklist` call on Windows.
+
+Waiting for apps to start polls with backoff. Waiting for apps to exit is
+event-driven where the OS supports it: kqueue process-exit events on macOS,
+pidfds on Linux. Elsewhere it falls back to polling.
+"""
+
+import csv
+import io
+import os
+import platform
+import select
+import subprocess
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+# Processes of a running Citrix session, per platform
+CITRIX_PROCESSES = {
+    "Darwin": ["Citrix Viewer", "Citrix   Husk"],
+    "Windows": ["CDViewer", "wfica32"],
+    "Linux": ["wfica"],
+}
+
+class ProcessInfo(NamedTuple):
+    pid: int
+    name: str
+
+def _normalize(name: str) -> str:
+    name = name.strip().lower()
+    return name[:-4] if name.endswith(".exe") else name
+
+class Snapshot:
+    """The process table at one moment"""
+
+    def __init__(self, processes: List[ProcessInfo]):
+        self.processes = processes
+        self.taken = time.time()
+        self._by_name: Dict[str, List[int]] = {}
+        for process in processes:
+            self._by_name.setdefault(_normalize(process.name), []).append(process.pid)
+
+    def pids(self, name: str) -> List[int]:
+        return self._by_name.get(_normalize(name), [])
+
+    def running(self, name: str) -> bool:
+        return bool(self.pids(name))
+
+    def status(self, names: Iterable[str]) -> Dict[str, bool]:
+        return {name: self.running(name) for name in names}
+
+# ===================================
+# Backends
+# ===================================
+
+def proc_snapshot() -> List[ProcessInfo]:
+    """Linux: read names straight from /proc/<pid>/stat and cmdline"""
+    processes = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+            # "<pid> (<comm>) <state> ..."; comm may itself contain parentheses
+            name, state = stat[stat.index("(") + 1:stat.rindex(")")], stat[stat.rindex(")") + 2:][:1]
+            if state in ("Z", "X"):
+                continue  # Exited, waiting to be reaped
+            # comm is cut to 15 characters; the executable in cmdline has the full name
+            if len(name) == 15:
+                with open(f"/proc/{entry}/cmdline", "rb") as f:
+                    argv0 = f.read().split(b"\0", 1)[0].decode(errors="replace")
+                if argv0:
+                    name = os.path.basename(argv0)
+        except (OSError, ValueError):
+            continue  # Exited while we were reading
+        processes.append(ProcessInfo(int(entry), name))
+    return processes
+
+def ps_snapshot() -> List[ProcessInfo]:
+    """macOS and other Unixes: one ps call; names are executable basenames, as System Events reports them"""
+    result = subprocess.run(["ps", "-axww", "-o", "pid=,stat=,comm="], capture_output=True, text=True, check=True)
+    processes = []
+    for line in result.stdout.splitlines():
+        fields = line.strip().split(None, 2)
+        if len(fields) == 3 and fields[0].isdigit() and not fields[1].startswith("Z"):
+            processes.append(ProcessInfo(int(fields[0]), os.path.basename(fields[2].strip())))
+    return processes
+
+def tasklist_snapshot() -> List[ProcessInfo]:
+    """Windows: one tasklist call"""
+    result = subprocess.run(["tasklist", "/FO", "CSV", "/NH"], capture_output=True, text=True, check=True)
+    processes = []
+    for row in csv.reader(io.StringIO(result.stdout)):
+        if len(row) >= 2 and row[1].isdigit():
+            processes.append(ProcessInfo(int(row[1]), row[0]))
+    return processes
+
+def default_backend() -> Callable[[], List[ProcessInfo]]:
+    system = platform.system()
+    if system == "Windows":
+        return tasklist_snapshot
+    if system == "Linux" and os.path.isdir("/proc"):
+        return proc_snapshot
+    return ps_snapshot
+
+# ===================================
+# Monitor
+# ===================================
+
+class ProcessMonitor:
+    """
+    Snapshots the process table and waits on it.
+
+    Args:
+        backend: Returns the running processes (default: chosen for this platform)
+    """
+
+    def __init__(self, backend: Optional[Callable[[], List[ProcessInfo]]] = None):
+        self.backend = backend or default_backend()
+        self.snapshots = 0
+
+    def snapshot(self) -> Snapshot:
+        self.snapshots += 1
+        return Snapshot(self.backend())
+
+    def status(self, names: Iterable[str]) -> Dict[str, bool]:
+        """Whether each app is running, from one snapshot"""
+        return self.snapshot().status(names)
+
+    def wait_for(self, names: List[str], timeout: float = 40.0, interval: float = 0.1, max_interval: float = 1.0,
+                 backoff: float = 1.5, on_poll: Optional[Callable[[Dict[str, bool]], None]] = None) -> bool:
+        """
+        Poll until every app in `names` is running. Polls start `interval` apart and
+        back off to `max_interval`. Returns False if `timeout` passes first.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.status(names)
+            if on_poll is not None:
+                on_poll(status)
+            if all(status.values()):
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+            interval = min(interval * backoff, max_interval)
+
+    def wait_for_exit(self, names: List[str], timeout: float = 10.0) -> bool:
+        """Wait until none of `names` is running; returns False if `timeout` passes first"""
+        deadline = time.monotonic() + timeout
+        while True:
+            snapshot = self.snapshot()
+            pids = [pid for name in names for pid in snapshot.pids(name)]
+            if not pids:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # Sleep until one of them exits, then look again (a helper may have started meanwhile)
+            _wait_any_exit(pids, min(remaining, 1.0))
+
+def _wait_any_exit(pids: List[int], timeout: float):
+    """Block until one of `pids` exits or `timeout` passes, with OS exit events where available"""
+    if hasattr(select, "kqueue"):
+        kq = select.kqueue()
+        try:
+            events = [select.kevent(pid, filter=select.KQ_FILTER_PROC, flags=select.KQ_EV_ADD | select.KQ_EV_ONESHOT,
+                                    fflags=select.KQ_NOTE_EXIT) for pid in pids]
+            kq.control(events, 1, timeout)
+        except OSError:
+            pass  # A pid already exited; the caller re-checks
+        finally:
+            kq.close()
+        return
+
+    if hasattr(os, "pidfd_open"):
+        fds = []
+        try:
+            for pid in pids:
+                try:
+                    fds.append(os.pidfd_open(pid))
+                except OSError:
+                    return  # Already gone
+            select.select(fds, [], [], timeout)
+            return
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    time.sleep(min(timeout, 0.25))
+
+# Shared by login.py, quit.py and the server
+MONITOR = ProcessMonitor()
+
+def citrix_processes(system: Optional[str] = None) -> List[str]:
+    """Names of the Citrix session processes on this platform"""
+    return CITRIX_PROCESSES.get(system or platform.system(), [])
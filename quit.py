@@ -2,14 +2,18 @@
 import os
 import subprocess
 import platform
+import signal
 import tempfile
 import time
 from pathlib import Path
 
+from process_monitor import MONITOR, citrix_processes
+
 def quit_powerchart():
     """
     Quits the PowerChart application via Citrix Viewer using the direct method:
     Citrix Viewer menu -> "Sign Out and Quit Citrix Viewer"
+    On Linux the Citrix session processes are terminated instead.
     
     Returns:
         True if PowerChart was successfully quit, False otherwise
@@ -18,18 +22,18 @@ def quit_powerchart():
     
     try:
         system = platform.system()
+        apps = citrix_processes(system)
+        
+        # Check if Citrix is running before attempting to quit
+        try:
+            if apps and not any(MONITOR.status(apps).values()):
+                print("Citrix is not running. No action needed.")
+                return True  # Return success since there's nothing to quit
+        except Exception as check_err:
+            print(f"Error checking if Citrix is running: {check_err}")
+            # Continue anyway as the main script will handle errors
+        
         if system == "Darwin":  # macOS
-            # Check if Citrix Viewer is running before attempting to quit
-            try:
-                result = subprocess.run("pgrep -f 'Citrix Viewer' || echo 'not_running'", 
-                                      shell=True, capture_output=True, text=True, check=False)
-                if result.stdout.strip() == "not_running":
-                    print("Citrix Viewer is not running. No action needed.")
-                    return True  # Return success since there's nothing to quit
-            except Exception as check_err:
-                print(f"Error checking if Citrix Viewer is running: {check_err}")
-                # Continue anyway as the main script will handle errors
-            
             # Create debug log file
             with tempfile.NamedTemporaryFile(suffix='_citrix_quit_debug.log', delete=False) as temp_file:
                 temp_log_path = temp_file.name
@@ -97,7 +101,12 @@ def quit_powerchart():
                 # Clean up
                 os.unlink(temp_script_path)
                 
-                return True
+                # Returns as soon as the process exits rather than after a fixed delay
+                if MONITOR.wait_for_exit(["Citrix Viewer"], timeout=15):
+                    print("Citrix Viewer has exited")
+                    return True
+                print("Citrix Viewer is still running 15 seconds after sign out")
+                return False
             
             except subprocess.CalledProcessError as err:
                 print(f"Error executing AppleScript: {err}")
@@ -116,6 +125,22 @@ def quit_powerchart():
             print("PowerChart quit for Windows not yet implemented")
             return False
         
+        elif system == "Linux":  # Linux
+            # No menu to drive: end the session processes and wait for them to go
+            print(f"Terminating Citrix session processes: {', '.join(apps)}")
+            snapshot = MONITOR.snapshot()
+            for app in apps:
+                for pid in snapshot.pids(app):
+                    try:
+                        os.kill(pid, signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass
+            if MONITOR.wait_for_exit(apps, timeout=15):
+                print("Citrix session processes have exited")
+                return True
+            print("Citrix session processes are still running 15 seconds after SIGTERM")
+            return False
+        
         else:
             print(f"Platform {system} is not supported.")
             return False
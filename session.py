@@ -0,0 +1,122 @@
+"""
+Citrix StoreFront Session
+
+Keeps what a cold start otherwise rebuilds every time:
+
+- the browser's storage state (cookies and local storage) after a StoreFront
+  login, so the next download can go straight to the app list instead of logging in
+- the ICA file from the last download, which can be launched again as long as
+  its logon ticket is fresh and it hasn't been launched yet
+
+    <data dir>/session/storefront_state.json   Playwright storage state
+    <data dir>/session/ica.json                last ICA file: path, download time, launched
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+from paths import data_dir, write_atomic
+
+# StoreFront logon tickets in an ICA file expire after 100-200 s; stay under that
+DEFAULT_ICA_MAX_AGE = 90.0
+
+# StoreFront sessions time out after 20 minutes idle by default
+DEFAULT_STATE_MAX_AGE = 20 * 60.0
+
+def session_dir() -> Path:
+    path = data_dir() / "session"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+class StorefrontSession:
+    """
+    Saved login state and ICA file for one StoreFront site.
+
+    Args:
+        base_url: The StoreFront page (CERNER_BASE_URL)
+        directory: Where state is kept (default: <data dir>/session)
+        state_max_age: Seconds a saved login is trusted without expiring cookies (POWERCHART_SESSION_MAX_AGE)
+        ica_max_age: Seconds an unlaunched ICA file stays usable (POWERCHART_ICA_MAX_AGE)
+    """
+
+    def __init__(self, base_url: str, directory: Optional[Path] = None,
+                 state_max_age: Optional[float] = None, ica_max_age: Optional[float] = None):
+        self.base_url = base_url
+        self.host = urlparse(base_url).hostname or ""
+        self.directory = directory or session_dir()
+        self.state_path = self.directory / "storefront_state.json"
+        self.ica_record_path = self.directory / "ica.json"
+        self.state_max_age = state_max_age if state_max_age is not None else float(
+            os.environ.get("POWERCHART_SESSION_MAX_AGE", DEFAULT_STATE_MAX_AGE))
+        self.ica_max_age = ica_max_age if ica_max_age is not None else float(
+            os.environ.get("POWERCHART_ICA_MAX_AGE", DEFAULT_ICA_MAX_AGE))
+
+    # Browser storage state
+
+    def saved_state(self) -> Optional[str]:
+        """
+        Path of the saved storage state if it may still be logged in: recent enough, with
+        cookies for this site and none of them expired. Only loading the page can tell for sure.
+        """
+        try:
+            age = time.time() - self.state_path.stat().st_mtime
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if age > self.state_max_age:
+            return None
+
+        now = time.time()
+        cookies = [c for c in state.get("cookies", []) if self.host.endswith(c.get("domain", "").lstrip("."))]
+        if not cookies:
+            return None
+        if any(0 < c.get("expires", -1) < now for c in cookies):
+            return None
+        return str(self.state_path)
+
+    def save_state(self, context):
+        """Store a Playwright browser context's cookies and local storage, readable by the owner only"""
+        write_atomic(self.state_path, json.dumps(context.storage_state()).encode(), mode=0o600)
+
+    def discard_state(self):
+        self.state_path.unlink(missing_ok=True)
+
+    # ICA file
+
+    def reusable_ica(self) -> Optional[str]:
+        """The last downloaded ICA file, if it is fresh and hasn't been launched"""
+        try:
+            with open(self.ica_record_path) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("launched") or time.time() - record.get("downloaded", 0) > self.ica_max_age:
+            return None
+        path = record.get("path")
+        return path if path and is_ica_file(path) else None
+
+    def record_ica(self, path: str):
+        write_atomic(self.ica_record_path, json.dumps({"path": path, "downloaded": time.time(), "launched": False}).encode())
+
+    def mark_ica_launched(self):
+        try:
+            with open(self.ica_record_path) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return
+        record["launched"] = True
+        write_atomic(self.ica_record_path, json.dumps(record).encode())
+
+def is_ica_file(path: str) -> bool:
+    """Whether `path` looks like a complete ICA launch file"""
+    try:
+        with open(path, errors="replace") as f:
+            text = f.read(65536)
+    except OSError:
+        return False
+    return "[WFClient]" in text and "[ApplicationServers]" in text
@@ -0,0 +1,187 @@
+"""
+Screen-Settle Wait Engine
+
+Replaces fixed post-click sleeps with polling: a small grayscale thumbnail of the
+relevant screen section is fingerprinted until it stops changing. The whole
+section is watched, since a repaint often leaves its middle untouched; the grab
+is downscaled before anything else touches it. A change ends the wait early; "nothing changed" is only
+concluded once the old fixed delay has passed, since a Citrix repaint can start
+late. The old fixed delays remain available as a fallback
+(POWERCHART_WAIT_MODE=fixed).
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from catalog import Region
+from metrics import METRICS
+
+FINGERPRINT_SIZE = (32, 32)
+
+
+class SettleResult(NamedTuple):
+    """Outcome of one settle wait"""
+    settled: bool
+    changed: bool
+    elapsed: float
+    polls: int
+
+def fingerprint(image, size=FINGERPRINT_SIZE) -> bytes:
+    """Cheap, noise-tolerant signature of a screen image: 32x32 grayscale, 5-bit levels"""
+    from PIL import Image
+
+    # Downscale before converting, so the conversion only touches the thumbnail
+    small = image.resize(size, Image.BILINEAR, reducing_gap=2.0).convert("L")
+    return small.point(lambda v: v >> 3).tobytes()
+
+def watch_region(region: Region, size: Optional[Tuple[int, int]] = None) -> Region:
+    """The middle of `region`, at most `size` logical pixels (None: all of it)"""
+    if size is None:
+        return region
+    width, height = min(region.width, size[0]), min(region.height, size[1])
+    left = region.left_x + (region.width - width) // 2
+    top = region.upper_y + (region.height - height) // 2
+    return Region(left, top, left + width, top + height, region.name)
+
+class WaitEngine:
+    """
+    Decides how long to wait after an input action.
+
+    In "settle" mode the engine fingerprints the watched region before the action
+    and polls it afterwards, returning once the region has changed and then held
+    still for `stable_polls` consecutive polls. If the region never changes, it
+    stops waiting after `quiet_period` or the caller's fixed delay, whichever is
+    longer, and `pause` keeps watching for the rest of a longer inter-step delay.
+    Every wait is capped at `timeout`. In "fixed" mode it simply sleeps the
+    caller's fixed delays.
+    """
+
+    def __init__(self, grab: Callable[[Region], object], mode: Optional[str] = None,
+                 timeout: Optional[float] = None, interval: Optional[float] = None,
+                 quiet_period: Optional[float] = None, stable_polls: int = 2,
+                 watch_size: Optional[Tuple[int, int]] = None):
+        self.grab = grab
+        self.mode = mode or os.environ.get("POWERCHART_WAIT_MODE", "settle")
+        self.timeout = timeout if timeout is not None else float(os.environ.get("POWERCHART_SETTLE_TIMEOUT", "5.0"))
+        self.interval = interval if interval is not None else float(os.environ.get("POWERCHART_SETTLE_INTERVAL", "0.05"))
+        self.quiet_period = quiet_period if quiet_period is not None else float(os.environ.get("POWERCHART_SETTLE_QUIET", "0.3"))
+        self.stable_polls = stable_polls
+        self.watch_size = watch_size
+        self.last_result: Optional[SettleResult] = None
+        self._watch: Optional[Tuple[Region, bytes]] = None  # Region and pre-action baseline of the last settle wait
+
+    def _fingerprint(self, region: Region) -> bytes:
+        return fingerprint(self.grab(watch_region(region, self.watch_size)))
+
+    def wait_for_settle(self, region: Region, baseline: Optional[bytes] = None,
+                        quiet_period: Optional[float] = None, timeout: Optional[float] = None) -> SettleResult:
+        """Poll `region` until it stops changing or `timeout` seconds pass"""
+        quiet_period = self.quiet_period if quiet_period is None else quiet_period
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = start + timeout
+
+        previous = self._fingerprint(region)
+        changed = baseline is None or previous != baseline
+        stable = 0
+        polls = 1
+
+        while True:
+            now = time.perf_counter()
+            result = None
+            if changed and stable >= self.stable_polls:
+                result = SettleResult(True, True, now - start, polls)
+            elif not changed and now - start >= quiet_period:
+                result = SettleResult(True, False, now - start, polls)
+            elif now >= deadline:
+                result = SettleResult(False, changed, now - start, polls)
+                METRICS.count("wait.settle_timeouts")
+            if result is not None:
+                METRICS.record("wait.settle", start, result.elapsed, region=region.name,
+                               changed=result.changed, polls=result.polls)
+                return result
+
+            time.sleep(self.interval)
+            current = self._fingerprint(region)
+            polls += 1
+
+            if not changed:
+                if current != baseline:
+                    changed = True
+                    stable = 0
+            elif current == previous:
+                stable += 1
+            else:
+                stable = 0
+            previous = current
+
+    def _sleep(self, seconds: float, name: str = "wait.fixed"):
+        with METRICS.timed(name, seconds=seconds):
+            time.sleep(seconds)
+
+    @contextmanager
+    def settle_after(self, region: Optional[Region], fixed_delay: float, timeout: Optional[float] = None):
+        """
+        Wrap an input action; on exit, wait for `region` to settle (or sleep `fixed_delay`).
+        No change is concluded before `fixed_delay` has passed.
+        """
+        self.last_result, self._watch = None, None
+        if self.mode != "settle" or region is None:
+            yield
+            self._sleep(fixed_delay)
+            return
+
+        try:
+            baseline = self._fingerprint(region)
+        except Exception as e:
+            print(f"Screen-settle unavailable, using fixed delay: {e}", file=sys.stderr)
+            yield
+            self._sleep(fixed_delay)
+            return
+
+        yield
+        try:
+            self.last_result = self.wait_for_settle(region, baseline, quiet_period=max(self.quiet_period, fixed_delay),
+                                                    timeout=timeout)
+            self._watch = (region, baseline)
+        except Exception as e:
+            print(f"Screen-settle failed, using fixed delay: {e}", file=sys.stderr)
+            self._sleep(fixed_delay)
+
+    def pause(self, seconds: float):
+        """
+        A fixed inter-step delay. With screen-settle on, it is only spent when the last
+        action hasn't changed the screen yet: the region is watched for the rest of the
+        delay, and a late change is waited out as usual.
+        """
+        if self.mode != "settle":
+            self._sleep(seconds, "wait.pause")
+            return
+        last, watch = self.last_result, self._watch
+        if last is None or last.changed or watch is None or last.elapsed >= seconds:
+            return
+        region, baseline = watch
+        try:
+            self.last_result = self.wait_for_settle(region, baseline, quiet_period=seconds - last.elapsed)
+        except Exception as e:
+            print(f"Screen-settle failed, using fixed delay: {e}", file=sys.stderr)
+            self._sleep(seconds - last.elapsed, "wait.pause")
+
+    def wait_until(self, predicate: Callable[[], bool], timeout: Optional[float] = None,
+                   interval: Optional[float] = None) -> bool:
+        """Poll `predicate` until it returns True or `timeout` seconds pass"""
+        timeout = self.timeout if timeout is None else timeout
+        interval = self.interval if interval is None else interval
+        start = time.perf_counter()
+        deadline = start + timeout
+        while True:
+            if predicate():
+                METRICS.record("wait.until", start, time.perf_counter() - start, matched=True)
+                return True
+            if time.perf_counter() >= deadline:
+                METRICS.record("wait.until", start, time.perf_counter() - start, matched=False)
+                return False
+            time.sleep(interval)
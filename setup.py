@@ -10,6 +10,7 @@ setup(
         "mcp>=1.2.0",
         "pyautogui>=0.9.54",
         "Pillow>=10.0.0",
+        "numpy>=1.24.0",
         "python-dotenv>=1.0.0",
     ],
     entry_points={
@@ -0,0 +1,245 @@
+"""
+PowerChart Screen Simulator
+
+A synthetic stand-in for the Citrix session so the server can run headless on
+any OS. The screen is laid out from coordinates.json: every screen section is a
+view showing a generated document, clicking an element repaints its section
+after a configurable render delay (with a burst of changing frames while it
+"renders"), and scroll elements move the document. A SimulatorBackend feeds input
+ops to the screen and `install` routes the server's input and screen grabs to it.
+
+    screen = SimulatedScreen(catalog)
+    install(screen)
+"""
+
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from capture import set_grabber
+from catalog import CoordinateCatalog, Point, Region
+from clipboard import MemoryClipboard, set_clipboard
+from input_backends import InputBackend, InputOp, set_backend
+
+class _Change(NamedTuple):
+    """A repaint scheduled by a click"""
+    at: float  # When the new content appears
+    until: float  # The section shows changing frames from `at` until this time
+    key: Optional[str]  # New document, or None to keep the current one
+    scroll: int  # Scroll delta in logical pixels
+
+class _View:
+    """One screen section and the document it currently shows"""
+
+    def __init__(self, region: Region):
+        self.region = region
+        self.key = region.name
+        self.offset = 0  # Scroll position in logical pixels
+        self.rendering_until = 0.0
+        self.pending: List[_Change] = []
+
+    def advance(self, now: float, max_offset: int):
+        """Apply every change that is due"""
+        while self.pending and self.pending[0].at <= now:
+            change = self.pending.pop(0)
+            if change.key is not None:
+                self.key, self.offset = change.key, 0
+            self.offset = min(max(self.offset + change.scroll, 0), max_offset)
+            self.rendering_until = max(self.rendering_until, change.until)
+
+class SimulatedScreen:
+    """
+    Framebuffer driven by the coordinate catalog.
+
+    Args:
+        catalog: Layout of elements and screen sections
+        width, height: Logical screen size
+        scale: Pixels per logical pixel (2 mimics a Retina display)
+        render_delay: Seconds between a click and the start of the repaint
+        render_time: Seconds the section keeps changing while it repaints
+        scroll_step: Logical pixels one scroll click moves the document
+        pages: Document length in screens, per section
+        hit_radius: Clicks farther than this from every element hit nothing
+        default_section: Screen section repainted for elements whose section has none
+        notes: Notes in the documentation list (add more with `add_notes`)
+    """
+
+    def __init__(self, catalog: CoordinateCatalog, width: int = 1920, height: int = 1200, scale: int = 2,
+                 render_delay: float = 0.1, render_time: float = 0.15, scroll_step: int = 30, pages: int = 3,
+                 hit_radius: int = 15, default_section: str = "inpatient_manage", notes: int = 30,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.catalog = catalog
+        self.width, self.height, self.scale = width, height, scale
+        self.render_delay = render_delay
+        self.render_time = render_time
+        self.scroll_step = scroll_step
+        self.pages = pages
+        self.hit_radius = hit_radius
+        self.default_section = default_section
+        self.clock = clock
+
+        # Larger sections first, so nested ones are painted on top
+        regions = sorted(catalog.screen_sections.values(), key=lambda r: r.width * r.height, reverse=True)
+        self.views: Dict[str, _View] = {region.name: _View(region) for region in regions}
+        self.elements: List[Point] = [point for points in _points(catalog) for point in points]
+        self._xy = np.array([(p.x, p.y) for p in self.elements], dtype=np.int64).reshape(-1, 2)
+        self._documents: Dict[Tuple[str, str], np.ndarray] = {}
+        self._noise = np.random.default_rng(0)
+        self._lock = threading.Lock()
+
+        self.clicks = 0
+        self.misses = 0  # Clicks that hit no element
+        self.grabs = 0
+
+        # Documentation notes: a page of "note N" rows, newest first
+        self.notes = notes
+        self.notes_per_page = sum(1 for p in catalog.coordinates.get("documentation", []) if p.name.startswith("note "))
+        self.note_page = 0
+        self.open_note: Optional[int] = None  # Number of the open note (1 = oldest)
+        self.clipboard = MemoryClipboard()
+
+    # Input
+
+    def hit(self, x: int, y: int) -> Optional[Point]:
+        """The element nearest to (x, y), if it is within hit_radius"""
+        if not len(self._xy):
+            return None
+        distances = ((self._xy - (x, y)) ** 2).sum(axis=1)
+        nearest = int(np.argmin(distances))
+        return self.elements[nearest] if distances[nearest] <= self.hit_radius ** 2 else None
+
+    def click(self, x: int, y: int):
+        with self._lock:
+            self.clicks += 1
+            element = self.hit(x, y)
+            if element is None:
+                self.misses += 1
+                return
+            if element.section == "documentation":
+                self._click_note_list(element.name)
+            region = self.catalog.region_for(element.section, self.default_section)
+            if region is None:
+                return
+
+            now = self.clock()
+            name = element.name.lower()
+            if name.startswith("scroll "):
+                delta = self.scroll_step if "down" in name else -self.scroll_step
+                at = now + self.render_delay / 4
+                change = _Change(at, at, None, delta)
+            else:
+                at = now + self.render_delay
+                change = _Change(at, at + self.render_time, f"{element.section}/{element.name}", 0)
+            self.views[region.name].pending.append(change)
+
+    def _click_note_list(self, name: str):
+        pages = max(-(-self.notes // max(self.notes_per_page, 1)), 1)
+        if name == "next page":
+            self.note_page = min(self.note_page + 1, pages - 1)
+        elif name == "previous page":
+            self.note_page = max(self.note_page - 1, 0)
+        elif name.startswith("note ") and name[5:].isdigit():
+            row = self.note_page * self.notes_per_page + int(name[5:]) - 1
+            if row < self.notes:  # A blank row leaves the open note open
+                self.open_note = self.notes - row
+
+    def add_notes(self, count: int = 1):
+        """New notes arrive at the top of the list"""
+        with self._lock:
+            self.notes += count
+
+    def copy(self):
+        """ctrl+c: the open note's text goes to the clipboard"""
+        with self._lock:
+            if self.open_note is not None:
+                self.clipboard.write(f"Progress note #{self.open_note}\nSubjective: day {self.open_note} on the ward.\n")
+
+    # Output
+
+    def _document(self, view: _View) -> np.ndarray:
+        """The generated document a view shows: text-like lines seeded by its name"""
+        cache_key = (view.region.name, view.key)
+        document = self._documents.get(cache_key)
+        if document is None:
+            rng = np.random.default_rng(zlib.crc32("/".join(cache_key).encode()))
+            width, height = view.region.width * self.scale, view.region.height * self.scale * self.pages
+            document = np.full((height, width, 3), 250, dtype=np.uint8)
+            line, gap = 14 * self.scale, 10 * self.scale
+            for top in range(0, height - line, line + gap):
+                length = int(rng.integers(width // 4, width))
+                shade = rng.integers(0, 160, size=(line, length, 1), dtype=np.uint8)
+                document[top:top + line, :length] = shade
+            self._documents[cache_key] = document
+        return document
+
+    def grab(self, region: Optional[Region] = None):
+        """The current contents of a region (default: the full screen) as a PIL image"""
+        from PIL import Image
+
+        if region is None:
+            region = Region(0, 0, self.width, self.height, "screen")
+        s = self.scale
+        frame = np.full((region.height * s, region.width * s, 3), 236, dtype=np.uint8)
+
+        with self._lock:
+            self.grabs += 1
+            now = self.clock()
+            for view in self.views.values():
+                view.advance(now, view.region.height * (self.pages - 1))
+                r = view.region
+                left, top = max(r.left_x, region.left_x), max(r.upper_y, region.upper_y)
+                right, bottom = min(r.right_x, region.right_x), min(r.lower_y, region.lower_y)
+                if left >= right or top >= bottom:
+                    continue
+
+                target = frame[(top - region.upper_y) * s:(bottom - region.upper_y) * s,
+                               (left - region.left_x) * s:(right - region.left_x) * s]
+                if now < view.rendering_until:
+                    target[:] = self._noise.integers(0, 256, size=(1, 1, 3), dtype=np.uint8)
+                    continue
+                y0 = (view.offset + top - r.upper_y) * s
+                x0 = (left - r.left_x) * s
+                target[:] = self._document(view)[y0:y0 + target.shape[0], x0:x0 + target.shape[1]]
+
+        return Image.fromarray(frame)
+
+def _points(catalog: CoordinateCatalog):
+    for section in catalog.coordinates.values():
+        if isinstance(section, dict):
+            yield from section.values()
+        else:
+            yield section
+
+# ===================================
+# Input Backend
+# ===================================
+
+class SimulatorBackend(InputBackend):
+    """Delivers clicks and ctrl+c to a SimulatedScreen; other keys and typing are accepted and ignored"""
+
+    name = "simulator"
+
+    def __init__(self, screen: SimulatedScreen, honor_waits: bool = True):
+        super().__init__()
+        self.screen = screen
+        self.honor_waits = honor_waits
+
+    def _execute(self, ops: List[InputOp]):
+        for op in ops:
+            if op.kind in ("click", "double_click", "mouse_up"):
+                self.screen.click(op.x, op.y)
+            elif op.kind == "hotkey" and tuple(op.value) == ("ctrl", "c"):
+                self.screen.copy()
+            elif op.kind == "wait" and self.honor_waits:
+                time.sleep(float(op.value))
+
+def install(screen: SimulatedScreen, honor_waits: bool = True) -> SimulatorBackend:
+    """Route the server's input, screen grabs and clipboard to `screen`"""
+    backend = SimulatorBackend(screen, honor_waits)
+    set_backend(backend)
+    set_grabber(screen.grab)
+    set_clipboard(screen.clipboard)
+    return backend
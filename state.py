@@ -0,0 +1,136 @@
+"""
+Last-Seen State
+
+What the server has already seen, per patient and section, so a later run can
+tell whether anything is new without a screenshot going to the LLM. Each marker is
+a (patient, section, kind) -> value row in SQLite:
+
+    date    a date read off the screen, e.g. the latest media date or LAST_UPDATED
+    frame   hash of a screen section's pixels
+    note    hash of the newest documentation note
+
+`update` records a value and says whether it is new. Dates only move forward: an
+older date than the one stored is not new and does not replace it.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+KINDS = ("date", "frame", "note")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS markers (
+    patient TEXT NOT NULL,
+    section TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    seen REAL NOT NULL,
+    changed REAL NOT NULL,
+    PRIMARY KEY (patient, section, kind)
+);
+"""
+
+DATE_FORMATS = ("%m/%d/%Y %H:%M", "%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%d-%b-%Y", "%b %d, %Y")
+
+class Marker(NamedTuple):
+    patient: Optional[str]
+    section: str
+    kind: str
+    value: str
+    seen: float  # Last time this value was reported
+    changed: float  # When the value last changed
+
+    def as_dict(self) -> dict:
+        return {"section": self.section, "kind": self.kind, "value": self.value,
+                "seen": _stamp(self.seen), "changed": _stamp(self.changed)}
+
+def _stamp(t: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t))
+
+def parse_date(value: str) -> Optional[datetime]:
+    """A date in one of the formats PowerChart shows, or None"""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            pass
+    return None
+
+def is_newer(kind: str, value: str, previous: str) -> bool:
+    """Whether `value` is new relative to `previous`; dates must be later, other kinds just different"""
+    if kind == "date":
+        current, before = parse_date(value), parse_date(previous)
+        if current is not None and before is not None:
+            return current > before
+    return value != previous
+
+class StateStore:
+    """Last-seen markers by (patient, section, kind); safe to use from several threads"""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def get(self, patient: Optional[str], section: str, kind: str) -> Optional[Marker]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, seen, changed FROM markers WHERE patient = ? AND section = ? AND kind = ?",
+                (patient or "", section, kind),
+            ).fetchone()
+        return Marker(patient, section, kind, *row) if row else None
+
+    def update(self, patient: Optional[str], section: str, kind: str, value: str) -> Tuple[bool, Optional[Marker]]:
+        """Record `value`; returns (whether it is new, the previous marker)"""
+        if kind not in KINDS:
+            raise ValueError(f"unknown marker kind '{kind}' (expected one of {', '.join(KINDS)})")
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT value, seen, changed FROM markers WHERE patient = ? AND section = ? AND kind = ?",
+                (patient or "", section, kind),
+            ).fetchone()
+            previous = Marker(patient, section, kind, *row) if row else None
+            new = previous is None or is_newer(kind, value, previous.value)
+            if new:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO markers (patient, section, kind, value, seen, changed) VALUES (?, ?, ?, ?, ?, ?)",
+                    (patient or "", section, kind, value, now, now),
+                )
+            else:
+                self._db.execute(
+                    "UPDATE markers SET seen = ? WHERE patient = ? AND section = ? AND kind = ?",
+                    (now, patient or "", section, kind),
+                )
+        return new, previous
+
+    def markers(self, patient: Optional[str], section: Optional[str] = None) -> List[Marker]:
+        """Every marker for `patient`, optionally for one section"""
+        query = "SELECT section, kind, value, seen, changed FROM markers WHERE patient = ?"
+        params: list = [patient or ""]
+        if section is not None:
+            query += " AND section = ?"
+            params.append(section)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY section, kind", params).fetchall()
+        return [Marker(patient, *row) for row in rows]
+
+    def forget(self, patient: Optional[str], section: Optional[str] = None) -> int:
+        """Drop markers so the next run treats everything as new; returns how many were dropped"""
+        query = "DELETE FROM markers WHERE patient = ?"
+        params: list = [patient or ""]
+        if section is not None:
+            query += " AND section = ?"
+            params.append(section)
+        with self._lock, self._db:
+            return self._db.execute(query, params).rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
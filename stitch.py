@@ -0,0 +1,103 @@
+"""
+Scroll Stitching
+
+Joins the pages of a scrolled section into one tall image. Consecutive frames
+are aligned by matching whole rows: every row is reduced to an id (rows with
+identical pixels share one), the ids of the two frames are compared all at once
+as a matrix, and the scroll offset is the diagonal with the most matches. Only
+the rows a scroll revealed are kept, so overlapping content appears once.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+def to_rows(image, ignore_right: int = 0) -> np.ndarray:
+    """Grayscale pixel rows used for matching, without the rightmost `ignore_right` columns (e.g. a scrollbar)"""
+    pixels = np.asarray(image.convert("L"))
+    if 0 < ignore_right < pixels.shape[1]:
+        pixels = pixels[:, :-ignore_right]
+    # Drop the lowest bits so anti-aliasing jitter doesn't break exact row matches
+    return pixels >> 3
+
+def row_ids(previous: np.ndarray, current: np.ndarray):
+    """Ids for the rows of both frames (equal rows share an id) and which rows carry content"""
+    rows = np.ascontiguousarray(np.concatenate([previous, current]))
+    keys = rows.view(np.dtype((np.void, rows.shape[1]))).ravel()
+    _, ids = np.unique(keys, return_inverse=True)
+    informative = rows.min(axis=1) != rows.max(axis=1)  # Blank rows match everywhere, so they don't vote
+    split = len(previous)
+    return ids[:split], ids[split:], informative[:split], informative[split:]
+
+def find_scroll_offset(previous: np.ndarray, current: np.ndarray, min_overlap: int = 8,
+                       min_match: float = 0.9) -> Optional[int]:
+    """
+    How many rows the content moved up between two frames of the same height.
+
+    Args:
+        previous: Rows of the earlier frame (from to_rows)
+        current: Rows of the later frame
+        min_overlap: Fewest shared rows that count as an overlap
+        min_match: Fraction of content rows in the overlap that must match
+
+    Returns:
+        The offset (0 means nothing moved), or None when the frames don't overlap
+    """
+    height = len(current)
+    prev_ids, cur_ids, prev_informative, cur_informative = row_ids(previous, current)
+
+    # current[i] == previous[i + offset]: every matching pair votes for offset j - i
+    equal = (cur_ids[:, None] == prev_ids[None, :]) & cur_informative[:, None] & prev_informative[None, :]
+    i, j = np.nonzero(equal)
+    offsets = j - i
+    votes = np.bincount(offsets[offsets >= 0], minlength=height).astype(np.float64)
+
+    # Content rows of `current` that an offset's overlap covers: rows [0, height - offset)
+    covered = np.concatenate([[0], np.cumsum(cur_informative)])[height - np.arange(height)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(covered > 0, votes / covered, 0.0)
+    ratio[height - np.arange(height) < min_overlap] = 0.0
+
+    best = int(np.argmax(ratio))
+    if ratio[best] < min_match:
+        return None
+    return best
+
+class Stitcher:
+    """Accumulates the new rows of each scrolled frame"""
+
+    def __init__(self, first_frame, ignore_right: int = 0, min_overlap: int = 8, min_match: float = 0.9):
+        self.ignore_right = ignore_right
+        self.min_overlap = min_overlap
+        self.min_match = min_match
+        self.mode = first_frame.mode
+        self._last = to_rows(first_frame, ignore_right)
+        self._parts: List[np.ndarray] = [np.asarray(first_frame)]
+        self.unaligned = 0  # Frames appended whole because no overlap was found
+
+    @property
+    def height(self) -> int:
+        return sum(len(part) for part in self._parts)
+
+    def add(self, frame) -> int:
+        """Append the rows `frame` adds below the previous frame; returns how many there were"""
+        rows = to_rows(frame, self.ignore_right)
+        if rows.shape != self._last.shape:
+            raise ValueError("frames must all have the same size")
+        if np.array_equal(rows, self._last):
+            return 0
+
+        offset = find_scroll_offset(self._last, rows, self.min_overlap, self.min_match)
+        if offset is None:
+            offset = len(rows)
+            self.unaligned += 1
+        self._last = rows
+        if offset:
+            self._parts.append(np.asarray(frame)[len(rows) - offset:])
+        return offset
+
+    def image(self):
+        """The stitched image"""
+        from PIL import Image
+
+        return Image.fromarray(np.vstack(self._parts), self.mode)
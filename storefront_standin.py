@@ -0,0 +1,178 @@
+"""
+Citrix StoreFront Stand-in
+
+A local HTTP server that behaves like the StoreFront page download.py drives:
+a login form ("User name:", "Password:", "Log On"), an app list with the
+PowerChart link once logged in, and an ICA file download behind that link.
+Logins set a session cookie that expires after `session_timeout` seconds, and
+delays mimic a slow login and app enumeration, so session reuse can be tried
+and timed without touching the real site.
+
+    python storefront_standin.py --port 8765
+    CERNER_BASE_URL=http://127.0.0.1:8765/Citrix/ProdWeb/ python download.py
+"""
+
+import argparse
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.cookies import SimpleCookie
+from typing import Dict
+
+BASE_PATH = "/Citrix/ProdWeb/"
+APP_NAME = "Powerchart P275 TRUM_MO"
+COOKIE = "CtxsAuthId"
+
+LOGIN_PAGE = """<!doctype html>
+<html><head><title>Citrix Receiver</title></head><body>
+<form method="post" action="login">
+  <label for="username">User name:</label> <input id="username" name="username" type="text">
+  <label for="password">Password:</label> <input id="password" name="password" type="password">
+  <a href="#" onclick="document.forms[0].submit(); return false;">Log On</a>
+</form>
+</body></html>
+"""
+
+APPS_PAGE = f"""<!doctype html>
+<html><head><title>Citrix Receiver</title></head><body>
+<h1>Apps</h1>
+<a href="launch.ica"><img alt="{APP_NAME}" src="data:,">{APP_NAME}</a>
+</body></html>
+"""
+
+ICA_FILE = f"""[Encoding]
+InputEncoding=UTF8
+
+[WFClient]
+Version=2
+ProxyType=Auto
+
+[ApplicationServers]
+{APP_NAME}=
+
+[{APP_NAME}]
+Address=;40;STA-STANDIN;{{ticket}}
+InitialProgram=#{APP_NAME}
+LogonTicket={{ticket}}
+LogonTicketType=CTXS1
+"""
+
+class StorefrontStandin:
+    """
+    The stand-in server, run on a background thread.
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        login_delay: Seconds a login takes
+        apps_delay: Seconds the app list takes to appear after loading the page
+        session_timeout: Seconds a login stays valid
+    """
+
+    def __init__(self, port: int = 0, login_delay: float = 2.0, apps_delay: float = 1.0, session_timeout: float = 1200.0):
+        self.login_delay = login_delay
+        self.apps_delay = apps_delay
+        self.session_timeout = session_timeout
+        self.sessions: Dict[str, float] = {}  # Token -> expiry
+        self.logins = 0
+        self.page_loads = 0
+        self.downloads = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _handler(self))
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}{BASE_PATH}"
+
+    def start(self) -> "StorefrontStandin":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def login(self) -> str:
+        time.sleep(self.login_delay)
+        token = secrets.token_hex(16)
+        with self._lock:
+            self.logins += 1
+            self.sessions[token] = time.time() + self.session_timeout
+        return token
+
+    def logged_in(self, token: str) -> bool:
+        with self._lock:
+            return self.sessions.get(token, 0) > time.time()
+
+    def expire_sessions(self):
+        """Log everyone out, as a server-side timeout would"""
+        with self._lock:
+            self.sessions.clear()
+
+def _handler(standin: StorefrontStandin):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _token(self) -> str:
+            cookie = SimpleCookie(self.headers.get("Cookie", ""))
+            return cookie[COOKIE].value if COOKIE in cookie else ""
+
+        def _send(self, status: int, body: bytes, content_type: str = "text/html", headers: Dict[str, str] = None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            logged_in = standin.logged_in(self._token())
+            if path in (BASE_PATH, BASE_PATH.rstrip("/")):
+                with standin._lock:
+                    standin.page_loads += 1
+                if not logged_in:
+                    self._send(200, LOGIN_PAGE.encode())
+                    return
+                time.sleep(standin.apps_delay)
+                self._send(200, APPS_PAGE.encode())
+            elif path == BASE_PATH + "launch.ica" and logged_in:
+                with standin._lock:
+                    standin.downloads += 1
+                body = ICA_FILE.format(ticket=secrets.token_hex(20).upper()).encode()
+                self._send(200, body, "application/x-ica", {"Content-Disposition": 'attachment; filename="launch.ica"'})
+            elif path == BASE_PATH + "launch.ica":
+                self._send(403, b"Not logged in", "text/plain")
+            else:
+                self._send(404, b"Not found", "text/plain")
+
+        def do_POST(self):
+            if self.path.split("?")[0] != BASE_PATH + "login":
+                self._send(404, b"Not found", "text/plain")
+                return
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            token = standin.login()
+            self._send(303, b"", headers={"Location": BASE_PATH, "Set-Cookie": f"{COOKIE}={token}; Path=/; HttpOnly"})
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--login-delay", type=float, default=2.0)
+    parser.add_argument("--apps-delay", type=float, default=1.0)
+    parser.add_argument("--session-timeout", type=float, default=1200.0)
+    args = parser.parse_args()
+
+    standin = StorefrontStandin(args.port, args.login_delay, args.apps_delay, args.session_timeout).start()
+    print(f"StoreFront stand-in running. Set CERNER_BASE_URL={standin.url}")
+    try:
+        standin._thread.join()
+    except KeyboardInterrupt:
+        standin.stop()
+
+if __name__ == "__main__":
+    main()
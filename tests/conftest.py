@@ -0,0 +1,17 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+# Never touch the real screen, data directory or trace directory
+os.environ.setdefault("POWERCHART_INPUT_BACKEND", "recording")
+os.environ.setdefault("POWERCHART_HOT_RELOAD", "0")
+os.environ.setdefault("POWERCHART_TRACES", "0")
+
+# Tests that import the server keep its archive, stores and caches in a scratch directory
+SCRATCH = tempfile.mkdtemp(prefix="powerchart-tests-")
+os.environ["POWERCHART_DATA_DIR"] = os.path.join(SCRATCH, "data")
+os.environ["POWERCHART_CACHE_DIR"] = os.path.join(SCRATCH, "cache")
@@ -0,0 +1,49 @@
+import threading
+import time
+
+from PIL import Image
+
+from archive import CaptureArchive, frame_hash
+from capture import CaptureOptions
+
+def frame(color):
+    return Image.new("RGB", (64, 32), color)
+
+def test_identical_frames_are_stored_once(tmp_path):
+    archive = CaptureArchive(tmp_path)
+    first = archive.store(frame("red"), "inpatient_manage", "p1")
+    repeat = archive.store(frame("red"), "inpatient_manage", "p1")
+    assert first.new and not repeat.new
+    assert repeat.path == first.path and repeat.hash == first.hash
+    assert archive.stats() == {"captures": 2, "unique_frames": 1, "duplicates": 1, "stored_bytes": first.size}
+
+def test_other_encodings_of_a_frame_are_separate_blobs(tmp_path):
+    archive = CaptureArchive(tmp_path)
+    png = archive.store(frame("red"), "inpatient_manage")
+    jpeg = archive.store(frame("red"), "inpatient_manage", options=CaptureOptions(format="jpeg"))
+    assert jpeg.new and jpeg.path != png.path and jpeg.path.suffix == ".jpeg"
+
+def test_latest_is_per_patient_and_section(tmp_path):
+    archive = CaptureArchive(tmp_path)
+    archive.store(frame("red"), "inpatient_manage", "p1")
+    blue = archive.store(frame("blue"), "inpatient_manage", "p1")
+    archive.store(frame("green"), "inpatient_manage", "p2")
+    assert archive.latest("inpatient_manage", "p1").hash == blue.hash
+    assert archive.latest("inpatient_manage") is None
+    assert archive.latest("warning_sign", "p1") is None
+
+def test_a_store_waiting_on_a_failed_write_writes_the_blob_itself(tmp_path):
+    archive = CaptureArchive(tmp_path)
+    path = archive.blob_path(frame_hash(frame("red")), CaptureOptions())
+    failed_writer = archive._writing[path] = threading.Event()  # Another store is encoding this frame
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(archive.store(frame("red"), "inpatient_manage")))
+    waiter.start()
+    time.sleep(0.05)
+    del archive._writing[path]  # ...and its write fails, leaving no blob
+    failed_writer.set()
+    waiter.join(5)
+
+    assert results and results[0].new and results[0].path == path
+    assert path.exists() and results[0].size == path.stat().st_size
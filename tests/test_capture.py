@@ -0,0 +1,13 @@
+from catalog import Region
+from capture import CaptureOptions, options_from_dict, union_region
+
+def test_raw_is_not_a_capture_format():
+    assert "Unknown capture format 'raw'" in options_from_dict({"format": "raw"}).validate()
+
+def test_section_settings_are_validated():
+    assert options_from_dict({"format": "jpeg", "quality": 60}).validate() is None
+    assert "only applies to png" in CaptureOptions(format="webp", colors=16).validate()
+
+def test_union_region_covers_every_region():
+    regions = [Region(10, 20, 100, 80, "a"), Region(50, 5, 120, 60, "b")]
+    assert union_region(regions)[:4] == (10, 5, 120, 80)
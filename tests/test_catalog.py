@@ -0,0 +1,69 @@
+import json
+import os
+
+from catalog import CoordinateCatalog, load_catalog
+
+COORDINATES = {
+    "home": [{"name": "Patient List", "x": 10, "y": 20}, {"name": "Patient Search", "x": 30, "y": 20}],
+    "section_headers": {
+        "default": [{"name": "Hospital Course", "x": 100, "y": 200}],
+        "scrolled": [{"name": "Hospital Course", "x": 100, "y": 50}],
+    },
+    "screen_sections": {
+        "inpatient_manage": {"left_x": 0, "upper_y": 0, "right_x": 800, "lower_y": 600, "name": "inpatient_manage",
+                             "capture": {"format": "png", "colors": 16}},
+    },
+}
+
+def write(path, data):
+    path.write_text(json.dumps(data))
+    return str(path)
+
+def test_find_is_case_insensitive_and_scoped_by_subsection():
+    catalog = CoordinateCatalog.from_dict(COORDINATES)
+    assert catalog.find("home", "patient list")[:2] == (10, 20)
+    assert catalog.find("section_headers", "Hospital Course", "scrolled")[:2] == (100, 50)
+    # Without a subsection, the first match in file order
+    assert catalog.find("section_headers", "Hospital Course")[:2] == (100, 200)
+    assert catalog.find("home", "Orders") is None
+    assert catalog.find("nowhere", "Patient List") is None
+
+def test_suggest_offers_near_misses_and_prefixes():
+    catalog = CoordinateCatalog.from_dict(COORDINATES)
+    assert catalog.suggest("home", "Patient Lst")[0] == "Patient List"
+    assert set(catalog.suggest("home", "pat")) == {"Patient List", "Patient Search"}
+    assert catalog.suggest("home", "zzz") == []
+
+def test_capture_settings_are_read_from_screen_sections():
+    catalog = CoordinateCatalog.from_dict(COORDINATES)
+    assert catalog.capture_settings == {"inpatient_manage": {"format": "png", "colors": 16}}
+    assert catalog.region_for("inpatient") == catalog.screen_sections["inpatient_manage"]
+
+def test_reload_recompiles_only_changed_sections():
+    previous = CoordinateCatalog.from_dict(COORDINATES)
+    data = json.loads(json.dumps(COORDINATES))
+    data["home"][0]["x"] = 15
+    catalog = CoordinateCatalog.from_dict(data, previous=previous)
+    assert catalog.changed_sections(previous) == ["home"]
+    assert catalog.coordinates["section_headers"] is previous.coordinates["section_headers"]
+    assert catalog.find("home", "Patient List").x == 15
+
+def test_an_unchanged_file_reloads_as_the_same_catalog(tmp_path):
+    path = write(tmp_path / "coordinates.json", COORDINATES)
+    previous, unchanged = load_catalog(path)
+    assert not unchanged and previous.source == path
+
+    # Touched but unchanged: the content hash still matches
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    catalog, unchanged = load_catalog(path, previous)
+    assert unchanged and catalog is previous
+
+    data = json.loads(json.dumps(COORDINATES))
+    data["home"].append({"name": "Orders", "x": 50, "y": 20})
+    write(tmp_path / "coordinates.json", data)
+    digest = previous.digest
+    catalog, unchanged = load_catalog(path, previous)
+    assert not unchanged and catalog.find("home", "Orders") is not None
+    assert catalog.digest != digest and previous.digest == digest
+    assert catalog.coordinates["section_headers"] is previous.coordinates["section_headers"]
@@ -0,0 +1,88 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from catalog import Region
+from census import CensusError, CensusRunner
+from pipeline import CapturePipeline
+from workflows import Runtime, Step, WorkflowPlan
+
+SECTION = Region(0, 0, 40, 20, "inpatient_manage")
+PLAN = WorkflowPlan("check_documentation", "", (Step("capture", "Captured", region=SECTION),))
+
+def runtime():
+    return Runtime(send=lambda ops, region: None, grab=lambda region: Image.new("RGB", (40, 20), "white"),
+                   pause=lambda seconds: None, wait_for_probes=lambda probes, timeout: True)
+
+def runner(tmp_path, pipeline, positions=(1, 2, 3), fail=(), plan=PLAN):
+    def select(position):
+        if position in fail:
+            raise ValueError(f"no patient at position {position}")
+    return CensusRunner("ward", plan, list(positions), tmp_path, select, runtime(), pipeline)
+
+@pytest.fixture
+def pipeline():
+    pipeline = CapturePipeline(workers=1)
+    yield pipeline
+    pipeline.close()
+
+def test_checkpoint_records_each_patient(tmp_path, pipeline):
+    census = runner(tmp_path, pipeline, fail=(2,))
+    results = [census.run_patient(position) for position in census.remaining()]
+    assert [result.ok for result in results] == [True, False, True]
+    assert census.finish() == {}
+
+    state = json.loads((tmp_path / "ward" / "checkpoint.json").read_text())
+    assert sorted(state["done"]) == ["1", "3"]
+    assert state["failed"] == {"2": "no patient at position 2"}
+    assert state["done"]["1"]["captures"] == [str(tmp_path / "ward" / "patient_01" / "01_inpatient_manage.png")]
+
+def test_a_rerun_resumes_at_the_unfinished_patients(tmp_path, pipeline):
+    census = runner(tmp_path, pipeline, fail=(2,))
+    for position in census.remaining():
+        census.run_patient(position)
+    census.finish()
+
+    resumed = runner(tmp_path, pipeline, positions=(1, 2, 3, 4))
+    assert resumed.remaining() == [2, 4]
+    assert "resume at patient 2" in resumed.summary()
+
+def test_a_patient_whose_capture_is_missing_is_run_again(tmp_path, pipeline):
+    census = runner(tmp_path, pipeline, positions=(1,))
+    census.run_patient(1)
+    census.finish()
+    (tmp_path / "ward" / "patient_01" / "01_inpatient_manage.png").unlink()
+    assert runner(tmp_path, pipeline, positions=(1,)).remaining() == [1]
+
+class HeldPipeline:
+    """Pipeline stand-in whose writes stay pending until finish()"""
+
+    def __init__(self):
+        self.handles = []
+
+    def submit(self, frame, path, options):
+        self.handles.append(SimpleNamespace(path=path, error=None))
+        return self.handles[-1]
+
+    def drain(self, handles):
+        for handle in handles:
+            handle.path.parent.mkdir(parents=True, exist_ok=True)
+            handle.path.write_bytes(b"png")
+
+def test_progress_counts_captures_still_being_written(tmp_path):
+    census = runner(tmp_path, HeldPipeline())
+    census.run_patient(1)
+    census.run_patient(2)
+    assert not (tmp_path / "ward" / "patient_01" / "01_inpatient_manage.png").exists()
+    assert census.remaining() == [3]
+    census.finish()
+    assert census.remaining() == [3]
+
+def test_a_run_cannot_resume_with_another_workflow(tmp_path, pipeline):
+    census = runner(tmp_path, pipeline, positions=(1,))
+    census.run_patient(1)
+    census.finish()
+    with pytest.raises(CensusError, match="started with workflow 'check_documentation'"):
+        runner(tmp_path, pipeline, plan=PLAN._replace(name="view_lab_results"))
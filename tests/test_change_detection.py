@@ -0,0 +1,58 @@
+import numpy as np
+
+from catalog import Region
+from change_detection import ChangeDetector, tile_boxes, tile_map
+
+def frame(*patches, shape=(128, 256)):
+    """A black frame with white rectangles (left, top, right, bottom)"""
+    pixels = np.zeros(shape, dtype=np.uint8)
+    for left, top, right, bottom in patches:
+        pixels[top:bottom, left:right] = 255
+    return pixels
+
+def test_tile_map_marks_tiles_with_any_changed_pixel():
+    mask = np.zeros((64, 100), dtype=bool)
+    mask[0, 0] = mask[63, 99] = True
+    tiles = tile_map(mask, 32)
+    assert tiles.shape == (2, 4)  # Partial tiles at the edges count
+    assert tiles.sum() == 2 and tiles[0, 0] and tiles[1, 3]
+
+def test_tile_boxes_merge_diagonal_neighbours_only():
+    tiles = np.zeros((4, 6), dtype=bool)
+    tiles[0, 0] = tiles[1, 1] = True  # 8-connected
+    tiles[3, 4] = tiles[3, 5] = True
+    assert sorted(tile_boxes(tiles)) == [(0, 0, 2, 2), (3, 4, 4, 6)]
+
+def test_first_frame_is_reported_as_changed():
+    report = ChangeDetector().compare("notes", frame())
+    assert report.changed and report.first_frame and report.changed_fraction == 1.0
+
+def test_boxes_are_tightened_to_the_changed_pixels():
+    detector = ChangeDetector()
+    detector.compare("notes", frame())
+    report = detector.compare("notes", frame((40, 10, 50, 20), (200, 100, 210, 110)))
+    assert report.changed and not report.first_frame
+    assert sorted(report.boxes) == [(40, 10, 50, 20), (200, 100, 210, 110)]
+    assert report.changed_tiles == 2 and report.total_tiles == 32
+
+def test_small_changes_stay_under_the_threshold_and_fraction():
+    detector = ChangeDetector(threshold=16)
+    detector.compare("notes", frame())
+    assert not detector.compare("notes", frame() + 10).changed  # Gray levels moved by less than the threshold
+
+    detector = ChangeDetector(min_fraction=0.01)
+    detector.compare("notes", frame())
+    assert not detector.compare("notes", frame((0, 0, 4, 4))).changed
+
+def test_boxes_map_back_to_screen_coordinates_on_retina():
+    detector = ChangeDetector()
+    region = Region(100, 50, 228, 114, "notes")  # 2x grab of a 128 x 64 point region
+    detector.compare("notes", frame(), region)
+    report = detector.compare("notes", frame((40, 10, 51, 20)), region)
+    assert report.boxes == [(120, 55, 126, 60)]
+
+def test_reset_forgets_the_stored_frame():
+    detector = ChangeDetector()
+    detector.compare("notes", frame())
+    detector.reset("notes")
+    assert detector.compare("notes", frame()).first_frame
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+sync_api = pytest.importorskip("playwright.sync_api")
+
+def chromium_installed() -> bool:
+    with sync_api.sync_playwright() as p:
+        return os.path.exists(p.chromium.executable_path)
+
+pytestmark = pytest.mark.skipif(not chromium_installed(), reason="needs Playwright's Chromium (playwright install chromium)")
+
+import download
+from session import is_ica_file
+from storefront_standin import StorefrontStandin
+
+@pytest.fixture
+def standin(tmp_path, monkeypatch):
+    standin = StorefrontStandin(login_delay=0.0, apps_delay=0.0).start()
+    monkeypatch.setenv("POWERCHART_DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("CERNER_BASE_URL", standin.url)
+    monkeypatch.setenv("CERNER_USERNAME", "standin")
+    monkeypatch.setenv("CERNER_PASSWORD", "standin")
+    monkeypatch.delenv("POWERCHART_ICA_MAX_AGE", raising=False)
+    monkeypatch.setattr(download, "open_ica_file", lambda path: False)  # Never launch Citrix from a test
+    yield standin
+    standin.stop()
+
+def fetch(tmp_path):
+    return download.download_powerchart_ica(download_path=str(tmp_path))
+
+def test_cold_login_then_warm_state(standin, tmp_path, monkeypatch):
+    cold = fetch(tmp_path)
+    assert is_ica_file(cold)
+    assert (standin.logins, standin.downloads) == (1, 1)
+    assert (tmp_path / "data" / "session" / "storefront_state.json").exists()
+
+    # The ICA file is stale, but the saved login goes straight to the app list
+    monkeypatch.setenv("POWERCHART_ICA_MAX_AGE", "0")
+    warm = fetch(tmp_path)
+    assert warm != cold and is_ica_file(warm)
+    assert (standin.logins, standin.downloads) == (1, 2)
+
+    # The site logged everyone out: the saved state gets the login form and logs in again
+    standin.expire_sessions()
+    fetch(tmp_path)
+    assert (standin.logins, standin.downloads) == (2, 3)
+
+def test_a_fresh_unlaunched_ica_file_is_reused(standin, tmp_path, monkeypatch):
+    first = fetch(tmp_path)
+    page_loads = standin.page_loads
+    assert fetch(tmp_path) == first
+    assert standin.downloads == 1 and standin.page_loads == page_loads  # No browser at all
+
+    # Once its logon ticket is too old, a new file is downloaded
+    monkeypatch.setenv("POWERCHART_ICA_MAX_AGE", "0")
+    assert fetch(tmp_path) != first
+    assert standin.downloads == 2
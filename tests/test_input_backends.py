@@ -0,0 +1,76 @@
+import pytest
+
+import input_backends
+from input_backends import (CliclickBackend, InputOp, LatencyStats, RecordingBackend, click, click_ops, create_backend,
+                            double_click, hotkey, key, set_backend, type_text, wait)
+
+def test_repeated_clicks_are_one_batch_with_waits_between():
+    backend = RecordingBackend()
+    backend.click(10, 20, clicks=3, interval=0.2)
+    assert backend.batches == [[click(10, 20), wait(0.2), click(10, 20), wait(0.2), click(10, 20)]]
+    assert backend.clicks == [(10, 20)] * 3
+    assert click_ops(5, 6, clicks=2) == [click(5, 6), click(5, 6)]
+
+def test_recording_backend_keeps_each_batch():
+    backend = RecordingBackend()
+    backend.run([double_click(1, 2), key("enter")])
+    backend.run([])  # Nothing to send: no batch recorded
+    backend.run([hotkey("ctrl", "c")])
+    assert len(backend.batches) == 2
+    assert backend.ops == [double_click(1, 2), key("enter"), hotkey("ctrl", "c")]
+    assert backend.clicks == [(1, 2)]
+    backend.clear()
+    assert backend.batches == [] and backend.stats.summary()["batches"] == 0
+
+def test_unknown_ops_are_rejected_before_anything_is_sent():
+    backend = RecordingBackend()
+    with pytest.raises(ValueError, match="Unknown input op 'scroll'"):
+        backend.run([click(1, 1), InputOp("scroll", 1, 1)])
+    assert backend.batches == []
+
+def test_latency_stats_leave_out_explicit_waits():
+    backend = RecordingBackend(honor_waits=True)
+    backend.run([click(1, 1), wait(0.05), click(1, 1)])
+    summary = backend.stats.summary()
+    assert summary["batches"] == 1 and summary["ops"] == 2
+    assert summary["wait_seconds"] == 0.05
+    assert summary["active_seconds"] < 0.05
+
+def test_latency_stats_means():
+    stats = LatencyStats()
+    assert stats.summary()["mean_batch_ms"] == 0.0
+    stats.record(2, 0.010, 0.0)
+    stats.record(4, 0.030, 0.5)
+    summary = stats.summary()
+    assert summary["mean_batch_ms"] == 20.0 and summary["mean_op_ms"] == pytest.approx(6.667)
+    assert summary["max_batch_ms"] == 30.0 and summary["wait_seconds"] == 0.5
+
+def test_cliclick_commands():
+    commands = CliclickBackend().commands([
+        click(10, 20), double_click(30, 40), wait(0.25), key("enter"), key("f5"), type_text("Smith"),
+        hotkey("ctrl", "a"), hotkey("cmd", "shift", "tab"), hotkey("esc"),
+    ])
+    assert commands == [
+        "c:10,20", "dc:30,40", "w:250", "kp:return", "kp:f5", "t:Smith",
+        "kd:ctrl", "t:a", "ku:ctrl",
+        "kd:cmd,shift", "kp:tab", "ku:cmd,shift",
+        "kp:esc",
+    ]
+
+def test_a_cliclick_batch_is_one_process(monkeypatch):
+    calls = []
+    monkeypatch.setattr(input_backends.subprocess, "run", lambda args: calls.append(args))
+    backend = CliclickBackend(path="/usr/local/bin/cliclick")
+    backend.click(5, 5, clicks=2, interval=0.1)
+    assert calls == [["/usr/local/bin/cliclick", "c:5,5", "w:100", "c:5,5"]]
+    assert backend.stats.summary()["ops"] == 2
+
+def test_backend_selection():
+    with pytest.raises(ValueError, match="Unknown input backend 'xdotool'"):
+        create_backend("xdotool")
+    recording = RecordingBackend()
+    previous = set_backend(recording)
+    try:
+        assert input_backends.get_backend() is recording
+    finally:
+        set_backend(previous)
@@ -0,0 +1,67 @@
+import numpy as np
+from PIL import Image
+
+from catalog import Point, Region
+from locator import Locator, match_template
+
+def screen_with_patch(left, top):
+    """A 400 x 400 noisy screen with a textured 40 x 40 patch at (left, top)"""
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 40, (400, 400)).astype(np.uint8)
+    pixels[top:top + 40, left:left + 40] = rng.integers(100, 255, (40, 40)).astype(np.uint8)
+    return Image.fromarray(pixels)
+
+class Screen:
+    def __init__(self, image):
+        self.image = image
+        self.grabs = []
+
+    def grab(self, region: Region):
+        self.grabs.append(region)
+        return self.image.crop((region.left_x, region.upper_y, region.right_x, region.lower_y))
+
+def test_match_template_finds_the_exact_window():
+    image = np.asarray(screen_with_patch(120, 80), dtype=np.float64)
+    left, top, score = match_template(image, image[80:120, 120:160])
+    assert (left, top) == (120, 80) and score > 0.99
+
+def test_resolve_follows_a_moved_element_and_caches_the_offset(tmp_path):
+    point = Point(200, 200, "Orders", section="menu")
+    screen = Screen(screen_with_patch(180, 180))
+    locator = Locator(tmp_path, screen.grab, search_radius=100)
+    locator.save_template(point, size=40)
+
+    screen.image = screen_with_patch(210, 170)
+    assert locator.resolve(point)[:2] == (230, 190)
+    grabs = len(screen.grabs)
+    match = locator.locate(point)
+    assert match.cached and (match.x, match.y) == (230, 190)
+    assert [(r.width, r.height) for r in screen.grabs[grabs:]] == [(43, 43)]  # Only the template's window
+
+def test_a_cached_offset_is_dropped_when_the_element_moves_again(tmp_path):
+    point = Point(200, 200, "Orders", section="menu")
+    screen = Screen(screen_with_patch(180, 180))
+    locator = Locator(tmp_path, screen.grab, search_radius=100)
+    locator.save_template(point, size=40)
+    screen.image = screen_with_patch(210, 170)
+    assert locator.resolve(point)[:2] == (230, 190)
+
+    screen.image = screen_with_patch(150, 200)
+    match = locator.locate(point)
+    assert not match.cached and (match.x, match.y) == (170, 220)
+    assert locator.locate(point).cached
+
+def test_a_miss_is_retried_once_its_ttl_has_passed(tmp_path):
+    point = Point(200, 200, "Orders", section="menu")
+    screen = Screen(screen_with_patch(180, 180))
+    locator = Locator(tmp_path, screen.grab, search_radius=100, miss_ttl=60.0)
+    locator.save_template(point, size=40)
+
+    screen.image = Image.new("L", (400, 400))  # Not drawn yet
+    assert locator.locate(point) is None
+    screen.image = screen_with_patch(190, 180)
+    assert locator.locate(point) is None  # Still within the TTL
+
+    locator.miss_ttl = 0.0
+    match = locator.locate(point)
+    assert match is not None and (match.dx, match.dy) == (10, 0)
@@ -0,0 +1,57 @@
+from macros import MacroStore, compile_macro, simplify
+from catalog import CoordinateCatalog
+from workflows import CompileContext
+
+def click(element, changed=True, action="navigate_to"):
+    return {"action": action, "params": {"section": "documentation", "element": element}, "changed": changed}
+
+def scroll(direction, clicks=1, section="notes"):
+    return {"action": "scroll_section", "params": {"section": section, "direction": direction, "clicks": clicks}, "changed": True}
+
+def test_repeated_clicks_that_changed_the_screen_are_kept():
+    calls = [click("next note"), click("next note"), click("next note")]
+    assert simplify(calls) == calls
+
+def test_repeated_click_that_changed_nothing_is_dropped():
+    calls = [click("Provider View"), click("Provider View", changed=False), click("Notes")]
+    assert [c["params"]["element"] for c in simplify(calls)] == ["Provider View", "Notes"]
+
+def test_first_click_is_kept_even_if_it_changed_nothing():
+    calls = [click("Provider View", changed=False)]
+    assert simplify(calls) == calls
+
+def test_unobserved_repeat_is_kept():
+    calls = [click("Next"), {"action": "navigate_to", "params": {"section": "documentation", "element": "Next"}}]
+    assert len(simplify(calls)) == 2
+
+def test_scrolls_of_one_section_and_direction_are_folded():
+    kept = simplify([scroll("down", 2), scroll("down", 3), scroll("up"), scroll("up", section="other")])
+    assert [(c["params"]["section"], c["params"]["direction"], c["params"]["clicks"]) for c in kept] == [
+        ("notes", "down", 5), ("notes", "up", 1), ("other", "up", 1)]
+
+def test_paging_macro_replays_every_click():
+    catalog = CoordinateCatalog.from_dict({"documentation": [{"name": "next note", "x": 10, "y": 20}]})
+    macro = {"calls": [click("next note")] * 3}
+    plan, stats = compile_macro(CompileContext(catalog), "paging", macro)
+    clicks = [op for step in plan.steps for op in step.ops if op.kind == "click"]
+    assert len(clicks) == 3
+    assert stats.dropped == 0
+
+def test_store_round_trip(tmp_path):
+    store = MacroStore(tmp_path / "macros.json")
+    store.save("m", {"calls": []})
+    assert store.get("m") == {"calls": []}
+    assert store.delete("m")
+    assert not store.delete("m")
+
+def test_corrupt_store_is_moved_aside_before_a_save(tmp_path):
+    path = tmp_path / "macros.json"
+    path.write_bytes(b"{not json")
+    store = MacroStore(path)
+    assert store.all() == {}
+    assert path.read_bytes() == b"{not json"  # Reading never touches the file
+
+    store.save("m", {"calls": []})
+    assert MacroStore(path).get("m") == {"calls": []}
+    [aside] = tmp_path.glob("macros.json.corrupt-*")
+    assert aside.read_bytes() == b"{not json"
@@ -0,0 +1,62 @@
+import json
+import threading
+
+import metrics
+from metrics import Histogram, Metrics
+
+def test_histogram_buckets_and_percentiles():
+    histogram = Histogram()
+    for ms in (0.5, 3, 3, 40, 20000):
+        histogram.observe(ms / 1000)
+    summary = histogram.as_dict()
+    assert summary["count"] == 5
+    assert summary["buckets"] == {"<=1ms": 1, "<=5ms": 2, "<=50ms": 1, ">10000ms": 1}
+    assert summary["p50_ms"] == 3.0
+    assert summary["max_ms"] == 20000.0
+    assert summary["mean_ms"] == round((0.5 + 3 + 3 + 40 + 20000) / 5, 3)
+
+def test_bucket_bounds_are_inclusive():
+    histogram = Histogram()
+    histogram.observe(0.005)
+    assert histogram.as_dict()["buckets"] == {"<=5ms": 1}
+
+def test_timed_spans_and_counters_reach_the_summary():
+    registry = Metrics()
+    with registry.timed("capture.grab"):
+        pass
+    registry.count("archive.new", 3)
+    summary = registry.summary()
+    assert summary["counters"] == {"archive.new": 3}
+    assert summary["timings"]["capture.grab"]["count"] == 1
+    registry.reset()
+    assert registry.summary() == {"counters": {}, "timings": {}}
+
+def test_trace_collects_spans_from_every_thread_and_exports_them(tmp_path):
+    registry = Metrics()
+    with registry.trace("check patient/details", tmp_path) as trace:
+        with registry.timed("input.batch", clicks=2):
+            pass
+        worker = threading.Thread(target=lambda: registry.record("capture.encode", 0.0, 0.01), name="encoder")
+        worker.start()
+        worker.join()
+    registry.record("after", 0.0, 0.01)  # Outside the trace
+
+    assert [event.name for event in trace.events] == ["input.batch", "capture.encode", "check patient/details"]
+    jsonl, chrome = trace.paths
+    assert "check_patient_details" in jsonl
+    lines = [json.loads(line) for line in open(jsonl)]
+    assert lines[0]["name"] == "input.batch" and lines[0]["clicks"] == 2
+
+    events = json.load(open(chrome))["traceEvents"]
+    spans = [event for event in events if event["ph"] == "X"]
+    names = {event["args"]["name"] for event in events if event["ph"] == "M"}
+    assert len(spans) == 3 and "encoder" in names
+
+def test_old_traces_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "KEEP_TRACES", 2)
+    for n in range(4):
+        (tmp_path / f"2025010{n}-run.trace.json").write_text("{}")
+        (tmp_path / f"2025010{n}-run.jsonl").write_text("")
+    metrics._prune(tmp_path)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "20250102-run.jsonl", "20250102-run.trace.json", "20250103-run.jsonl", "20250103-run.trace.json"]
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from catalog import load_catalog
+from notes import NoteHarvester, NoteLayout, NoteStore, note_hash
+from simulator import SimulatedScreen, SimulatorBackend
+
+CATALOG, _ = load_catalog("coordinates.json")
+
+def wait_until(predicate, timeout=1.0, interval=0.0):
+    return predicate()  # The simulated clipboard is written synchronously
+
+@pytest.fixture
+def screen():
+    return SimulatedScreen(CATALOG, render_delay=0.0, render_time=0.0, notes=30)
+
+def harvester(screen, store, **kwargs):
+    backend = SimulatorBackend(screen, honor_waits=False)
+    return NoteHarvester(NoteLayout.from_catalog(CATALOG), lambda ops, region: backend.run(ops), backend.run,
+                         screen.clipboard, wait_until, store, patient="p1", **kwargs)
+
+def walk(harvester):
+    notes = []
+    while True:
+        note = harvester.step()
+        if note is None:
+            return notes
+        notes.append(note)
+
+def test_note_hash_ignores_line_endings_and_trailing_space():
+    assert note_hash("Progress note\r\nPlan: rest  \n") == note_hash("Progress note\nPlan: rest")
+
+def test_first_harvest_reads_every_note_across_pages(screen, tmp_path):
+    store = NoteStore(tmp_path / "notes.sqlite3")
+    notes = walk(harvester(screen, store, max_pages=3))
+    assert [note.text.splitlines()[0] for note in notes[:2]] == ["Progress note #30", "Progress note #29"]
+    assert len(notes) == 30 and all(note.new for note in notes)
+    assert notes[18].page == 2 and notes[18].position == 1
+    assert store.count("p1") == 30
+
+def test_a_rerun_stops_at_the_first_known_note(screen, tmp_path):
+    store = NoteStore(tmp_path / "notes.sqlite3")
+    walk(harvester(screen, store, max_pages=3))
+
+    screen.add_notes(2)
+    screen.note_page = 0
+    rerun = harvester(screen, store, max_pages=3)
+    notes = walk(rerun)
+    assert [note.new for note in notes] == [True, True, False]
+    assert rerun.stopped == "reached notes from an earlier harvest"
+    assert store.count("p1") == 32
+
+def test_a_copy_that_never_lands_stops_the_walk(screen, tmp_path):
+    store = NoteStore(tmp_path / "notes.sqlite3")
+    walker = harvester(screen, store)
+    walker.send_keys = lambda ops: None  # ctrl+c never reaches the application
+    assert walk(walker) == []
+    assert walker.stopped == "nothing copied from note 1 on page 1"
+
+def test_harvest_notes_tool_against_the_simulator(screen, monkeypatch):
+    import powerchart_mcp as server
+    from simulator import install
+
+    install(screen, honor_waits=False)
+    monkeypatch.setattr(server, "send_input", lambda ops, region: server.get_backend().run(ops))
+    result = asyncio.run(server.harvest_notes(patient="tool-test", max_pages=1, open_view=False))
+    assert result["read"] == 18 and result["new"] == 18
+    assert result["notes"][0]["text"].startswith("Progress note #30")
+    assert result["stopped"] == "read 1 page(s)"
@@ -0,0 +1,55 @@
+from PIL import Image
+
+from catalog import Region
+from ocr import OcrReader
+
+class Engine:
+    """Stub OCR engine: two lines in frame pixels; counts calls"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, image, language, psm):
+        self.calls.append((image.size, language, psm))
+        return [("Vital Signs", (20, 10, 120, 30), 91.5), ("BP 120/80", (20, 40, 100, 60), 88.0)]
+
+def frame(color=(255, 255, 255)):
+    return Image.new("RGB", (400, 200), color)
+
+def test_line_boxes_map_back_to_screen_coordinates():
+    result = OcrReader(engine=Engine()).read(frame(), Region(100, 50, 300, 150, "vitals"))
+    assert result.text == "Vital Signs\nBP 120/80" and not result.cached
+    # A 2x (Retina) frame: pixel boxes are halved, then offset by the region's corner
+    assert result.lines[0].box == (110, 55, 160, 65)
+    assert OcrReader(engine=Engine()).read(frame()).lines[1].box == (20, 40, 100, 60)
+
+def test_an_unchanged_frame_is_read_once():
+    engine = Engine()
+    reader = OcrReader(engine=engine)
+    assert not reader.read(frame()).cached
+    again = reader.read(frame())
+    assert again.cached and again.seconds == 0.0 and again.text == "Vital Signs\nBP 120/80"
+    assert len(engine.calls) == 1
+    reader.read(frame((250, 250, 250)))
+    assert len(engine.calls) == 2
+
+def test_engine_settings_are_part_of_the_key():
+    engine = Engine()
+    OcrReader(engine=engine).read(frame())
+    reader = OcrReader(engine=engine, psm=6)
+    reader.read(frame())
+    reader.read(frame())
+    assert engine.calls == [((400, 200), "eng", 3), ((400, 200), "eng", 6)]
+
+def test_the_cache_survives_a_restart(tmp_path):
+    path = tmp_path / "ocr.sqlite3"
+    first = OcrReader(path, engine=Engine())
+    first.read(frame())
+    first.close()
+
+    engine = Engine()
+    reader = OcrReader(path, engine=engine)
+    result = reader.read(frame(), Region(0, 0, 200, 100, "all"))
+    assert result.cached and engine.calls == []
+    assert result.as_dict(min_confidence=90)["text"] == "Vital Signs"
+    reader.close()
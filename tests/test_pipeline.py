@@ -0,0 +1,58 @@
+import threading
+import time
+
+from PIL import Image
+
+import pipeline as pipeline_module
+from archive import CaptureArchive
+from metrics import METRICS
+from pipeline import CapturePipeline
+
+def frame(color="white"):
+    return Image.new("RGB", (16, 16), color)
+
+def test_submit_blocks_while_the_queue_is_full(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    def slow_encode(image, options):
+        release.wait(5)
+        return b"png"
+
+    monkeypatch.setattr(pipeline_module, "encode", slow_encode)
+    captures = CapturePipeline(workers=1, max_pending=2)
+    waits = METRICS.counters["pipeline.backpressure_waits"]
+    captures.submit(frame(), tmp_path / "1.png")
+    captures.submit(frame(), tmp_path / "2.png")
+    assert captures.pending == 2
+
+    submitted = threading.Event()
+    third = threading.Thread(target=lambda: (captures.submit(frame(), tmp_path / "3.png"), submitted.set()))
+    third.start()
+    time.sleep(0.1)
+    assert not submitted.is_set()  # Back-pressure: the third frame waits for a slot
+
+    release.set()
+    third.join(5)
+    assert submitted.is_set()
+    assert captures.drain(timeout=5)
+    assert METRICS.counters["pipeline.backpressure_waits"] == waits + 1
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["1.png", "2.png", "3.png"]
+    captures.close()
+
+def test_write_errors_are_reported_on_the_handle(tmp_path):
+    captures = CapturePipeline(workers=1)
+    (tmp_path / "file").write_text("")
+    handle = captures.submit(frame(), tmp_path / "file" / "capture.png")  # Its parent is a file
+    assert captures.drain([handle], timeout=5)
+    assert handle.status == "error" and handle.error
+    captures.close()
+
+def test_archive_captures_report_whether_they_were_new(tmp_path):
+    captures = CapturePipeline(archive=CaptureArchive(tmp_path))
+    first = captures.submit(frame(), section="inpatient_manage", patient="p1")
+    captures.drain([first])
+    repeat = captures.submit(frame(), section="inpatient_manage", patient="p1")
+    captures.drain([repeat])
+    assert (first.new, repeat.new) == (True, False)
+    assert repeat.path == first.path and captures.get(repeat.id) is repeat
+    captures.close()
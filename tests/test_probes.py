@@ -0,0 +1,60 @@
+import json
+
+import pytest
+from PIL import Image
+
+from catalog import Region
+from probes import Probe, all_match, bounding_region, load_probes, sample
+
+class Screen:
+    """Fake grabber over a 2x (Retina) screen image; counts grabs"""
+
+    def __init__(self, image):
+        self.image = image
+        self.grabs = []
+
+    def grab(self, region: Region):
+        self.grabs.append(region)
+        return self.image.crop((region.left_x * 2, region.upper_y * 2, region.right_x * 2, region.lower_y * 2))
+
+def screen():
+    image = Image.new("RGB", (400, 200), (255, 255, 255))
+    image.paste((200, 30, 30), (20, 20, 40, 40))  # Red square at logical (10, 10)-(20, 20)
+    image.paste((30, 200, 30), (300, 100, 320, 120))  # Green square at logical (150, 50)-(160, 60)
+    return Screen(image)
+
+def test_load_probes(tmp_path):
+    path = tmp_path / "probes.json"
+    path.write_text(json.dumps({"alert": {"x": 12, "y": 14, "expect": [200, 30, 30], "tolerance": 8},
+                                "anywhere": {"x": 1, "y": 2}}))
+    probes = load_probes(str(path))
+    assert probes["alert"] == Probe("alert", 12, 14, (200, 30, 30), 8)
+    assert probes["anywhere"].expect is None and probes["anywhere"].tolerance == 16
+
+def test_load_probes_rejects_a_bad_color(tmp_path):
+    path = tmp_path / "probes.json"
+    path.write_text(json.dumps({"alert": {"x": 1, "y": 1, "expect": [1, 2]}}))
+    with pytest.raises(ValueError, match="expect must be"):
+        load_probes(str(path))
+
+def test_all_probes_are_read_from_one_grab():
+    fake = screen()
+    probes = [Probe("red", 15, 15, (200, 30, 30)), Probe("green", 155, 55, (30, 200, 30)), Probe("plain", 100, 30)]
+    readings = sample(probes, fake.grab)
+    assert fake.grabs == [bounding_region(probes)]
+    assert readings["red"].color == (200, 30, 30) and readings["red"].match
+    assert readings["green"].match
+    assert readings["plain"].color == (255, 255, 255) and readings["plain"].match is None
+    assert all_match(readings)
+
+def test_tolerance_decides_a_match():
+    fake = screen()
+    readings = sample([Probe("near", 15, 15, (210, 40, 40), tolerance=16),
+                       Probe("far", 15, 15, (230, 30, 30), tolerance=16)], fake.grab)
+    assert readings["near"].match and not readings["far"].match
+    assert not all_match(readings)
+
+def test_no_probes_grab_nothing():
+    fake = screen()
+    assert sample([], fake.grab) == {}
+    assert fake.grabs == []
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from process_monitor import ProcessInfo, ProcessMonitor, Snapshot, citrix_processes, proc_snapshot
+
+class Table:
+    """Injected backend that plays back one process list per snapshot, repeating the last"""
+
+    def __init__(self, *tables):
+        self.tables = list(tables)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.tables.pop(0) if len(self.tables) > 1 else self.tables[0]
+
+VIEWER = ProcessInfo(101, "Citrix Viewer")
+HUSK = ProcessInfo(102, "Citrix   Husk")
+
+def test_names_match_case_insensitively_and_without_exe():
+    snapshot = Snapshot([ProcessInfo(7, "CDViewer.exe"), ProcessInfo(8, "cdviewer.EXE"), ProcessInfo(9, "explorer.exe")])
+    assert snapshot.pids("CDViewer") == [7, 8]
+    assert snapshot.status(["CDViewer", "wfica32"]) == {"CDViewer": True, "wfica32": False}
+
+def test_status_of_several_apps_takes_one_snapshot():
+    table = Table([VIEWER, HUSK])
+    monitor = ProcessMonitor(table)
+    assert monitor.status(citrix_processes("Darwin")) == {"Citrix Viewer": True, "Citrix   Husk": True}
+    assert table.calls == 1 and monitor.snapshots == 1
+
+def test_wait_for_polls_until_every_app_runs():
+    table = Table([], [VIEWER], [VIEWER, HUSK])
+    polls = []
+    assert ProcessMonitor(table).wait_for(["Citrix Viewer", "Citrix   Husk"], timeout=5, interval=0.001,
+                                          on_poll=polls.append)
+    assert polls == [{"Citrix Viewer": False, "Citrix   Husk": False},
+                     {"Citrix Viewer": True, "Citrix   Husk": False},
+                     {"Citrix Viewer": True, "Citrix   Husk": True}]
+
+def test_wait_for_gives_up_at_the_timeout():
+    table = Table([HUSK])
+    assert not ProcessMonitor(table).wait_for(["Citrix Viewer"], timeout=0.05, interval=0.01)
+    assert table.calls >= 2
+
+def test_wait_for_exit_rechecks_until_none_remain():
+    # Made-up pids have already "exited", so each wait returns at once and the table is read again
+    table = Table([ProcessInfo(2 ** 22 + 1, "wfica")], [])
+    assert ProcessMonitor(table).wait_for_exit(["wfica"], timeout=5)
+    assert table.calls == 2
+
+def test_wait_for_exit_times_out_while_the_app_keeps_running():
+    table = Table([ProcessInfo(os.getpid(), "wfica")])
+    assert not ProcessMonitor(table).wait_for_exit(["wfica"], timeout=0.05)
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc")
+def test_proc_snapshot_sees_a_child_and_its_exit():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(0.2)"])
+    try:
+        assert child.pid in [process.pid for process in proc_snapshot()]
+        monitor = ProcessMonitor(lambda: [p for p in proc_snapshot() if p.pid == child.pid])
+        assert not monitor.status(["nothing-by-this-name"])["nothing-by-this-name"]
+        # The exited child stays a zombie until reaped; proc_snapshot leaves zombies out
+        assert monitor.wait_for_exit([monitor.snapshot().processes[0].name], timeout=5)
+    finally:
+        child.wait()
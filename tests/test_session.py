@@ -0,0 +1,12 @@
+import stat
+
+from session import StorefrontSession
+
+class Context:
+    def storage_state(self):
+        return {"cookies": [{"name": "CtxsAuthId", "value": "secret"}], "origins": []}
+
+def test_saved_login_state_is_private(tmp_path):
+    session = StorefrontSession("https://storefront.example.org/Citrix/StoreWeb/", directory=tmp_path)
+    session.save_state(Context())
+    assert stat.S_IMODE(session.state_path.stat().st_mode) == 0o600
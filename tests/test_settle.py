@@ -0,0 +1,106 @@
+import time
+
+from PIL import Image
+
+from catalog import Region
+from settle import WaitEngine, watch_region
+
+REGION = Region(0, 0, 800, 600, "inpatient_manage")
+
+class Screen:
+    """Fake grabber: a flat gray screen whose shade follows a schedule of (seconds after start, shade)"""
+
+    def __init__(self, schedule=((0.0, 0),), changing=False):
+        self.schedule = schedule
+        self.changing = changing
+        self.start = time.perf_counter()
+        self.grabs = []
+
+    def grab(self, region):
+        self.grabs.append(region)
+        if self.changing:
+            shade = len(self.grabs) * 40 % 256
+        else:
+            elapsed = time.perf_counter() - self.start
+            shade = [value for at, value in self.schedule if at <= elapsed][-1]
+        return Image.new("RGB", (region.width, region.height), (shade, shade, shade))
+
+def engine(screen, **kwargs):
+    return WaitEngine(screen.grab, mode="settle", interval=0.005, **kwargs)
+
+def test_settles_once_a_change_holds_still():
+    screen = Screen(((0.0, 0), (0.05, 200)))
+    wait = engine(screen, timeout=2.0)
+    with wait.settle_after(REGION, fixed_delay=0.3):
+        pass
+    result = wait.last_result
+    assert result.settled and result.changed
+    assert result.elapsed < 0.3  # A change ends the wait before the fixed delay
+
+def test_no_change_is_not_concluded_before_the_fixed_delay():
+    screen = Screen()
+    wait = engine(screen, quiet_period=0.05)
+    with wait.settle_after(REGION, fixed_delay=0.3):
+        pass
+    result = wait.last_result
+    assert result.settled and not result.changed
+    assert result.elapsed >= 0.3
+
+def test_quiet_period_longer_than_the_fixed_delay_wins():
+    wait = engine(Screen(), quiet_period=0.2)
+    with wait.settle_after(REGION, fixed_delay=0.05):
+        pass
+    assert wait.last_result.elapsed >= 0.2
+
+def test_times_out_on_a_screen_that_keeps_changing():
+    wait = engine(Screen(changing=True), timeout=0.1)
+    with wait.settle_after(REGION, fixed_delay=0.0):
+        pass
+    assert not wait.last_result.settled and wait.last_result.changed
+
+def test_pause_catches_a_repaint_that_starts_late():
+    screen = Screen(((0.0, 0), (0.45, 200)))
+    wait = engine(screen, timeout=2.0)
+    with wait.settle_after(REGION, fixed_delay=0.3):
+        pass
+    assert not wait.last_result.changed
+    wait.pause(1.0)
+    assert wait.last_result.changed
+    assert time.perf_counter() - screen.start < 1.0  # Returned once the late change settled
+
+def test_a_change_outside_the_middle_is_seen():
+    class Corner(Screen):
+        def grab(self, region):
+            image = super().grab(region)
+            if time.perf_counter() - self.start >= 0.02:
+                image.paste((255, 255, 255), (0, 0, region.width // 4, region.height // 4))
+            return image
+
+    wait = engine(Corner(), timeout=2.0)
+    with wait.settle_after(REGION, fixed_delay=0.3):
+        pass
+    assert wait.last_result.changed and wait.last_result.elapsed < 0.3
+
+def test_pause_is_skipped_after_a_change():
+    screen = Screen(((0.0, 0), (0.02, 200)))
+    wait = engine(screen, timeout=2.0)
+    with wait.settle_after(REGION, fixed_delay=0.3):
+        pass
+    start = time.perf_counter()
+    wait.pause(1.0)
+    assert time.perf_counter() - start < 0.05
+
+def test_fixed_mode_sleeps_without_grabbing():
+    screen = Screen()
+    wait = WaitEngine(screen.grab, mode="fixed")
+    start = time.perf_counter()
+    with wait.settle_after(REGION, fixed_delay=0.05):
+        pass
+    wait.pause(0.05)
+    assert time.perf_counter() - start >= 0.1
+    assert screen.grabs == []
+
+def test_polls_watch_the_whole_section_unless_limited():
+    assert watch_region(REGION) == REGION
+    assert watch_region(REGION, (480, 320))[:4] == (160, 140, 640, 460)
+    assert watch_region(Region(0, 0, 100, 50, "small"), (480, 320))[:4] == (0, 0, 100, 50)
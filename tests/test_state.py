@@ -0,0 +1,21 @@
+from state import StateStore, is_newer, parse_date
+
+def test_dates_compare_by_value_not_text():
+    assert is_newer("date", "01/05/2025", "12/30/2024")
+    assert not is_newer("date", "12/30/2024", "01/05/2025")
+    assert not is_newer("date", "2025-01-05", "01/05/2025")
+    assert is_newer("date", "01/05/2025 14:30", "01/05/2025 09:15")
+
+def test_unparseable_dates_and_other_kinds_compare_as_text():
+    assert parse_date("yesterday") is None
+    assert is_newer("date", "yesterday", "today")
+    assert not is_newer("frame", "abc", "abc")
+
+def test_an_older_date_does_not_replace_the_stored_one(tmp_path):
+    store = StateStore(tmp_path / "state.sqlite3")
+    assert store.update("p1", "media", "date", "03/01/2025") == (True, None)
+    new, previous = store.update("p1", "media", "date", "02/01/2025")
+    assert not new and previous.value == "03/01/2025"
+    assert store.get("p1", "media", "date").value == "03/01/2025"
+    assert store.update("p1", "media", "date", "03/02/2025")[0]
+    assert store.get("p2", "media", "date") is None
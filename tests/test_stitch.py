@@ -0,0 +1,39 @@
+import numpy as np
+from PIL import Image
+
+from stitch import Stitcher, find_scroll_offset, to_rows
+
+HEIGHT = 60
+
+def content(rows=200, width=40):
+    """A tall page where every row is distinct"""
+    rng = np.random.default_rng(1)
+    return rng.integers(0, 256, (rows, width)).astype(np.uint8)
+
+def page(pixels, top):
+    return Image.fromarray(pixels[top:top + HEIGHT])
+
+def test_find_scroll_offset_reports_rows_moved():
+    pixels = content()
+    assert find_scroll_offset(to_rows(page(pixels, 0)), to_rows(page(pixels, 25))) == 25
+    assert find_scroll_offset(to_rows(page(pixels, 0)), to_rows(page(pixels, 0))) == 0
+
+def test_find_scroll_offset_needs_an_overlap():
+    pixels = content()
+    assert find_scroll_offset(to_rows(page(pixels, 0)), to_rows(page(pixels, 100))) is None
+
+def test_stitcher_keeps_each_row_once():
+    pixels = content()
+    stitcher = Stitcher(page(pixels, 0))
+    assert stitcher.add(page(pixels, 40)) == 40
+    assert stitcher.add(page(pixels, 40)) == 0  # A scroll that showed nothing new
+    assert stitcher.add(page(pixels, 70)) == 30
+    assert np.array_equal(np.asarray(stitcher.image()), pixels[:70 + HEIGHT])
+    assert stitcher.unaligned == 0
+
+def test_stitcher_ignores_the_scrollbar_when_aligning():
+    pixels = content()
+    first, second = page(pixels, 0), np.asarray(page(pixels, 20)).copy()
+    second[:, -4:] = 0  # The scrollbar thumb moved
+    stitcher = Stitcher(first, ignore_right=4)
+    assert stitcher.add(Image.fromarray(second)) == 20
@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+
+from watcher import FileWatcher
+
+def bump(path, text):
+    """Rewrite a file and move its mtime forward, so the change shows on coarse-mtime filesystems too"""
+    stat = os.stat(path) if os.path.exists(path) else None
+    path.write_text(text)
+    if stat is not None:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+def test_check_reports_changed_files_once(tmp_path):
+    first, second = tmp_path / "a.json", tmp_path / "b.json"
+    first.write_text("{}")
+    second.write_text("{}")
+    calls = []
+    watcher = FileWatcher([str(first), str(second)], calls.append)
+    assert watcher.check() == []
+
+    bump(first, '{"x": 1}')
+    assert watcher.check() == [str(first)]
+    assert watcher.check() == []
+    assert calls == [[str(first)]]
+
+def test_created_and_deleted_files_count_as_changes(tmp_path):
+    path = tmp_path / "probes.json"
+    watcher = FileWatcher([], lambda changed: None)
+    watcher.watch(str(path))
+    path.write_text("{}")
+    assert watcher.check() == [str(path)]
+    path.unlink()
+    assert watcher.check() == [str(path)]
+
+def test_callback_errors_do_not_stop_the_watcher(tmp_path, capsys):
+    path = tmp_path / "a.json"
+    path.write_text("{}")
+
+    def fail(changed):
+        raise ValueError("bad file")
+
+    watcher = FileWatcher([str(path)], fail)
+    bump(path, "[]")
+    assert watcher.check() == [str(path)]
+    assert "bad file" in capsys.readouterr().err
+
+COORDINATES = {
+    "home": [{"name": "Patient List", "x": 10, "y": 20}],
+    "labs": [{"name": "Results Review", "x": 30, "y": 40}],
+    "screen_sections": {"inpatient_manage": {"left_x": 0, "upper_y": 0, "right_x": 800, "lower_y": 600,
+                                             "name": "inpatient_manage"}},
+}
+WORKFLOWS = {"open_list": {"steps": [{"action": "navigate_to", "params": {"section": "home", "element": "Patient List"}}]}}
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """The server with its data files read from tmp_path; CONFIG is restored afterwards"""
+    import powerchart_mcp
+
+    (tmp_path / "coordinates.json").write_text(json.dumps(COORDINATES))
+    (tmp_path / "workflows.json").write_text(json.dumps(WORKFLOWS))
+    (tmp_path / "probes.json").write_text("{}")
+    monkeypatch.setattr(powerchart_mcp, "data_file_paths", lambda filename: [str(tmp_path / filename)])
+    original = powerchart_mcp.CONFIG
+    powerchart_mcp.reload_config()
+    yield powerchart_mcp
+    powerchart_mcp.CONFIG = original
+
+def test_reload_swaps_in_the_edited_coordinates(server, tmp_path):
+    before = server.CONFIG
+    data = json.loads(json.dumps(COORDINATES))
+    data["labs"][0]["x"] = 35
+    bump(tmp_path / "coordinates.json", json.dumps(data))
+
+    message = server.reload_config()
+    assert "1 coordinate section(s) recompiled (labs)" in message
+    assert server.CONFIG is not before
+    assert server.CONFIG.catalog.find("labs", "Results Review").x == 35
+    assert server.CONFIG.catalog.coordinates["home"] is before.catalog.coordinates["home"]
+
+def test_reload_keeps_the_catalog_when_the_file_is_broken(server, tmp_path):
+    before = server.CONFIG.catalog
+    bump(tmp_path / "coordinates.json", "{broken")
+    server.reload_config()
+    assert server.CONFIG.catalog is before
+
+def test_reload_reports_workflows_broken_by_the_new_coordinates(server, tmp_path):
+    data = json.loads(json.dumps(COORDINATES))
+    data["home"][0]["name"] = "Patient Lists"
+    bump(tmp_path / "coordinates.json", json.dumps(data))
+    server.reload_config()
+    assert "open_list" in server.CONFIG.workflow_errors
+    assert "element 'Patient List' not found" in server.CONFIG.workflow_errors["open_list"]
@@ -0,0 +1,65 @@
+import pytest
+
+from catalog import CoordinateCatalog
+from probes import Probe
+from workflows import CompileContext, WorkflowError, compile_workflow, compile_workflows
+
+CATALOG = CoordinateCatalog.from_dict({
+    "specific_patient": [{"name": "Provider View", "x": 10, "y": 20}],
+    "notes": [{"name": "scroll down", "x": 500, "y": 590}],
+    "screen_sections": {
+        name: {"left_x": 0, "upper_y": top, "right_x": 800, "lower_y": top + 100, "name": name}
+        for name, top in (("inpatient_manage", 0), ("warning_sign", 100), ("notes", 200))
+    },
+})
+CONTEXT = CompileContext(CATALOG, probes={"loaded": Probe("loaded", 5, 5, (0, 0, 0)), "any": Probe("any", 5, 5)})
+
+def capture(section):
+    return {"action": "capture_screen_section", "params": {"section": section}}
+
+def click(element="Provider View"):
+    return {"action": "navigate_to", "params": {"section": "specific_patient", "element": element}}
+
+def check(steps):
+    return {"action": "skip_if_unchanged", "params": {"section": "notes", "steps": steps}}
+
+def kinds(plan):
+    return [(step.kind, tuple(region.name for region in step.regions) or (step.region.name if step.region else None))
+            for step in plan.steps]
+
+def test_back_to_back_captures_share_one_grab():
+    plan = compile_workflow(CONTEXT, "w", {"steps": [click(), capture("inpatient_manage"), capture("warning_sign")]})
+    assert [step.kind for step in plan.steps] == ["input", "capture"]
+    assert [region.name for region in plan.steps[1].regions] == ["inpatient_manage", "warning_sign"]
+
+def test_captures_are_not_merged_across_a_skip_boundary():
+    steps = [check(1), capture("inpatient_manage"), capture("warning_sign"), capture("notes")]
+    plan = compile_workflow(CONTEXT, "w", {"steps": steps})
+    assert kinds(plan) == [("check", "notes"), ("capture", "inpatient_manage"), ("capture", ("warning_sign", "notes"))]
+    assert plan.steps[0].skip == 1
+
+def test_skip_counts_are_recounted_after_merging():
+    steps = [check(3), capture("inpatient_manage"), capture("warning_sign"), click(), capture("notes")]
+    plan = compile_workflow(CONTEXT, "w", {"steps": steps})
+    assert [step.kind for step in plan.steps] == ["check", "capture", "input", "capture"]
+    assert plan.steps[0].skip == 2  # The merged capture and the click
+
+@pytest.mark.parametrize("step, message", [
+    (click("Orders"), "element 'Orders' not found"),
+    ({"action": "scroll_section", "params": {"section": "notes", "direction": "up"}}, "no scroll up element"),
+    (capture("nowhere"), "screen section 'nowhere' not found"),
+    ({"action": "capture_sections", "params": {"sections": []}}, "non-empty list"),
+    ({"action": "wait_for_probes", "params": {"probes": ["any"]}}, "no expected color"),
+    ({"action": "wait_for_probes", "params": {"probes": ["missing"]}}, "probe(s) not found"),
+    ({"action": "navigate_to", "params": {"section": "specific_patient"}}, "missing parameter(s): element"),
+    ({"action": "teleport"}, "unknown action 'teleport'"),
+])
+def test_invalid_steps_are_rejected_at_compile_time(step, message):
+    with pytest.raises(WorkflowError, match="step 2") as error:
+        compile_workflow(CONTEXT, "w", {"steps": [click(), step]})
+    assert message in str(error.value)
+
+def test_one_bad_workflow_does_not_stop_the_others():
+    plans, errors = compile_workflows(CONTEXT, {"good": {"steps": [click()]}, "bad": {"steps": []}})
+    assert list(plans) == ["good"]
+    assert errors == {"bad": "workflow 'bad' has no steps"}
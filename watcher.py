@@ -0,0 +1,61 @@
+"""
+File Watcher
+
+Polls a set of files for changes (mtime and size) on a daemon thread and calls
+back when any of them changes. Polling a couple of stat() calls a second is
+cheap and needs no platform-specific notification API.
+"""
+
+import os
+import sys
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class FileWatcher:
+    """Calls `on_change(changed_paths)` when any watched file changes"""
+
+    def __init__(self, paths: Iterable[str], on_change: Callable[[list], None], interval: float = 1.0):
+        self.on_change = on_change
+        self.interval = interval
+        self._signatures: Dict[str, Optional[Tuple[int, int]]] = {path: _signature(path) for path in paths}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, path: str):
+        """Add a file, recording its current state as the baseline"""
+        self._signatures.setdefault(path, _signature(path))
+
+    def check(self) -> list:
+        """Poll once; returns the changed paths after running the callback"""
+        changed = []
+        for path, previous in list(self._signatures.items()):
+            current = _signature(path)
+            if current != previous:
+                self._signatures[path] = current
+                changed.append(path)
+        if changed:
+            try:
+                self.on_change(changed)
+            except Exception as e:
+                print(f"Error handling change to {', '.join(changed)}: {e}", file=sys.stderr)
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> "FileWatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="powerchart-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,305 @@
+"""
+Workflow Engine
+
+Workflows are defined in workflows.json and compiled once against the coordinate
+catalog into step plans. Every element and screen section is resolved at compile
+time, so a workflow that references a missing element is rejected before it can
+click anything, and the executor's loop does no lookups.
+"""
+
+import json
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from catalog import CoordinateCatalog, Region
+from input_backends import InputOp, click_ops
+from metrics import METRICS
+from probes import Probe
+
+class WorkflowError(Exception):
+    """A workflow definition that cannot be compiled"""
+
+class Step(NamedTuple):
+    """One pre-resolved workflow step"""
+    kind: str  # "input", "capture", "text", "wait", "probe" or "check"
+    label: str  # Message reported for the step
+    ops: Tuple[InputOp, ...] = ()  # Input ops sent as one batch
+    region: Optional[Region] = None  # Settle region for input steps; grabbed region for capture, text and check steps
+    pause: float = 0.0  # Delay after the step; with screen-settle on, only spent watching for a late change
+    seconds: float = 0.0  # Wait duration, or timeout for probe steps
+    probes: Tuple[Probe, ...] = ()  # Probe steps only
+    marker: Optional[str] = None  # Check steps: last-seen marker the region is compared against
+    skip: int = 0  # Check steps: following steps skipped when unchanged (0: the rest of the workflow)
+    regions: Tuple[Region, ...] = ()  # Capture steps of several sections, grabbed together (region is then None)
+
+class WorkflowPlan(NamedTuple):
+    """A compiled workflow"""
+    name: str
+    description: str
+    steps: Tuple[Step, ...]
+
+class StepResult(NamedTuple):
+    label: str
+    seconds: float
+    text: Optional[str] = None  # Text steps: what was read
+
+class WorkflowResult(NamedTuple):
+    name: str
+    steps: List[StepResult]
+    seconds: float
+    error: Optional[str] = None  # Set when a step failed and the workflow stopped
+
+    def summary(self) -> str:
+        lines = []
+        for step in self.steps:
+            lines.append(f"{step.label} ({step.seconds * 1000:.0f} ms)")
+            if step.text is not None:
+                lines.append(step.text)
+        if self.error:
+            header = f"Workflow '{self.name}' stopped after {self.seconds:.2f} s: {self.error}"
+        else:
+            header = f"Workflow '{self.name}' completed in {self.seconds:.2f} s"
+        return header + ". Steps performed:\n" + "\n".join(lines)
+
+class CompileContext(NamedTuple):
+    """What workflow steps are resolved against"""
+    catalog: CoordinateCatalog
+    settle_default: Optional[str] = None  # Screen section watched when an element's section has none
+    probes: Dict[str, Probe] = {}
+
+# ===================================
+# Compilation
+# ===================================
+
+# Delay that followed every navigation step before screen-settle existed
+NAVIGATION_PAUSE = 1.0
+
+def _require(params: Dict[str, Any], *keys: str):
+    missing = [key for key in keys if key not in params]
+    if missing:
+        raise WorkflowError(f"missing parameter(s): {', '.join(missing)}")
+
+def _compile_click(context: CompileContext, params: Dict[str, Any], clicks: int, interval: float, verb: str) -> Step:
+    _require(params, "section", "element")
+    section, element = params["section"], params["element"]
+    subsection = params.get("subsection")
+    location = context.catalog.find(section, element, subsection)
+    if location is None:
+        where = f"section '{section}'" + (f", subsection '{subsection}'" if subsection else "")
+        raise WorkflowError(f"element '{element}' not found in {where}")
+
+    label = f"{verb} {element} (coordinates: {location.x}, {location.y})"
+    if subsection:
+        label += f" in subsection {subsection}"
+    return Step(
+        "input", label,
+        ops=tuple(click_ops(location.x, location.y, clicks, interval)),
+        region=context.catalog.region_for(section, context.settle_default),
+        pause=NAVIGATION_PAUSE,
+    )
+
+def _capture_step(regions: Tuple[Region, ...]) -> Step:
+    if len(regions) == 1:
+        return Step("capture", f"Screen section '{regions[0].name}' captured", region=regions[0])
+    names = ", ".join(f"'{region.name}'" for region in regions)
+    return Step("capture", f"Screen sections {names} captured from one grab", regions=regions)
+
+def merge_captures(steps: List[Step]) -> List[Step]:
+    """
+    Fold runs of back-to-back capture steps into one step, so their sections share a
+    single grab. A run is never merged across the end of a check step's skip range,
+    and check steps' skip counts are re-counted in merged steps.
+    """
+    boundaries = {number + step.skip for number, step in enumerate(steps) if step.kind == "check" and step.skip}
+    merged: List[Step] = []
+    position = []  # Index in `merged` of each original step
+    for number, step in enumerate(steps):
+        previous = merged[-1] if merged else None
+        if step.kind == "capture" and previous is not None and previous.kind == "capture" and number - 1 not in boundaries:
+            merged[-1] = _capture_step((previous.regions or (previous.region,)) + (step.regions or (step.region,)))
+        else:
+            merged.append(step)
+        position.append(len(merged) - 1)
+
+    for number, step in enumerate(steps):
+        if step.kind == "check" and step.skip:
+            last = min(number + step.skip, len(steps) - 1)
+            merged[position[number]] = step._replace(skip=position[last] - position[number])
+    return merged
+
+def compile_step(context: CompileContext, step: Dict[str, Any]) -> Step:
+    """Resolve one workflow.json step into a Step"""
+    catalog = context.catalog
+    action = step.get("action")
+    params = step.get("params", {})
+
+    if action == "navigate_to":
+        return _compile_click(context, params, 1, 0.0, "Clicked on")
+
+    if action == "double_click_element":
+        return _compile_click(context, params, 2, 0.1, "Double-clicked on")
+
+    if action == "scroll_section":
+        _require(params, "section", "direction")
+        section, direction = params["section"], params["direction"]
+        clicks = int(params.get("clicks", 1))
+        location = catalog.find(section, f"scroll {direction}")
+        if location is None:
+            raise WorkflowError(f"no scroll {direction} element in section '{section}'")
+        return Step(
+            "input", f"Scrolled {direction} {clicks} times in section '{section}'",
+            ops=tuple(click_ops(location.x, location.y, clicks, 0.2)),
+            region=catalog.region_for(section, context.settle_default),
+        )
+
+    if action == "capture_screen_section":
+        _require(params, "section")
+        section = params["section"]
+        if section not in catalog.screen_sections:
+            raise WorkflowError(f"screen section '{section}' not found")
+        return _capture_step((catalog.screen_sections[section],))
+
+    if action == "capture_sections":
+        _require(params, "sections")
+        sections = params["sections"]
+        if not isinstance(sections, list) or not sections:
+            raise WorkflowError("sections must be a non-empty list")
+        missing = [section for section in sections if section not in catalog.screen_sections]
+        if missing:
+            raise WorkflowError(f"screen section(s) not found: {', '.join(missing)}")
+        return _capture_step(tuple(catalog.screen_sections[section] for section in sections))
+
+    if action == "capture_section_text":
+        _require(params, "section")
+        section = params["section"]
+        if section not in catalog.screen_sections:
+            raise WorkflowError(f"screen section '{section}' not found")
+        return Step("text", f"Screen section '{section}' read", region=catalog.screen_sections[section])
+
+    if action == "wait":
+        _require(params, "seconds")
+        seconds = float(params["seconds"])
+        return Step("wait", f"Waited {seconds:g} s", seconds=seconds)
+
+    if action == "wait_for_probes":
+        _require(params, "probes")
+        missing = [name for name in params["probes"] if name not in context.probes]
+        if missing:
+            raise WorkflowError(f"probe(s) not found: {', '.join(missing)}")
+        probes = tuple(context.probes[name] for name in params["probes"])
+        unexpected = [probe.name for probe in probes if probe.expect is None]
+        if unexpected:
+            raise WorkflowError(f"probe(s) have no expected color to wait for: {', '.join(unexpected)}")
+        return Step(
+            "probe", f"Probes matched: {', '.join(params['probes'])}",
+            probes=probes, seconds=float(params.get("timeout", 5.0)),
+        )
+
+    if action == "skip_if_unchanged":
+        _require(params, "section")
+        section = params["section"]
+        if section not in catalog.screen_sections:
+            raise WorkflowError(f"screen section '{section}' not found")
+        skip = int(params.get("steps", 0))
+        if skip < 0:
+            raise WorkflowError("steps must be 0 (the rest of the workflow) or more")
+        return Step(
+            "check", f"Checked screen section '{section}' for new content",
+            region=catalog.screen_sections[section], marker=params.get("marker", section), skip=skip,
+        )
+
+    raise WorkflowError(f"unknown action '{action}'")
+
+def compile_workflow(context: CompileContext, name: str, definition: Dict[str, Any]) -> WorkflowPlan:
+    """Compile one workflow definition, raising WorkflowError on the first bad step"""
+    steps = definition.get("steps")
+    if not isinstance(steps, list) or not steps:
+        raise WorkflowError(f"workflow '{name}' has no steps")
+
+    compiled = []
+    for number, step in enumerate(steps, 1):
+        try:
+            compiled.append(compile_step(context, step))
+        except WorkflowError as e:
+            raise WorkflowError(f"workflow '{name}' step {number}: {e}") from None
+    return WorkflowPlan(name, definition.get("description", ""), tuple(merge_captures(compiled)))
+
+def compile_workflows(context: CompileContext, definitions: Dict[str, Any]) -> Tuple[Dict[str, WorkflowPlan], Dict[str, str]]:
+    """Compile every workflow; returns (plans, errors by workflow name)"""
+    plans, errors = {}, {}
+    for name, definition in definitions.items():
+        try:
+            plans[name] = compile_workflow(context, name, definition)
+        except WorkflowError as e:
+            errors[name] = str(e)
+    return plans, errors
+
+def load_workflows(path: str, context: CompileContext) -> Tuple[Dict[str, WorkflowPlan], Dict[str, str]]:
+    """Read workflows.json and compile it"""
+    with open(path, 'r') as f:
+        definitions = json.load(f)
+    return compile_workflows(context, definitions)
+
+# ===================================
+# Execution
+# ===================================
+
+class Runtime(NamedTuple):
+    """The side effects a plan needs, supplied by the server (or a simulator)"""
+    send: Callable[[Tuple[InputOp, ...], Optional[Region]], None]  # Send ops, then wait for the region to settle
+    grab: Callable[[Region], Any]  # Grab a screen region as a raw frame
+    pause: Callable[[float], None]  # Inter-step delay (with screen-settle on, spent only while nothing changed yet)
+    wait_for_probes: Callable[[Tuple[Probe, ...], float], bool]  # Poll until all probes match or timeout
+    on_capture: Optional[Callable[[Region, Any], None]] = None  # Receives (region, frame) for capture steps
+    unchanged: Optional[Callable[[str, Any], bool]] = None  # (marker, frame) -> same as last run; None never skips
+    read_text: Optional[Callable[[Region, Any], str]] = None  # OCRs (region, frame) for text steps
+    grab_many: Optional[Callable[[Tuple[Region, ...]], List[Any]]] = None  # Grabs several regions at once; None grabs each
+
+def execute(plan: WorkflowPlan, runtime: Runtime) -> WorkflowResult:
+    """Run a compiled plan, stopping at the first probe wait that times out"""
+    results = []
+    started = time.perf_counter()
+    skip_until = 0  # Steps numbered up to this are skipped
+    for number, step in enumerate(plan.steps, 1):
+        if number <= skip_until:
+            continue
+        step_start = time.perf_counter()
+        matched = True
+        label = step.label
+        text = None
+        if step.kind == "input":
+            runtime.send(step.ops, step.region)
+            if step.pause:
+                runtime.pause(step.pause)
+        elif step.kind == "capture":
+            regions = step.regions or (step.region,)
+            if len(regions) > 1 and runtime.grab_many is not None:
+                frames = runtime.grab_many(regions)
+            else:
+                frames = [runtime.grab(region) for region in regions]
+            if runtime.on_capture is not None:
+                for region, frame in zip(regions, frames):
+                    runtime.on_capture(region, frame)
+        elif step.kind == "text":
+            if runtime.read_text is not None:
+                text = runtime.read_text(step.region, runtime.grab(step.region))
+            else:
+                label += " (no OCR available)"
+        elif step.kind == "wait":
+            time.sleep(step.seconds)
+        elif step.kind == "probe":
+            matched = runtime.wait_for_probes(step.probes, step.seconds)
+        elif step.kind == "check" and runtime.unchanged is not None:
+            if runtime.unchanged(step.marker, runtime.grab(step.region)):
+                skip_until = number + step.skip if step.skip else len(plan.steps)
+                skipped = min(skip_until, len(plan.steps)) - number
+                label = f"Skipped {skipped} step(s): '{step.marker}' unchanged since the last run"
+                METRICS.count("workflow.steps_skipped", skipped)
+        elapsed = time.perf_counter() - step_start
+        METRICS.record(f"step.{step.kind}", step_start, elapsed, workflow=plan.name, step=number, label=label)
+
+        if not matched:
+            results.append(StepResult(f"Timed out waiting for probes: {', '.join(p.name for p in step.probes)}", elapsed))
+            return WorkflowResult(plan.name, results, time.perf_counter() - started, "probe wait timed out")
+        results.append(StepResult(label, elapsed, text))
+    return WorkflowResult(plan.name, results, time.perf_counter() - started)